@@ -0,0 +1,328 @@
+# =============================================
+# Ирц, байгаа хүмүүсийн HTTP API (HR, байрны систем) – asyncio, нэмэлт сангүй
+# =============================================
+# KIOSK_API_PORT=8080 python core.py   (main.py-ийн in-process core-д ч адил)
+#   GET /presence?limit=&offset=                     – одоо байгаа хүмүүс (ирсэн цагтай)
+#   GET /events?since=&until=&name=&action=&camera=&limit=&cursor=
+#                                                    – ирцийн мөрүүд; {"events", "next"}
+#   GET /summary?since=&until=&limit=&offset=        – ажилтан бүрийн нийлбэр (цаг, өдөр)
+#   GET /workers/<нэр>?since=&until=&limit=&offset=  – нэг ажилтны өдөр өдрөөр
+#   GET /events/stream?name=                         – шинэ check-in-ийн SSE урсгал
+# since/until: "YYYY-MM-DD" эсвэл "YYYY-MM-DD HH:MM:SS" (until орохгүй).
+# Хуудаслалт: /events-д cursor = "YYYY-MM:<byte offset>" – сарын segment доторх байрлал
+# ("next"-ийг дараагийн хүсэлтэд өгнө, segment-үүд append-only тул тогтвортой); бусад нь limit/offset.
+# Ирцийг attendance.AttendanceLog-оос: /summary хүрээнд бүтэн багтсан сарыг segment-ийн
+# нийлбэрийн индексээс, зөвхөн захын саруудыг мөрөөр уншина.
+# Хариу chunked-ээр хэсэгчлэн бичигдэнэ (writer.drain – удаан client санах ой дүүргэхгүй).
+#
+# Бүгд өөрийн thread дээрх event loop-т: файл унших, нийлбэр бодох нь API-ийн жижиг
+# executor дээр – камерын/таних thread, GUI хэзээ ч хүлээхгүй. core.emit-ээс ирэх event-ийг
+# зөвхөн call_soon_threadsafe-ээр шилжүүлнэ (check-in-ийн зам блоклогдохгүй).
+# SSE: удаан client-ийн дараалал SSE_QUEUE-ээс хэтэрвэл салгана; Last-Event-ID-тэй дахин
+# холбогдвол сүүлийн SSE_REPLAY event-ээс нөхөж авна.
+# KIOSK_API_TOKEN тохируулсан бол "Authorization: Bearer <token>" эсвэл ?token= шаардана.
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs, unquote, urlparse
+
+import metrics
+from attendance import to_epoch, finalize
+
+API_PORT = int(os.environ.get("KIOSK_API_PORT", "0") or 0)
+API_HOST = os.environ.get("KIOSK_API_HOST", "127.0.0.1")
+API_TOKEN = os.environ.get("KIOSK_API_TOKEN", "")
+PAGE_SIZE = 100
+MAX_PAGE = 1000
+SSE_QUEUE = 256
+SSE_REPLAY = 500
+SSE_KEEPALIVE = 15.0
+READ_TIMEOUT = 10.0
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+STATUS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+          405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or STATUS[status])
+        self.status = status
+
+
+# =============================================
+# HTTP server
+# =============================================
+class ApiServer:
+    def __init__(self, core, log, port=API_PORT, host=API_HOST, token=API_TOKEN):
+        self.core = core
+        self.log = log   # attendance.AttendanceLog
+        self.port = port
+        self.host = host
+        self.token = token
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(2, thread_name_prefix="http-api-io")
+        self._clients = set()                                  # SSE client-уудын asyncio.Queue
+        self._recent = collections.deque(maxlen=SSE_REPLAY)    # (id, event) – Last-Event-ID
+        self._event_id = 0
+        self._routes = {"/presence": self._presence, "/events": self._events,
+                        "/summary": self._summary, "/events/stream": self._stream}
+
+    # ---------- Амьдралын мөчлөг ----------
+    def start(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), daemon=True, name="http-api")
+        self._thread.start()
+        ready.wait(5)
+        if self._server is not None:
+            self.core.subscribe(self._on_event)
+            print(f"HTTP API: http://{self.host}:{self.port}/")
+        return self
+
+    def _run(self, ready):
+        loop = self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            self._server = loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        except OSError as e:
+            print("HTTP API эхлүүлж чадсангүй:", repr(e))
+            ready.set()
+            loop.close()
+            return
+        ready.set()
+        loop.run_forever()
+        loop.close()
+
+    def stop(self):
+        if self._server is None:
+            return
+        self.core.unsubscribe(self._on_event)
+
+        def shutdown():
+            self._server.close()
+            for queue in list(self._clients):
+                queue.put_nowait(None)
+            self._loop.call_later(0.2, self._loop.stop)   # SSE client-ууд хаагдах хугацаа
+
+        self._loop.call_soon_threadsafe(shutdown)
+        self._thread.join(timeout=5)
+        self._executor.shutdown(wait=False)
+        self._server = None
+
+    # ---------- core event (core-ийн thread-ээс) ----------
+    def _on_event(self, event):
+        if event.get("type") == "checkin":
+            self._loop.call_soon_threadsafe(self._broadcast, event)
+
+    def _broadcast(self, event):
+        self._event_id += 1
+        item = (self._event_id, {k: v for k, v in event.items() if k != "type"})
+        self._recent.append(item)
+        for queue in list(self._clients):
+            if queue.qsize() >= SSE_QUEUE:
+                # Удаан client – салгаад Last-Event-ID-ээр нөхүүлнэ
+                self._clients.discard(queue)
+                queue.put_nowait(None)
+                metrics.inc("api_sse_dropped_total")
+            else:
+                queue.put_nowait(item)
+
+    # ---------- Хүсэлт ----------
+    async def _handle(self, reader, writer):
+        status = 500
+        try:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), READ_TIMEOUT)
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+                return
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = (lines[0].split(" ") + ["", ""])[:3]
+            headers = {}
+            for line in lines[1:]:
+                key, _, value = line.partition(":")
+                if key:
+                    headers[key.strip().lower()] = value.strip()
+            url = urlparse(target)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            path = url.path.rstrip("/") or "/"
+            if method != "GET":
+                status = 405
+            elif self.token and headers.get("authorization") != f"Bearer {self.token}" \
+                    and query.get("token") != self.token:
+                status = 401
+            elif path == "/":
+                status = 200
+                await self._send_json(writer, {"endpoints": sorted(self._routes) + ["/workers/<name>"]})
+            elif path in self._routes:
+                status = 200
+                await self._routes[path](writer, query, headers)
+            elif path.startswith("/workers/"):
+                status = 200
+                await self._worker(writer, unquote(path[len("/workers/"):]), query)
+            else:
+                status = 404
+            if status != 200:
+                await self._send_json(writer, {"error": STATUS[status]}, status)
+        except HttpError as e:
+            status = e.status
+            await self._send_json(writer, {"error": str(e)}, status)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            print("HTTP API алдаа:", repr(e))
+            try:
+                await self._send_json(writer, {"error": STATUS[500]}, 500)
+            except ConnectionError:
+                pass
+        finally:
+            metrics.inc("api_requests_total", status=str(status))
+            writer.close()
+
+    def _header(self, writer, status=200, content_type="application/json; charset=utf-8", chunked=True):
+        lines = [f"HTTP/1.1 {status} {STATUS[status]}", f"Content-Type: {content_type}",
+                 "Cache-Control: no-cache", "Connection: close"]
+        if chunked:
+            lines.append("Transfer-Encoding: chunked")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def _chunk(self, writer, text):
+        data = text.encode("utf-8")
+        if data:
+            writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+            await writer.drain()
+
+    async def _end(self, writer):
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _send_json(self, writer, obj, status=200):
+        self._header(writer, status)
+        await self._chunk(writer, json.dumps(obj, ensure_ascii=False))
+        await self._end(writer)
+
+    async def _send_list(self, writer, key, items, extra):
+        # {"<key>": [...], ...extra} – мөр мөрөөр chunk-лэж бичнэ
+        self._header(writer)
+        await self._chunk(writer, "{" + json.dumps(key) + ": [")
+        batch = []
+        for i, item in enumerate(items):
+            batch.append(("," if i else "") + json.dumps(item, ensure_ascii=False))
+            if len(batch) >= 50:
+                await self._chunk(writer, "".join(batch))
+                batch = []
+        await self._chunk(writer, "".join(batch) + "]")
+        for k, v in extra.items():
+            await self._chunk(writer, f", {json.dumps(k)}: {json.dumps(v, ensure_ascii=False)}")
+        await self._chunk(writer, "}")
+        await self._end(writer)
+
+    def _run_io(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # ---------- Endpoint-ууд ----------
+    async def _presence(self, writer, query, headers):
+        limit, offset = _page(query)
+        present = sorted(({"name": n, "since": ts} for n, ts in self.core.presence().items()),
+                         key=lambda p: p["since"])
+        await self._send_list(writer, "present", present[offset:offset + limit],
+                              {"count": len(present), "offset": offset, "limit": limit})
+
+    async def _events(self, writer, query, headers):
+        limit, _ = _page(query)
+        cursor = query.get("cursor") or None
+        if cursor is not None:
+            month, _, offset = cursor.partition(":")
+            if len(month) != 7 or not offset.isdigit():
+                raise HttpError(400, "cursor буруу")
+        since, until = _ts(query, "since"), _ts(query, "until")
+        rows, next_cursor = await self._run_io(
+            lambda: self.log.rows(since, until, query.get("name"), query.get("action"),
+                                  query.get("camera"), cursor, limit))
+        await self._send_list(writer, "events", rows, {"next": next_cursor, "limit": limit})
+
+    async def _rows_summary(self, query):
+        since, until = _ts(query, "since"), _ts(query, "until")
+        present = self.core.presence()
+
+        def build():
+            end = min(time.time(), to_epoch(until)) if until else None
+            return finalize(self.log.summary(since, until, query.get("name")), present, end)
+        return await self._run_io(build)
+
+    async def _summary(self, writer, query, headers):
+        limit, offset = _page(query)
+        workers = await self._rows_summary(query)
+        items = [{k: v for k, v in w.items() if k != "daily"} for _, w in sorted(workers.items())]
+        await self._send_list(writer, "workers", items[offset:offset + limit],
+                              {"count": len(items), "offset": offset, "limit": limit})
+
+    async def _worker(self, writer, name, query):
+        limit, offset = _page(query)
+        query = dict(query, name=name)
+        workers = await self._rows_summary(query)
+        w = workers.get(name)
+        if w is None:
+            raise HttpError(404, f"'{name}' бүртгэл алга")
+        days = [{"date": d, "hours": round(s / 3600, 2)} for d, s in sorted(w.pop("daily").items())]
+        await self._send_list(writer, "days", days[offset:offset + limit],
+                              {"summary": w, "count": len(days), "offset": offset, "limit": limit})
+
+    async def _stream(self, writer, query, headers):
+        name = query.get("name")
+        try:
+            last_id = int(headers.get("last-event-id") or query.get("last_event_id") or 0)
+        except ValueError:
+            last_id = 0
+        self._header(writer, content_type="text/event-stream; charset=utf-8", chunked=False)
+        queue = asyncio.Queue()
+        for item in self._recent:
+            if item[0] > last_id:
+                queue.put_nowait(item)
+        self._clients.add(queue)
+        metrics.inc("api_sse_connections_total")
+        try:
+            writer.write(b"retry: 3000\n\n")
+            await writer.drain()
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    writer.write(b": keepalive\n\n")
+                    await writer.drain()
+                    continue
+                if item is None:
+                    break
+                event_id, event = item
+                if name and event["name"] != name:
+                    continue
+                writer.write(f"id: {event_id}\nevent: checkin\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+                             .encode("utf-8"))
+                await writer.drain()
+        finally:
+            self._clients.discard(queue)
+
+
+def _page(query):
+    try:
+        limit = min(MAX_PAGE, max(1, int(query.get("limit", PAGE_SIZE))))
+        offset = max(0, int(query.get("offset", 0)))
+    except ValueError:
+        raise HttpError(400, "limit/offset тоо байх ёстой") from None
+    return limit, offset
+
+
+def _ts(query, key):
+    value = query.get(key)
+    if not value:
+        return None
+    for fmt in (TS_FORMAT, "%Y-%m-%d"):
+        try:
+            return time.strftime(TS_FORMAT, time.strptime(value, fmt))
+        except ValueError:
+            pass
+    raise HttpError(400, f"{key}: YYYY-MM-DD эсвэл YYYY-MM-DD HH:MM:SS")
@@ -0,0 +1,354 @@
+# =============================================
+# Царайн файлууд: тэгшлэсэн жижиг chip + encoding-ийн индекс, pending_photos GC
+# =============================================
+# known_faces/<нэр>~N.jpg-д бүтэн webcam frame биш, dlib-ийн тэгшлэсэн (5 цэгийн landmark)
+# CHIP_SIZE×CHIP_SIZE царай хадгална – dlib encoding яг энэ chip дээр бодогддог тул
+# дахин detection хийх шаардлагагүй, файл ~10 дахин жижиг.
+# ASSET_INDEX (face_assets.json) – файл бүрийн sha1, хэмжээ, mtime, encoding:
+#   load_encodings() өөрчлөгдөөгүй файлыг уншихгүй (stat л хийнэ), нэрээ сольсон
+#   (move_samples) файлыг hash-аар таньж дахин encode хийхгүй; ижил агуулгатай chip
+#   дахин хадгалагдахгүй.
+# Хуучин бүтэн frame-үүдийг хөрвүүлэх ба хаягдсан pending зургийг цэвэрлэх:
+#   python assets.py compact [--backup dir]
+#   python assets.py gc [--ttl-hours 6]
+#   python assets.py stats
+# Индекс зөвхөн кэш – устгасан/эвдэрсэн бол дараагийн ачаалалтад дахин бүтээгдэнэ.
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+import profiles
+import workers
+from sync import decode_vector, encode_vector
+
+ASSET_INDEX = "face_assets.json"
+CHIP_SIZE = 150          # dlib face encoder-ийн оролт
+CHIP_PADDING = 0.25      # dlib-ийн анхдагч – encoding-д ижил тэгшлэлт
+CHIP_QUALITY = 92
+PENDING_DIR = "pending_photos"
+PENDING_TTL = 6 * 3600.0    # бүртгэлийн форм ийм удаан нээлттэй байхгүй
+GC_INTERVAL = 3600.0
+
+
+# =============================================
+# Chip үүсгэх / encode
+# =============================================
+def _load_rgb(path):
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as im:
+        return np.asarray(ImageOps.exif_transpose(im).convert("RGB"))
+
+
+def is_chip(rgb):
+    return rgb.shape[:2] == (CHIP_SIZE, CHIP_SIZE)
+
+
+def align(rgb, box, landmarks="small"):
+    # box = (top, right, bottom, left) → тэгшлэсэн RGB chip
+    import dlib
+    import face_recognition.api as fr
+
+    shape = fr._raw_face_landmarks(rgb, [box], model=landmarks)[0]
+    return np.asarray(dlib.get_face_chip(rgb, shape, size=CHIP_SIZE, padding=CHIP_PADDING))
+
+
+def chip_encoding(chip, jitters=1):
+    # Тэгшлэсэн chip → 128-d (detection, landmark үгүй)
+    import face_recognition.api as fr
+
+    return np.asarray(fr.face_encoder.compute_face_descriptor(np.ascontiguousarray(chip), jitters))
+
+
+def chip_bytes(chip):
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.fromarray(chip).save(buf, "JPEG", quality=CHIP_QUALITY)
+    return buf.getvalue()
+
+
+def make_chip(rgb, profile=None, single=False):
+    # → (алдааны шалтгаан эсвэл None, JPEG байт, encoding). Encoding-ийг JPEG-ээс буцааж
+    # уншсан chip дээр бодно – дараа нь файлаас бодсонтой яг ижил. profile анхдагч – "enroll".
+    import face_recognition
+
+    profile = profile or profiles.for_path("enroll")
+    locations = face_recognition.face_locations(rgb, profile.upsample, profile.detector)
+    if not locations:
+        return "no_face", None, None
+    if len(locations) > 1 and single:
+        return "multiple_faces", None, None
+    box = max(locations, key=lambda b: (b[2] - b[0]) * (b[1] - b[3]))   # хамгийн том (ойр) царай
+    data = chip_bytes(align(rgb, box, profile.landmarks))
+    return None, data, chip_encoding(_load_rgb(io.BytesIO(data)), profile.jitters)
+
+
+def encode_image(rgb, profile=None):
+    # Chip бол шууд, хуучин бүтэн frame бол detection-оор (эхний царай). profile анхдагч – "load".
+    profile = profile or profiles.for_path("load")
+    if is_chip(rgb):
+        return chip_encoding(rgb, profile.jitters)
+    import face_recognition
+
+    locations = face_recognition.face_locations(rgb, profile.upsample, profile.detector)
+    enc = face_recognition.face_encodings(rgb, locations[:1], profile.jitters, profile.landmarks) \
+        if locations else []
+    return enc[0] if enc else None
+
+
+def write_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# =============================================
+# Encoding-ийн индекс
+# =============================================
+class AssetIndex:
+    # {файлын нэр: {"sha1", "size", "mtime", "jitters", "encoding"}} – encoding нь sync-ийн float32 base64.
+    # jitters өөр профайлаар бодсон encoding-ийг кэш гэж үзэхгүй (дахин бодно).
+    def __init__(self, path=ASSET_INDEX):
+        self.path = path
+        self.files = {}
+        self.dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("chip_size") == CHIP_SIZE:
+                    self.files = data["files"]
+            except (OSError, ValueError, KeyError):
+                self.files = {}   # кэш – дахин бүтээнэ
+
+    def lookup(self, path, jitters=1):
+        rec = self.files.get(os.path.basename(path))
+        if rec is None:
+            return None
+        st = os.stat(path)
+        if rec["size"] == st.st_size and rec["mtime"] == st.st_mtime and rec.get("jitters", 1) == jitters:
+            return decode_vector(rec["encoding"]) if rec["encoding"] else None
+        return False   # өөрчлөгдсөн – hash-аар шалгана
+
+    def find_hash(self, sha1, jitters=None):
+        for file, rec in self.files.items():
+            if rec["sha1"] == sha1 and (jitters is None or rec.get("jitters", 1) == jitters):
+                return file, rec
+        return None, None
+
+    def put(self, path, encoding, sha1=None, jitters=1):
+        if sha1 is None:
+            with open(path, "rb") as f:
+                sha1 = hashlib.sha1(f.read()).hexdigest()
+        st = os.stat(path)
+        self.files[os.path.basename(path)] = {
+            "sha1": sha1, "size": st.st_size, "mtime": st.st_mtime, "jitters": jitters,
+            "encoding": encode_vector(encoding) if encoding is not None else None,
+        }
+        self.dirty = True
+
+    def prune(self, existing):
+        for file in set(self.files) - set(existing):
+            del self.files[file]
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        data = json.dumps({"chip_size": CHIP_SIZE, "files": self.files}, ensure_ascii=False)
+        write_atomic(self.path, data.encode("utf-8"))
+        self.dirty = False
+
+
+def load_encodings(folder=None, index=None, profile=None):
+    # → (encodings, names, {"cached", "rehashed", "encoded"}) – recognition.load_known_faces
+    folder = folder or workers.KNOWN_FACES_DIR
+    profile = profile or profiles.for_path("load")
+    own = index is None
+    index = index or AssetIndex()
+    encodings, names = [], []
+    stats = {"cached": 0, "rehashed": 0, "encoded": 0}
+    files = sorted(f for f in os.listdir(folder) if not f.endswith(".tmp")) if os.path.isdir(folder) else []
+    for file in files:
+        path = os.path.join(folder, file)
+        enc = index.lookup(path, profile.jitters)
+        if enc is False or enc is None and file not in index.files:
+            with open(path, "rb") as f:
+                data = f.read()
+            sha1 = hashlib.sha1(data).hexdigest()
+            _, rec = index.find_hash(sha1, profile.jitters)
+            if rec is not None:   # move_samples-аар нэр нь солигдсон ижил файл
+                enc = decode_vector(rec["encoding"]) if rec["encoding"] else None
+                stats["rehashed"] += 1
+            else:
+                try:
+                    enc = encode_image(_load_rgb(io.BytesIO(data)), profile)
+                except OSError:
+                    enc = None
+                stats["encoded"] += 1
+            index.put(path, enc, sha1, profile.jitters)
+        else:
+            stats["cached"] += 1
+        if enc is not None:
+            encodings.append(enc)
+            names.append(workers.name_from_photo(file))
+    index.prune(files)
+    if own:
+        index.save()
+    return encodings, names, stats
+
+
+def sample_chip(src, profile=None):
+    # Pending зураг → (алдаа эсвэл None, chip JPEG, encoding) – юу ч бичихгүй
+    return make_chip(_load_rgb(src), profile or profiles.for_path("enroll"))
+
+
+def save_sample(src, name, index=None, profile=None, chip=None):
+    # Pending зураг → known_faces-д chip (дараагийн sample дугаартай). Ижил chip аль хэдийн
+    # энэ хүнд байвал дахин бичихгүй. chip – sample_chip-ээр урьдчилан бодсон (JPEG, encoding).
+    # → (зам эсвэл None, encoding эсвэл None)
+    own = index is None
+    index = index or AssetIndex()
+    profile = profile or profiles.for_path("enroll")
+    if chip is None:
+        error, data, encoding = sample_chip(src, profile)
+        if error:
+            return None, None
+    else:
+        data, encoding = chip
+    sha1 = hashlib.sha1(data).hexdigest()
+    file, _ = index.find_hash(sha1)
+    if file is not None and workers.safe_name(workers.name_from_photo(file)) == workers.safe_name(name):
+        path = os.path.join(workers.KNOWN_FACES_DIR, file)
+    else:
+        path = workers.next_sample_path(name)
+        write_atomic(path, data)
+        index.put(path, encoding, sha1, profile.jitters)
+    os.remove(src)
+    if own:
+        index.save()
+    return path, encoding
+
+
+# =============================================
+# Хуучин бүтэн frame → chip, давхардал устгах
+# =============================================
+def compact(folder=None, backup_dir=None):
+    folder = folder or workers.KNOWN_FACES_DIR
+    index = AssetIndex()
+    profile = profiles.for_path("enroll")
+    report = {"converted": 0, "duplicates": 0, "no_face": 0, "bytes_before": 0, "bytes_after": 0}
+    seen = {}
+    for file in sorted(os.listdir(folder)):
+        path = os.path.join(folder, file)
+        report["bytes_before"] += os.path.getsize(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        rgb = _load_rgb(io.BytesIO(data))
+        if not is_chip(rgb):
+            error, chip, encoding = make_chip(rgb, profile)
+            if error:
+                report["no_face"] += 1   # хөндөхгүй
+                report["bytes_after"] += len(data)
+                continue
+            if backup_dir:
+                os.makedirs(backup_dir, exist_ok=True)
+                write_atomic(os.path.join(backup_dir, file), data)
+            write_atomic(path, chip)
+            data = chip
+            index.put(path, encoding, hashlib.sha1(chip).hexdigest(), profile.jitters)
+            report["converted"] += 1
+        sha1 = hashlib.sha1(data).hexdigest()
+        owner = (workers.safe_name(workers.name_from_photo(file)), sha1)
+        if owner in seen:   # нэг хүний яг ижил sample
+            os.remove(path)
+            report["duplicates"] += 1
+            continue
+        seen[owner] = file
+        report["bytes_after"] += len(data)
+    index.prune(os.listdir(folder))
+    index.save()
+    return report
+
+
+# =============================================
+# Хаягдсан pending зургийн GC
+# =============================================
+def gc_pending(folder=PENDING_DIR, ttl=PENDING_TTL, now=None):
+    # Форм хаагдсан/орхигдсон capture-ууд – ttl-ээс хуучин файлуудыг устгана
+    now = time.time() if now is None else now
+    removed = []
+    if not os.path.isdir(folder):
+        return removed
+    for file in os.listdir(folder):
+        path = os.path.join(folder, file)
+        try:
+            if os.path.isfile(path) and now - os.path.getmtime(path) > ttl:
+                os.remove(path)
+                removed.append(file)
+        except OSError:
+            pass   # яг энэ агшинд enroll зөөсөн
+    return removed
+
+
+class PendingGC:
+    def __init__(self, folder=PENDING_DIR, ttl=PENDING_TTL, interval=GC_INTERVAL):
+        self.folder = folder
+        self.ttl = ttl
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True, name="pending-gc").start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            removed = gc_pending(self.folder, self.ttl)
+            if removed:
+                print(f"pending_photos: {len(removed)} хаягдсан зураг устгалаа")
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        self._stop.set()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Царайн файлуудыг шахах / pending цэвэрлэх")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("compact", help="бүтэн frame-үүдийг chip болгож, давхардлыг устгана")
+    p.add_argument("--backup", help="эх файлуудыг хадгалах хавтас")
+    p = sub.add_parser("gc", help="хуучин pending зургийг устгана")
+    p.add_argument("--ttl-hours", type=float, default=PENDING_TTL / 3600)
+    sub.add_parser("stats", help="индексийг шинэчилж, ачаалах хугацааг хэмжинэ")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "compact":
+        report = compact(backup_dir=args.backup)
+    elif args.cmd == "gc":
+        report = {"removed": gc_pending(ttl=args.ttl_hours * 3600)}
+    else:
+        t0 = time.perf_counter()
+        encodings, _, stats = load_encodings()
+        report = dict(stats, faces=len(encodings), load_s=round(time.perf_counter() - t0, 3))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.cmd == "compact" and report["converted"] + report["duplicates"]:
+        import ipc
+
+        client = ipc.connect()
+        if client is not None:
+            client.reload_faces()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
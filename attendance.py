@@ -0,0 +1,427 @@
+# =============================================
+# Ирцийн бүртгэл – сар бүрийн segment, хаагдсан нь шахсан + checksum + ажилтны нийлбэр
+# =============================================
+# time_logs.txt нэг л өсөх файл байсан: харагч, тайлан бүр бүх түүхийг уншиж улам удааширч,
+# SD картын ганц бичилтийн алдаа олон жилийн түүхийг эвдэж болзошгүй байв. Одоо:
+#   attendance/2025-11.log      – идэвхтэй сар, мөрийн формат хэвээр (нэр,IN|OUT,цаг,камер)
+#   attendance/2025-10.log.gz   – хаагдсан сар, дахин хэзээ ч бичигдэхгүй
+#   attendance/2025-10.json     – manifest: gz-ийн sha256, мөрийн тоо, эхний/сүүлийн цаг,
+#                                 ажилтан бүрийн нийлбэр (ins/outs/first/last/өдрийн секунд)
+# Мөр бичигдэх үеийн сарын segment-д орно (sync-ээр хожуу ирсэн мөр ч) – segment бүрийн
+# first/last нь мөрүүдийн бодит цагийн хүрээ тул хайлтын шүүлт зөв хэвээр.
+# Сар солигдоход идэвхтэй файлыг "attendance-seal" thread шахна: gz.tmp → fsync → буцааж задалж
+# шалгах → manifest → .log устгах (аль ч алхамд унавал дараагийн эхлэлд дахин эхэлнэ).
+# Асуулт: хүрээнд бүтэн багтсан segment-ийн нийлбэрийг manifest-ээс шууд; зөвхөн хүрээний
+# захын segment-үүдийг уншина. Нэртэй асуултад тэр хүн огт байхгүй segment-ийг алгасна.
+# Шахсан segment-ийн эвдрэлийг gzip-ийн CRC уншихад, sha256-ийг `verify` илрүүлнэ.
+#   python attendance.py stats | verify | migrate [--legacy time_logs.txt]
+#   python attendance.py summary [--since 2025-10-01] [--until 2025-11-01] [--name Bat]
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+import metrics
+
+ATTENDANCE_DIR = "attendance"
+LEGACY_LOG = "time_logs.txt"
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_line(line):
+    # "нэр,IN|OUT,цаг[,камер]" → dict эсвэл None
+    parts = line.rstrip("\n").split(",", 2)
+    if len(parts) != 3:
+        return None
+    ts, _, camera = parts[2].partition(",")
+    return {"name": parts[0], "action": parts[1], "ts": ts, "camera": camera}
+
+
+def to_epoch(ts):
+    return time.mktime(time.strptime(ts, TS_FORMAT))
+
+
+# =============================================
+# Ажилтны нийлбэр – segment бүрээр бодоод нийлүүлж болох хэлбэр
+# =============================================
+# IN → OUT хосоор ажилласан цаг, шөнө дамнасан үе IN-ий өдөрт. Segment-ийн зааг дээр тасарсан
+# хосыг нийлүүлэхийн тулд ажилтан бүрт:
+#   open_in  – segment-ийн төгсгөлд хаагдаагүй IN (дараагийн segment-ийн lead_out-той хосолно)
+#   lead_out – segment-д анхны IN-ээс өмнөх OUT (өмнөх segment-ийн open_in-ийг хаана)
+def add_row(workers, row):
+    w = workers.get(row["name"])
+    if w is None:
+        w = workers[row["name"]] = {"ins": 0, "outs": 0, "first": row["ts"], "last": row["ts"],
+                                    "daily": {}, "open_in": None, "lead_out": None}
+    w["first"], w["last"] = min(w["first"], row["ts"]), max(w["last"], row["ts"])
+    if row["action"] == "IN":
+        w["ins"] += 1
+        w["open_in"] = row["ts"]
+        w["daily"].setdefault(row["ts"][:10], 0.0)
+    elif row["action"] == "OUT":
+        w["outs"] += 1
+        if w["open_in"] is not None:
+            _pair(w, w["open_in"], row["ts"])
+            w["open_in"] = None
+        elif w["ins"] == 0 and w["lead_out"] is None:
+            w["lead_out"] = row["ts"]
+
+
+def _pair(w, start, end):
+    day = start[:10]
+    w["daily"][day] = w["daily"].get(day, 0.0) + max(0.0, to_epoch(end) - to_epoch(start))
+
+
+def partial_summary(rows):
+    workers = {}
+    for row in sorted(rows, key=lambda r: r["ts"]):
+        add_row(workers, row)
+    return workers
+
+
+def merge(earlier, later):
+    # Хоёр дараалсан segment-ийн нийлбэр → нэг (earlier, later өөрчлөгдөхгүй)
+    result = {name: dict(w, daily=dict(w["daily"])) for name, w in earlier.items()}
+    for name, b in later.items():
+        a = result.get(name)
+        if a is None:
+            result[name] = dict(b, daily=dict(b["daily"]))
+            continue
+        if a["open_in"] is not None and b["lead_out"] is not None:
+            _pair(a, a["open_in"], b["lead_out"])
+        for day, seconds in b["daily"].items():
+            a["daily"][day] = a["daily"].get(day, 0.0) + seconds
+        a["ins"] += b["ins"]
+        a["outs"] += b["outs"]
+        a["first"], a["last"] = min(a["first"], b["first"]), max(a["last"], b["last"])
+        # Дараагийн segment-д IN байвал түүний төлөв; зөвхөн OUT-тай бол lead_out хаасан
+        a["open_in"] = b["open_in"] if b["ins"] else None
+    return result
+
+
+def finalize(workers, present=None, end=None):
+    # OUT-гүй IN: одоо байгаа бол end хүртэл ("open"), үгүй бол (OUT бичигдээгүй) тоолохгүй
+    present = present or {}
+    end = time.time() if end is None else end
+    result = {}
+    for name, w in workers.items():
+        daily = dict(w["daily"])
+        is_open = w["open_in"] is not None and name in present
+        if is_open:
+            day = w["open_in"][:10]
+            daily[day] = daily.get(day, 0.0) + max(0.0, end - to_epoch(w["open_in"]))
+        result[name] = {"name": name, "ins": w["ins"], "outs": w["outs"], "first": w["first"],
+                        "last": w["last"], "daily": daily, "open": is_open,
+                        "hours": round(sum(daily.values()) / 3600, 2), "days": len(daily)}
+    return result
+
+
+# =============================================
+# Segment-тэй бүртгэл
+# =============================================
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fsync_write(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class AttendanceLog:
+    def __init__(self, folder=ATTENDANCE_DIR, legacy=LEGACY_LOG, readonly=False):
+        self.folder = folder
+        self.readonly = readonly
+        self.segments = {}   # "YYYY-MM" → {"month", "lines", "first", "last", "workers", "sealed", ...}
+        self._lock = threading.Lock()
+        self._active = None          # идэвхтэй сарын нээлттэй файл
+        self._active_month = None
+        self._sealers = []
+        if not readonly:
+            os.makedirs(folder, exist_ok=True)
+            if legacy and os.path.exists(legacy):
+                self.migrate(legacy)
+        self._load()
+
+    def _path(self, month, ext):
+        return os.path.join(self.folder, f"{month}.{ext}")
+
+    def _load(self):
+        if not os.path.isdir(self.folder):
+            return
+        current = time.strftime("%Y-%m")
+        for entry in sorted(os.listdir(self.folder)):
+            month, _, ext = entry.partition(".")
+            if ext == "json":
+                with open(os.path.join(self.folder, entry), "r", encoding="utf-8") as f:
+                    self.segments[month] = dict(json.load(f), sealed=True)
+            elif ext == "log":
+                self.segments[month] = self._scan(month)
+        for month in sorted(m for m, s in self.segments.items() if not s["sealed"] and m != current):
+            if not self.readonly:
+                self._seal(month)   # өмнөх ажиллалтын хаагдаагүй сар (эсвэл тасарсан seal)
+        if current in self.segments and not self.segments[current]["sealed"]:
+            self._active_month = current
+
+    def _scan(self, month):
+        # Хаагдаагүй .log-ийн meta, нийлбэрийг мөрүүдээс бодно (сард нэг файл – жижиг)
+        meta = {"month": month, "lines": 0, "first": None, "last": None, "workers": {}, "sealed": False}
+        with open(self._path(month, "log"), "rb") as f:
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        if len(complete) != len(data) and not self.readonly:
+            with open(self._path(month, "log"), "r+b") as f:
+                f.truncate(len(complete))   # унахад тасарсан сүүлийн мөр
+        rows = [row for row in map(parse_line, complete.decode("utf-8", errors="replace").splitlines())
+                if row is not None]
+        for row in rows:
+            self._span(meta, row)
+        meta["workers"] = partial_summary(rows)   # sync-ийн хожуу мөрүүд цагаар эрэмбэлэгдэнэ
+        return meta
+
+    @staticmethod
+    def _span(meta, row):
+        meta["lines"] += 1
+        meta["first"] = row["ts"] if meta["first"] is None else min(meta["first"], row["ts"])
+        meta["last"] = row["ts"] if meta["last"] is None else max(meta["last"], row["ts"])
+
+    def _note(self, meta, row):
+        late = meta["last"] is not None and row["ts"] < meta["last"]
+        self._span(meta, row)
+        if not late:
+            add_row(meta["workers"], row)
+        elif os.path.exists(self._path(meta["month"], "log")):
+            # Sync-ээр хожуу ирсэн (өмнөх цагтай) мөр: IN/OUT хос нэмэх дарааллаар биш цагаар –
+            # _segment_summary-тай ижил байхаар segment-ийг дахин бодно (сард нэг файл – жижиг)
+            meta["workers"] = self._segment_summary(meta, None, None, None)
+
+    # ---------- Бичих ----------
+    def append(self, name, action, ts, camera=""):
+        month = time.strftime("%Y-%m")
+        line = f"{name},{action},{ts},{camera}\n"
+        with self._lock:
+            if month != self._active_month or self._active is None:
+                self._roll(month)
+            self._active.write(line.encode("utf-8"))
+            self._active.flush()
+            self._note(self.segments[month], parse_line(line))
+
+    def _roll(self, month):
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+        previous = self._active_month
+        if previous not in (None, month) and not self.segments[previous]["sealed"]:
+            # Шахалт check-in-ийн замаас гадуур – тэр хооронд уншигчид .log-ийг уншина
+            sealer = threading.Thread(target=self._seal, args=(previous,), daemon=True,
+                                      name="attendance-seal")
+            sealer.start()
+            self._sealers.append(sealer)
+        self._active_month = month
+        self.segments.setdefault(month, {"month": month, "lines": 0, "first": None, "last": None,
+                                         "workers": {}, "sealed": False})
+        self._active = open(self._path(month, "log"), "ab")
+
+    def _seal(self, month):
+        try:
+            with open(self._path(month, "log"), "rb") as f:
+                raw = f.read()
+            gz_path = self._path(month, "log.gz")
+            _fsync_write(gz_path, gzip.compress(raw, compresslevel=9, mtime=0))
+            with gzip.open(gz_path, "rb") as f:
+                if f.read() != raw:
+                    raise IOError(f"{gz_path}: шахсан агуулга эх файлтай таарахгүй")
+            meta = dict(self.segments.get(month) or self._scan(month))
+            # Manifest-ийн нийлбэр мөрүүдээс цагийн дарааллаар – нэмэгдсэн дарааллаас хамаарахгүй
+            meta["workers"] = partial_summary(
+                [row for row in map(parse_line, raw.decode("utf-8", errors="replace").splitlines())
+                 if row is not None])
+            meta.update(sealed=True, bytes=len(raw), gz_bytes=os.path.getsize(gz_path),
+                        sha256=_sha256(gz_path), raw_sha256=hashlib.sha256(raw).hexdigest(),
+                        sealed_at=time.strftime(TS_FORMAT))
+            manifest = {k: v for k, v in meta.items() if k != "sealed"}
+            _fsync_write(self._path(month, "json"),
+                         json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8"))
+            with self._lock:
+                self.segments[month] = meta
+            os.remove(self._path(month, "log"))
+            metrics.inc("attendance_segments_sealed_total")
+        except Exception as e:
+            # .log үлдэнэ – унших боломжтой, дараагийн эхлэлд дахин оролдоно
+            print(f"Ирцийн segment {month} шахах алдаа:", repr(e))
+            metrics.inc("attendance_seal_errors_total")
+
+    def migrate(self, legacy):
+        # Хуучин нэг файлыг мөрийн цагийн сараар хувааж segment болгоно (нэг удаа)
+        months = {}
+        with open(legacy, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                row = parse_line(line)
+                if row is None:
+                    continue
+                month = row["ts"][:7] if len(row["ts"]) >= 7 else time.strftime("%Y-%m")
+                months.setdefault(month, []).append(line if line.endswith("\n") else line + "\n")
+        for month, lines in sorted(months.items()):
+            if os.path.exists(self._path(month, "json")):
+                # Шахсан сар дахин бичигдэхгүй – тэр сарын мөрүүд идэвхтэй сард орно
+                month = time.strftime("%Y-%m")
+            with open(self._path(month, "log"), "a", encoding="utf-8") as f:
+                f.writelines(lines)
+        os.replace(legacy, legacy + ".migrated")
+        print(f"{legacy}: {sum(map(len, months.values()))} мөр {len(months)} сарын segment болов")
+
+    # ---------- Унших ----------
+    def _covering(self, since, until, name=None):
+        # [since, until) хүрээтэй огтлолцох (нэртэй бол тэр хүн байгаа) segment-үүд, сарын дарааллаар
+        with self._lock:
+            segments = [dict(s) for _, s in sorted(self.segments.items()) if s["lines"]]
+        return [s for s in segments
+                if not (since and s["last"] < since or until and s["first"] >= until)
+                and (not name or name in s["workers"])]
+
+    def _open(self, meta):
+        if not meta["sealed"]:
+            try:
+                return open(self._path(meta["month"], "log"), "rb")
+            except FileNotFoundError:
+                pass   # яг одоо шахагдаж дууссан
+        return gzip.open(self._path(meta["month"], "log.gz"), "rb")
+
+    def rows(self, since=None, until=None, name=None, action=None, camera=None, cursor=None, limit=None):
+        # → (мөрүүд, дараагийн cursor эсвэл None). cursor = "YYYY-MM:<задалсан byte offset>"
+        start_month, offset = None, 0
+        if cursor:
+            start_month, _, offset = cursor.partition(":")
+            offset = int(offset or 0)
+        rows = []
+        for meta in self._covering(since, until, name):
+            if start_month and meta["month"] < start_month:
+                continue
+            with self._open(meta) as f:
+                if meta["month"] == start_month:
+                    f.seek(offset)
+                while True:
+                    raw = f.readline()
+                    if not raw.endswith(b"\n"):
+                        break   # segment-ийн төгсгөл (бичигдэж буй дутуу мөрийг алгасна)
+                    row = parse_line(raw.decode("utf-8", errors="replace"))
+                    if row is None:
+                        continue
+                    if (since and row["ts"] < since or until and row["ts"] >= until
+                            or name and row["name"] != name or action and row["action"] != action
+                            or camera and row["camera"] != camera):
+                        continue
+                    rows.append(row)
+                    if limit and len(rows) >= limit:
+                        return rows, f"{meta['month']}:{f.tell()}"
+        return rows, None
+
+    def summary(self, since=None, until=None, name=None):
+        # → нийлүүлж болох нийлбэр (finalize-д өгнө). Бүтэн багтсан segment – manifest-ээс.
+        workers = {}
+        for meta in self._covering(since, until, name):
+            inside = (not since or meta["first"] >= since) and (not until or meta["last"] < until)
+            if inside:
+                part = meta["workers"] if not name else {name: meta["workers"][name]}
+                metrics.inc("attendance_summary_segments_total", source="index")
+            else:
+                part = self._segment_summary(meta, since, until, name)
+                metrics.inc("attendance_summary_segments_total", source="scan")
+            workers = merge(workers, part)
+        return workers
+
+    def _segment_summary(self, meta, since, until, name):
+        rows = []
+        with self._open(meta) as f:
+            for raw in f:
+                row = parse_line(raw.decode("utf-8", errors="replace"))
+                if (row is None or since and row["ts"] < since or until and row["ts"] >= until
+                        or name and row["name"] != name):
+                    continue
+                rows.append(row)
+        return partial_summary(rows)
+
+    def verify(self):
+        # → [{"month", "ok", "error"}] – хаагдсан segment бүрийн sha256 + бүтэн задаргаа
+        results = []
+        for month, meta in sorted(self.segments.items()):
+            if not meta["sealed"]:
+                continue
+            entry = {"month": month, "ok": False}
+            try:
+                gz_path = self._path(month, "log.gz")
+                if _sha256(gz_path) != meta["sha256"]:
+                    entry["error"] = "sha256 таарахгүй"
+                else:
+                    with gzip.open(gz_path, "rb") as f:
+                        raw = f.read()
+                    entry["ok"] = hashlib.sha256(raw).hexdigest() == meta["raw_sha256"]
+                    if not entry["ok"]:
+                        entry["error"] = "задалсан агуулгын sha256 таарахгүй"
+            except (OSError, EOFError) as e:
+                entry["error"] = repr(e)
+            results.append(entry)
+        return results
+
+    def stats(self):
+        with self._lock:
+            return [{k: v for k, v in s.items() if k != "workers"} | {"workers": len(s["workers"])}
+                    for _, s in sorted(self.segments.items())]
+
+    def close(self):
+        with self._lock:
+            if self._active is not None:
+                self._active.close()
+                self._active = None
+        for sealer in self._sealers:
+            sealer.join(timeout=10)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Ирцийн бүртгэлийн segment-үүд")
+    parser.add_argument("--dir", default=ATTENDANCE_DIR)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats")
+    sub.add_parser("verify", help="хаагдсан segment-үүдийн checksum шалгах")
+    p = sub.add_parser("migrate", help="хуучин нэг файлыг segment болгох")
+    p.add_argument("--legacy", default=LEGACY_LOG)
+    p = sub.add_parser("summary")
+    p.add_argument("--since", help="YYYY-MM-DD")
+    p.add_argument("--until", help="YYYY-MM-DD (орохгүй)")
+    p.add_argument("--name")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "migrate":
+        log = AttendanceLog(args.dir, legacy=args.legacy)
+        report = log.stats()
+    else:
+        log = AttendanceLog(args.dir, legacy=None, readonly=True)
+        if args.cmd == "stats":
+            report = log.stats()
+        elif args.cmd == "verify":
+            report = log.verify()
+        else:
+            since = args.since and args.since + " 00:00:00"
+            until = args.until and args.until + " 00:00:00"
+            end = min(time.time(), to_epoch(until)) if until else None
+            report = sorted(finalize(log.summary(since, until, args.name), end=end).values(),
+                            key=lambda w: w["name"])
+    log.close()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 0 if args.cmd != "verify" or all(r["ok"] for r in report) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
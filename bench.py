@@ -0,0 +1,318 @@
+# =============================================
+# Царай таних замын benchmark (headless)
+# =============================================
+# Бичигдсэн клипүүдийг recognize_once-той ЯГ ижил detection (FaceDetector) →
+# encoding (face_encodings) → matching (FaceIndex.match) кодоор GUI-гүйгээр дамжуулна.
+# Gallery-д core.reload_faces шиг thresholds.json-ийн хүн бүрийн босгыг (FaceIndex.calibrate)
+# тавина – --tolerance нь тохируулаагүй үеийн анхдагч; --uncalibrated бол зөвхөн --tolerance.
+#
+# Өгөгдлийн бүтэц:
+#   clips/<нэр>/<клип>.mp4          – тухайн ажилтны бичлэг
+#   clips/<нэр>/<клип>/0001.jpg ...  – эсвэл зургийн дараалал
+#   clips/_unknown/...               – бүртгэлгүй хүмүүс (false accept шалгана)
+# <нэр> нь known_faces дахь нэртэй ижил байна ("_" → зай).
+#
+# Ажиллуулах:
+#   python bench.py clips/ --sizes 10,100,1000,10000 --out results/pi4_v1.json
+#   python bench.py --compare results/pi4_v1.json results/pi4_v2.json
+#   python bench.py clips/ --profiles fast-checkin,balanced,accurate-enroll,low-power-idle
+#
+# Профайл бүр (profiles.py) клипүүдийг өөрийн detector/upsample/landmark/jitters-ээр дахин
+# дамжуулна: latency, TAR/FAR, таних хүртэлх хугацаа профайл × gallery хэмжээгээр гарна.
+# FAR = _unknown клипээс хүлээн авсан / _unknown клип; бүртгэлтэй хүнийг өөр хүн гэж таньсан нь
+# misidentification_rate (version 3; өмнөх файлуудын FAR хоёуланг бүх клипэд хуваасан).
+# Мөн gallery-ийн зургийг тэр профайлаар encode хийх хугацаа (load/enroll-ийн өртөг).
+#
+# Gallery-г N хүртэл бодит encoding-уудын тархалтаас үүсгэсэн хиймэл
+# encoding-уудаар дүүргэнэ – matching-ийн өртөг, false accept N-ээс хэрхэн
+# хамаарахыг харуулна.
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import resource
+import socket
+import sys
+import time
+
+import face_recognition
+import numpy as np
+
+import assets
+import profiles
+import thresholds
+from detection import DEFAULT_STAGES, FaceDetector, iter_frames
+from recognition import TOLERANCE, FaceIndex, load_known_faces
+from workers import KNOWN_FACES_DIR
+
+UNKNOWN_DIR = "_unknown"
+STAGES = ("detect", "encode", "match")
+GALLERY_SAMPLE = 20   # профайл бүрээр encode хийж хэмжих gallery зургийн тоо
+
+
+def percentiles(values, points=(50, 90, 95, 99)):
+    if not values:
+        return {f"p{p}": None for p in points}
+    ordered = sorted(values)
+    out = {}
+    for p in points:
+        k = max(0, min(len(ordered) - 1, math.ceil(p / 100.0 * len(ordered)) - 1))   # nearest-rank
+        out[f"p{p}"] = round(ordered[k] * 1000, 3)   # ms
+    out["mean"] = round(sum(ordered) / len(ordered) * 1000, 3)
+    return out
+
+
+def find_clips(root):
+    # → [(expected_name эсвэл None, clip_path)]
+    clips = []
+    for identity in sorted(os.listdir(root)):
+        folder = os.path.join(root, identity)
+        if not os.path.isdir(folder):
+            continue
+        expected = None if identity == UNKNOWN_DIR else identity.replace("_", " ")
+        for clip in sorted(os.listdir(folder)):
+            clips.append((expected, os.path.join(folder, clip)))
+    return clips
+
+
+def synthetic_gallery(real_encodings, real_names, size, seed=0):
+    # Бодит encoding-ууд + тэдний дундаж/хазайлтаас үүсгэсэн хиймэл "ажилтнууд"
+    real = np.asarray(real_encodings, dtype=np.float64).reshape(-1, 128)
+    index = FaceIndex(real, real_names)
+    extra = size - len(real_names)
+    if extra <= 0:
+        return index
+    rng = np.random.default_rng(seed)
+    if len(real) >= 2:
+        mean, std = real.mean(axis=0), real.std(axis=0) + 1e-3
+    else:
+        mean, std = np.zeros(128), np.full(128, 0.09)
+    fake = rng.normal(mean, std, size=(extra, 128))
+    index.matrix = np.vstack([index.matrix, fake])
+    index.names.extend(f"synthetic_{i}" for i in range(extra))
+    return index
+
+
+def run_pipeline(clips, detector, limit=None, profile=None):
+    # Detection + encoding нь gallery-ийн хэмжээнээс хамаарахгүй тул нэг л удаа
+    # ажиллуулаад frame бүрийн encoding, хугацааг хадгална.
+    profile = profile or profiles.for_path("checkin")
+    detector.use(profile)
+    frames = []
+    for expected, path in clips:
+        for i, (_, rgb) in enumerate(iter_frames(path, limit)):
+            t0 = time.perf_counter()
+            locations = detector.locations(rgb)
+            t1 = time.perf_counter()
+            encodings = face_recognition.face_encodings(rgb, locations, profile.jitters, profile.landmarks) \
+                if locations else []
+            t2 = time.perf_counter()
+            frames.append({"clip": path, "expected": expected, "frame": i,
+                           "detect": t1 - t0, "encode": t2 - t1, "encodings": encodings})
+    return frames
+
+
+def evaluate(frames, index, tolerance):
+    timings = {stage: [] for stage in STAGES}
+    totals = []
+    clips = {}
+    for f in frames:
+        t0 = time.perf_counter()
+        names = [index.match(enc, tolerance)[0] for enc in f["encodings"]]
+        match = time.perf_counter() - t0
+        timings["detect"].append(f["detect"])
+        timings["encode"].append(f["encode"])
+        timings["match"].append(match)
+        total = f["detect"] + f["encode"] + match
+        totals.append(total)
+
+        c = clips.setdefault(f["clip"], {"expected": f["expected"], "elapsed": 0.0,
+                                         "decision": None, "frames_to_decision": None,
+                                         "time_to_decision": None})
+        c["elapsed"] += total
+        accepted = [n for n in names if n != "Unknown"]
+        if c["decision"] is None and accepted:
+            c["decision"] = accepted[0]
+            c["frames_to_decision"] = f["frame"] + 1
+            c["time_to_decision"] = c["elapsed"]
+
+    genuine = [c for c in clips.values() if c["expected"] is not None]
+    impostor = [c for c in clips.values() if c["expected"] is None]
+    true_accepts = [c for c in genuine if c["decision"] == c["expected"]]
+    # FAR – бүртгэлгүй хүнийг хэн нэгэн гэж хүлээн авсан; бүртгэлтэй хүнийг өөр хүн гэж
+    # таньсан нь тусдаа (misidentification) – хоёуланг нэг хуваарьт холибол FAR бүдгэрнэ
+    false_accepts = [c for c in impostor if c["decision"] is not None]
+    misidentified = [c for c in genuine if c["decision"] is not None and c["decision"] != c["expected"]]
+    frame_time = sum(totals)
+    return {
+        "gallery_size": len(index),
+        "latency_ms": {stage: percentiles(v) for stage, v in timings.items()},
+        "frame_ms": percentiles(totals),
+        "fps": round(len(totals) / frame_time, 2) if frame_time else None,
+        "clips": len(clips),
+        "genuine_clips": len(genuine),
+        "impostor_clips": len(impostor),
+        "true_accept_rate": round(len(true_accepts) / len(genuine), 4) if genuine else None,
+        "false_accept_rate": round(len(false_accepts) / len(impostor), 4) if impostor else None,
+        "misidentification_rate": round(len(misidentified) / len(genuine), 4) if genuine else None,
+        "time_to_recognize_ms": percentiles([c["time_to_decision"] for c in true_accepts]),
+        "frames_to_recognize_mean": round(sum(c["frames_to_decision"] for c in true_accepts) / len(true_accepts), 2)
+        if true_accepts else None,
+        "index_bytes": int(index.matrix.nbytes),
+    }
+
+
+def host_info():
+    model = ""
+    try:
+        with open("/proc/device-tree/model", "rb") as f:
+            model = f.read().decode(errors="ignore").strip("\x00").strip()
+    except OSError:
+        pass
+    return {"hostname": socket.gethostname(), "machine": platform.machine(),
+            "model": model, "python": platform.python_version(), "cpus": os.cpu_count()}
+
+
+def rss_mb():
+    # Одоогийн RSS (/proc/self/statm-ийн 2 дахь талбар, хуудсаар). ru_maxrss нь оргил –
+    # том gallery-ийн дараах профайл/N бүгд ижил харагдана.
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024, 1)
+
+
+def peak_rss_mb():
+    # Linux дээр ru_maxrss нь KB
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def gallery_encode_cost(folder, profile, sample=GALLERY_SAMPLE):
+    # Gallery-ийн эхний sample зургийг профайлаар encode (chip бол jitters л нөлөөлнө) → мс/зураг
+    folder = folder or KNOWN_FACES_DIR
+    files = sorted(os.listdir(folder))[:sample] if os.path.isdir(folder) else []
+    times = []
+    for file in files:
+        rgb = face_recognition.load_image_file(os.path.join(folder, file))
+        t0 = time.perf_counter()
+        assets.encode_image(rgb, profile)
+        times.append(time.perf_counter() - t0)
+    return percentiles(times, (50, 95))
+
+
+def benchmark(clips_root, sizes, stages, gallery=None, tolerance=TOLERANCE, limit=None, profile_names=None,
+              calibration=None):
+    real_encodings, real_names = load_known_faces(gallery) if gallery else load_known_faces()
+    clips = find_clips(clips_root)
+    profile_names = profile_names or [profiles.PATH_PROFILES["checkin"]]
+
+    results, per_profile = [], {}
+    frames = []
+    for name in profile_names:
+        profile = profiles.get(name)
+        detector = FaceDetector(stages)   # MotionGate төлөв профайл хооронд холилдохгүй
+        t0 = time.perf_counter()
+        frames = run_pipeline(clips, detector, limit, profile)
+        per_profile[name] = {"settings": profile._asdict(),
+                             "pipeline_seconds": round(time.perf_counter() - t0, 3),
+                             "detector_stats": detector.stats,
+                             "gallery_encode_ms": gallery_encode_cost(gallery, profile)}
+        for size in sizes:
+            index = synthetic_gallery(real_encodings, real_names, size)
+            index.calibrate(calibration or {})   # live match-тай ижил босго
+            result = evaluate(frames, index, tolerance)
+            result["profile"] = name
+            result["rss_mb"] = rss_mb()
+            results.append(result)
+            print(f"{name:>16} N={size:>6}: {result['fps']} FPS, "
+                  f"detect p95={result['latency_ms']['detect']['p95']} ms, "
+                  f"encode p95={result['latency_ms']['encode']['p95']} ms, "
+                  f"TAR={result['true_accept_rate']}, FAR={result['false_accept_rate']}, "
+                  f"misid={result['misidentification_rate']}", file=sys.stderr)
+
+    return {
+        "version": 3,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "host": host_info(),
+        "settings": {"clips": clips_root, "stages": [s for s in stages if s and s != "none"],
+                     "tolerance": tolerance, "enrolled": len(real_names), "frame_limit": limit,
+                     "calibration": {"global": (calibration or {}).get("global"),
+                                     "identities": len((calibration or {}).get("identities", {}))}},
+        "frames": len(frames),
+        "profiles": per_profile,
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    }
+
+
+def compare(old_path, new_path):
+    # Хоёр ажиллагааны гол үзүүлэлтийг gallery хэмжээ бүрээр харьцуулна
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    # version 1 файлд профайл байхгүй – ижил N-тэй бүх профайлтай харьцуулна
+    old_by_key = {(r.get("profile"), r["gallery_size"]): r for r in old["results"]}
+    print(f"{'profile':<16} {'N':>6} {'metric':<22} {'old':>10} {'new':>10} {'Δ%':>8}")
+    for r in new["results"]:
+        o = old_by_key.get((r.get("profile"), r["gallery_size"])) or old_by_key.get((None, r["gallery_size"]))
+        if not o:
+            continue
+        rows = [("fps", o["fps"], r["fps"]),
+                ("frame p95 ms", o["frame_ms"]["p95"], r["frame_ms"]["p95"]),
+                ("match p95 ms", o["latency_ms"]["match"]["p95"], r["latency_ms"]["match"]["p95"]),
+                ("TAR", o["true_accept_rate"], r["true_accept_rate"]),
+                ("FAR", o["false_accept_rate"], r["false_accept_rate"]),
+                ("misid", o.get("misidentification_rate"), r["misidentification_rate"]),
+                ("time_to_recognize p50", o["time_to_recognize_ms"]["p50"], r["time_to_recognize_ms"]["p50"])]
+        for metric, a, b in rows:
+            delta = f"{(b - a) / a * 100:+.1f}" if a and b is not None else "-"
+            print(f"{r.get('profile') or '-':<16} {r['gallery_size']:>6} {metric:<22} {a!s:>10} {b!s:>10} {delta:>8}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Царай таних замын benchmark")
+    parser.add_argument("clips", nargs="?", help="clips/<нэр>/... бүтэцтэй хавтас")
+    parser.add_argument("--sizes", default="10,100,1000,10000")
+    parser.add_argument("--stages", default=",".join(DEFAULT_STAGES))
+    parser.add_argument("--gallery", help="known_faces хавтас (анхдагч: known_faces)")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--thresholds", default=thresholds.THRESHOLDS_FILE, help="хүн бүрийн босго (thresholds.py)")
+    parser.add_argument("--uncalibrated", action="store_true", help="thresholds.json-ийг үл тоомсорлох")
+    parser.add_argument("--limit", type=int, help="клип бүрээс авах frame-ийн дээд тоо")
+    parser.add_argument("--profiles", default=profiles.PATH_PROFILES["checkin"],
+                        help=f"таслалаар: {', '.join(profiles.PROFILES)} эсвэл all")
+    parser.add_argument("--out", help="JSON үр дүнг бичих файл (анхдагч: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+    if not args.clips:
+        parser.error("clips хавтас өгнө үү")
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    stages = [s for s in args.stages.split(",") if s]
+    names = list(profiles.PROFILES) if args.profiles == "all" else [p for p in args.profiles.split(",") if p]
+    for name in names:
+        if name not in profiles.PROFILES:
+            parser.error(f"'{name}' профайл алга ({', '.join(profiles.PROFILES)})")
+    calibration = {} if args.uncalibrated else thresholds.load(args.thresholds)
+    report = benchmark(args.clips, sizes, stages, args.gallery, args.tolerance, args.limit, names, calibration)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
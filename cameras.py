@@ -0,0 +1,305 @@
+# =============================================
+# Олон камер / олон хаалга – нэг core, нэг царайн индекс, нэг ирцийн бүртгэл
+# =============================================
+# Камер бүр өөрийн thread, FramePacer, FaceDetector (MotionGate төлөвтэй тул тусдаа),
+# PresenceTracker-тэй. Detection-ий профайл (profiles.py): царай харагдаагүй idle үед "idle",
+# бусад үед "checkin". Царайн индекс (core.face_index) ба ирц (core.checkin) нийтлэг.
+# Event бүрт "camera" талбар орно.
+#
+# Үүрэг (role):
+#   "kiosk"  – GUI-ийн preview-д on-demand; бүртгэлийг хүн "Бүртгэх" дарж баталгаажуулна
+#   "in"     – орох хаалга: үргэлж ажиллаж, танигдсан хүнийг IN гэж бүртгэнэ
+#   "out"    – гарах хаалга: OUT
+#   "toggle" – нэг хаалга: ирээгүй бол IN, ирсэн бол OUT (kiosk-ийн адил)
+#
+# Багтаамж тооцох (нэг Pi хэдэн урсгал даах вэ):
+#   python cameras.py clip.mp4 --fps 2,5,10,15
+import collections
+import math
+import os
+import threading
+import time
+
+import cv2
+
+import metrics
+import profiles
+from detection import DEFAULT_STAGES, FaceDetector
+from frames import FrameConverter, FramePacer
+from recognition import TOLERANCE, match_faces, recognize_frame
+
+RECENT_FRAMES = 30     # save_pending_photo-д зориулж хадгалах сүүлийн frame
+PINNED_FRAMES = 4      # GUI-ийн барьж авсан frame (check-in-ийн нотлох зураг)
+ROLE_ACTION = {"in": "IN", "out": "OUT", "toggle": None}
+CONFIRM_DETECTIONS = 3    # дараалсан хэдэн detection-д танигдвал бүртгэх
+CHECKIN_COOLDOWN = 60.0   # нэг камер нэг хүнийг дахин бүртгэхээс өмнө хүлээх секунд
+
+
+class PresenceTracker:
+    # Нэг frame-ийн алдаатай танилтаар бүртгэхгүй: нэр confirm удаа дараалан
+    # танигдах ёстой; бүртгэгдсэний дараа cooldown хугацаанд дахин бүртгэхгүй.
+    def __init__(self, confirm=CONFIRM_DETECTIONS, cooldown=CHECKIN_COOLDOWN):
+        self.confirm = confirm
+        self.cooldown = cooldown
+        self.hits = collections.Counter()
+        self.fired = {}   # name → сүүлд бүртгэсэн цаг
+
+    def update(self, names, now=None):
+        # → одоо бүртгэх нэрс
+        now = time.time() if now is None else now
+        seen = {n for n in names if n != "Unknown"}
+        for name in list(self.hits):
+            if name not in seen:
+                del self.hits[name]
+        confirmed = []
+        for name in seen:
+            self.hits[name] += 1
+            if self.hits[name] >= self.confirm and now - self.fired.get(name, 0.0) >= self.cooldown:
+                self.fired[name] = now
+                confirmed.append(name)
+        return confirmed
+
+
+class CameraWorker:
+    # Камерыг өөрийн thread дээр уншиж, detection/танилтыг хийж frame event гаргана.
+    # Хэмнэл frames.FramePacer – idle үед бага FPS, удаан detection-д stride.
+    def __init__(self, core, camera_id, source, role="kiosk", stages=DEFAULT_STAGES, capture=cv2.VideoCapture):
+        self.core = core
+        self.capture = capture   # source → cv2.VideoCapture-тэй ижил объект (soak.SimCapture)
+        self.camera_id = camera_id
+        self.source = source
+        self.role = role
+        self.mode = None
+        self.ok = None
+        self.fps = 0.0
+        self.detector = FaceDetector(stages)
+        self.tracker = PresenceTracker()
+        self.recent = collections.deque(maxlen=RECENT_FRAMES)
+        self.pinned = collections.OrderedDict()   # seq → rgb
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()
+
+    def start(self, mode="recognize"):
+        with self._lock:
+            self.mode = mode
+            if self._running:
+                return
+            previous = self._thread
+        if previous is not None:
+            previous.join(timeout=2)   # өмнөх thread камерыг суллатал хүлээнэ
+        with self._lock:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True, name=f"camera-{self.camera_id}")
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            thread = self._thread
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=2)
+
+    @property
+    def running(self):
+        return self._running
+
+    def frame(self, seq):
+        if seq in self.pinned:
+            return self.pinned[seq]
+        for s, rgb in list(self.recent):
+            if s == seq:
+                return rgb
+        return None
+
+    def pin(self, seq):
+        rgb = self.frame(seq)
+        if rgb is None:
+            return False
+        self.pinned[seq] = rgb
+        while len(self.pinned) > PINNED_FRAMES:
+            self.pinned.popitem(last=False)
+        return True
+
+    def _run(self):
+        cap = self.capture(self.source)
+        self._set_ok(cap.isOpened())
+        pacer = FramePacer()
+        converter = FrameConverter(mirror=True)
+        seq = 0
+        faces = []
+        bgr = None
+        pool = None
+        newest = 0   # хамгийн сүүлд хэрэглэсэн pool үр дүнгийн seq (үр дүн дараалалгүй ирнэ)
+        inflight = {}   # pool seq → илгээсэн frame-ийн rgb
+        started = time.perf_counter()
+        try:
+            while self._running:
+                t0 = time.perf_counter()
+                slot = view = None
+                if pool is not None and self.mode == "recognize":
+                    slot, view = pool.acquire()   # бүх slot завгүй бол энэ frame detection-гүй
+                ret, frame = cap.read(view if slot is not None else bgr)
+                self._set_ok(ret)
+                if slot is not None and (not ret or frame is not view):
+                    pool.release(slot)
+                    slot = None
+                if not ret:
+                    time.sleep(0.2)
+                    continue
+                if slot is None:
+                    bgr = frame
+                rgb = converter.convert(frame).copy()   # subscriber-уудад өөрийн хуулбар
+                latency = None
+                profile = profiles.for_path("idle" if pacer.idle else "checkin")
+                if pool is not None and self.mode == "recognize":
+                    if slot is not None:
+                        # worker ring-ээс шууд уншина; rgb – танихгүй царайн зургийг зөв frame-ээс тайрахад
+                        inflight[pool.submit(slot, tag=self.camera_id, profile=profile.name)] = rgb
+                    for result in pool.collect(tag=self.camera_id):
+                        latency = result.seconds
+                        pacer.record_detection(latency, bool(result.boxes))
+                        if result.seq > newest:
+                            newest = result.seq
+                            source = inflight.get(result.seq, rgb)
+                            for s in [s for s in inflight if s <= newest]:
+                                del inflight[s]
+                            matched = match_faces(result.boxes, result.encodings, self.core.face_index,
+                                                  TOLERANCE, self.core.unknowns, source, self.camera_id,
+                                                  self.core.distances)
+                            faces = [[list(box), name] for box, name, _ in matched]
+                elif pacer.detect_due():
+                    d0 = time.perf_counter()
+                    self.detector.use(profile)
+                    if self.mode == "recognize":
+                        results = recognize_frame(rgb, self.detector, self.core.face_index, TOLERANCE,
+                                                  unknowns=self.core.unknowns, camera=self.camera_id,
+                                                  distances=self.core.distances, profile=profile)
+                        faces = [[list(box), name] for box, name, _ in results]
+                    else:
+                        with metrics.timer("face_locations_seconds"):
+                            faces = [[list(box), "Unknown"] for box in self.detector.locations(rgb)]
+                    latency = time.perf_counter() - d0
+                    pacer.record_detection(latency, bool(faces))
+                if latency is not None and self.role in ROLE_ACTION:
+                    for name in self.tracker.update([name for _, name in faces]):
+                        box = next(b for b, n in faces if n == name)
+                        self.core.checkin(name, camera=self.camera_id, action=ROLE_ACTION[self.role],
+                                          rgb=rgb, box=box)
+                seq += 1
+                self.fps = seq / max(1e-6, time.perf_counter() - started)
+                self.recent.append((seq, rgb))
+                self.core.emit({"type": "frame", "camera": self.camera_id, "seq": seq, "rgb": rgb,
+                                "faces": faces, "latency": latency, "mode": self.mode})
+                if pool is None and self.mode == "recognize":
+                    pool = self.core.inference_pool(frame.shape)
+                    newest = pool.submitted if pool else 0   # өмнөх preview-ийн үлдэгдлийг үл тооно
+                time.sleep(pacer.record_tick(time.perf_counter() - t0))
+        finally:
+            cap.release()
+
+    def _set_ok(self, ok):
+        if ok != self.ok:
+            self.ok = ok
+            self.core.emit({"type": "camera", "camera": self.camera_id, "role": self.role, "ok": ok})
+
+
+class CameraManager:
+    # cameras: {"kiosk": {"source": 0, "role": "kiosk"}, "entrance": {"source": 1, "role": "in"}, ...}
+    def __init__(self, core, cameras, stages=DEFAULT_STAGES, capture=cv2.VideoCapture):
+        self.workers = {
+            camera_id: CameraWorker(core, camera_id, cfg["source"], cfg.get("role", "kiosk"), stages, capture)
+            for camera_id, cfg in cameras.items()
+        }
+        kiosks = [c for c, w in self.workers.items() if w.role == "kiosk"]
+        self.kiosk = kiosks[0] if kiosks else next(iter(self.workers))
+
+    def get(self, camera_id=None):
+        return self.workers[camera_id or self.kiosk]
+
+    def start_auto(self):
+        # Хаалганы камерууд GUI-гээс үл хамааран үргэлж таньж байна
+        for worker in self.workers.values():
+            if worker.role != "kiosk":
+                worker.start("recognize")
+
+    def stop_all(self):
+        for worker in self.workers.values():
+            worker.stop()
+
+    def status(self):
+        return {camera_id: {"role": w.role, "ok": w.ok, "running": w.running, "fps": round(w.fps, 1)}
+                for camera_id, w in self.workers.items()}
+
+
+# =============================================
+# Багтаамжийн тооцоо: урсгал бүрийн CPU → нэг хост хэдэн урсгал даах
+# =============================================
+def measure_costs(source, stages=DEFAULT_STAGES, limit=None):
+    # Frame бүрийн дундаж CPU секунд: хөрвүүлэлт, detection+encoding (gate-тэй),
+    # мөн царайтай frame-үүд дээрх (хаалганы өмнө хүн тасралтгүй байх хамгийн муу тохиолдол)
+    import face_recognition
+
+    from detection import iter_frames
+
+    profile = profiles.for_path("checkin")
+    detector = FaceDetector(stages).use(profile)
+    converter = FrameConverter(mirror=True)
+    convert_cpu, detect_cpu, busy_cpu = [], [], []
+    for _, rgb in iter_frames(source, limit):
+        bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+        c0 = time.process_time()
+        converter.convert(bgr).copy()
+        c1 = time.process_time()
+        boxes = detector.locations(rgb)
+        if boxes:
+            face_recognition.face_encodings(rgb, boxes, profile.jitters, profile.landmarks)
+        c2 = time.process_time()
+        convert_cpu.append(c1 - c0)
+        detect_cpu.append(c2 - c1)
+        if boxes:
+            busy_cpu.append(c2 - c1)
+    if not detect_cpu:
+        raise SystemExit(f"{source}: frame олдсонгүй")
+    mean = lambda xs: sum(xs) / len(xs) if xs else 0.0
+    return {"frames": len(detect_cpu), "convert_s": mean(convert_cpu),
+            "detect_s": mean(detect_cpu), "detect_busy_s": mean(busy_cpu) or mean(detect_cpu)}
+
+
+def plan(costs, fps_list, cores=None, budget=0.8, pool_workers=None):
+    # budget – CPU-ийн хэдэн хувийг камеруудад зориулах (GUI, DHT, дуунд үлдээнэ).
+    # Pool-гүй (KIOSK_INFERENCE_WORKERS=0) үед dlib GIL-ийг барьдаг гэж үзээд 1 core-оор тооцно.
+    cores = cores or os.cpu_count() or 1
+    pool_cores = min(cores, pool_workers or cores)
+    rows = []
+    for fps in fps_list:
+        typical = fps * (costs["convert_s"] + costs["detect_s"])      # core-секунд / секунд
+        busy = fps * (costs["convert_s"] + costs["detect_busy_s"])
+        rows.append({
+            "fps": fps,
+            "stream_cpu_pct": round(100 * typical, 1),
+            "stream_cpu_busy_pct": round(100 * busy, 1),
+            "max_streams_single_process": math.floor(budget / busy) if busy else None,
+            "max_streams_pool": math.floor(budget * pool_cores / busy) if busy else None,
+            "max_streams_pool_typical": math.floor(budget * pool_cores / typical) if typical else None,
+        })
+    return {"cores": cores, "budget": budget, "pool_cores": pool_cores, "rows": rows}
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Нэг хост хэдэн камерын урсгал даах вэ")
+    parser.add_argument("source", help="видео файл эсвэл зурагнуудын хавтас (хаалганы бичлэг)")
+    parser.add_argument("--fps", default="2,5,10,15", help="урсгал бүрийн шинжилгээний FPS")
+    parser.add_argument("--stages", default=",".join(DEFAULT_STAGES))
+    parser.add_argument("--cores", type=int, help="зорилтот хостын core (анхдагч: энэ хост)")
+    parser.add_argument("--budget", type=float, default=0.8)
+    parser.add_argument("--workers", type=int, help="KIOSK_INFERENCE_WORKERS")
+    parser.add_argument("--limit", type=int)
+    args = parser.parse_args()
+    costs = measure_costs(args.source, [s for s in args.stages.split(",") if s], args.limit)
+    result = plan(costs, [float(f) for f in args.fps.split(",")], args.cores, args.budget, args.workers)
+    result["costs_ms"] = {k: (round(v * 1000, 2) if k != "frames" else v) for k, v in costs.items()}
+    print(json.dumps(result, indent=2, ensure_ascii=False))
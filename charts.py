@@ -0,0 +1,84 @@
+# =============================================
+# Температур/чийгшлийн график (GUI) – tk.Canvas, нэмэлт сан хэрэггүй
+# =============================================
+# core.sensor_history()-ийн үр дүнг зурна: температурын min–max мужаар бүдэг тууз,
+# дундаж шугам, чийгшил (баруун тэнхлэг), дүрмийн босго, релений асаалттай үеийг доор
+# өнгөт зурвасаар. Дахин зурахад canvas-ийг цэвэрлээд л зурна (шинэ widget үүсгэхгүй).
+import time
+import tkinter as tk
+
+PAD_LEFT, PAD_RIGHT, PAD_TOP, PAD_BOTTOM = 56, 56, 16, 28
+RELAY_BAND = 14
+COLORS = {"temp": "#FFAA00", "band": "#5a4520", "hum": "#33AAFF", "grid": "#333333",
+          "text": "#BBBBBB", "threshold": "#FF4444"}
+RELAY_COLORS = ("#00AA33", "#AA00FF", "#0066FF", "#FF8800")
+
+
+class SensorChart:
+    def __init__(self, parent, width=860, height=420, bg="#1e1e2e"):
+        self.width = width
+        self.height = height
+        self.canvas = tk.Canvas(parent, width=width, height=height, bg=bg, highlightthickness=0)
+
+    def draw(self, result, threshold=None, relay_names=None):
+        c = self.canvas
+        c.delete("all")
+        series = result["series"]
+        start, end = result["start"], result["end"]
+        relays = sorted({e["name"] for e in result["relays"]} | set(result["relays_at_start"]))
+        plot_bottom = self.height - PAD_BOTTOM - RELAY_BAND * len(relays)
+        if not series:
+            c.create_text(self.width / 2, self.height / 2, text="Өгөгдөл алга", fill=COLORS["text"],
+                          font=("Noto Sans CJK JP", 18))
+            return
+        temps = [p["t_min"] for p in series] + [p["t_max"] for p in series]
+        if threshold is not None:
+            temps.append(threshold)
+        t_lo, t_hi = min(temps) - 1, max(temps) + 1
+        hums = [p["h_avg"] for p in series if p["h_avg"] is not None]
+        h_lo, h_hi = (min(hums) - 5, max(hums) + 5) if hums else (0, 100)
+
+        x = lambda ts: PAD_LEFT + (ts - start) / max(1e-6, end - start) * (self.width - PAD_LEFT - PAD_RIGHT)
+        yt = lambda t: plot_bottom - (t - t_lo) / (t_hi - t_lo) * (plot_bottom - PAD_TOP)
+        yh = lambda h: plot_bottom - (h - h_lo) / max(1e-6, h_hi - h_lo) * (plot_bottom - PAD_TOP)
+
+        # Тэнхлэг, сүлжээ
+        for i in range(5):
+            t = t_lo + (t_hi - t_lo) * i / 4
+            h = h_lo + (h_hi - h_lo) * i / 4
+            c.create_line(PAD_LEFT, yt(t), self.width - PAD_RIGHT, yt(t), fill=COLORS["grid"])
+            c.create_text(PAD_LEFT - 6, yt(t), text=f"{t:.1f}°", anchor="e", fill=COLORS["temp"])
+            c.create_text(self.width - PAD_RIGHT + 6, yt(t), text=f"{h:.0f}%", anchor="w", fill=COLORS["hum"])
+        fmt = "%H:%M" if end - start <= 2 * 86400 else "%m-%d"
+        for i in range(5):
+            ts = start + (end - start) * i / 4
+            c.create_text(x(ts), self.height - 8, text=time.strftime(fmt, time.localtime(ts)), fill=COLORS["text"])
+
+        # Температурын min–max тууз + дундаж
+        if len(series) > 1:
+            band = [(x(p["ts"]), yt(p["t_max"])) for p in series] + \
+                   [(x(p["ts"]), yt(p["t_min"])) for p in reversed(series)]
+            c.create_polygon(*[v for point in band for v in point], fill=COLORS["band"], outline="")
+            c.create_line(*[v for p in series for v in (x(p["ts"]), yt(p["t_avg"]))], fill=COLORS["temp"], width=2)
+            points = [v for p in series if p["h_avg"] is not None for v in (x(p["ts"]), yh(p["h_avg"]))]
+            if len(points) >= 4:
+                c.create_line(*points, fill=COLORS["hum"], width=1)
+        if threshold is not None:
+            c.create_line(PAD_LEFT, yt(threshold), self.width - PAD_RIGHT, yt(threshold),
+                          fill=COLORS["threshold"], dash=(4, 3))
+
+        # Реле: асаалттай үе бүрийг өөрийн мөрөнд
+        for row, name in enumerate(relays):
+            y0 = plot_bottom + 4 + row * RELAY_BAND
+            color = RELAY_COLORS[row % len(RELAY_COLORS)]
+            label = (relay_names or {}).get(name, name)
+            c.create_text(PAD_LEFT - 6, y0 + RELAY_BAND / 2 - 2, text=label, anchor="e", fill=color)
+            on_since = start if result["relays_at_start"].get(name) else None
+            for e in sorted((e for e in result["relays"] if e["name"] == name), key=lambda e: e["ts"]):
+                if e["on"] and on_since is None:
+                    on_since = e["ts"]
+                elif not e["on"] and on_since is not None:
+                    c.create_rectangle(x(on_since), y0, x(e["ts"]), y0 + RELAY_BAND - 4, fill=color, outline="")
+                    on_since = None
+            if on_since is not None:
+                c.create_rectangle(x(on_since), y0, x(end), y0 + RELAY_BAND - 4, fill=color, outline="")
@@ -0,0 +1,528 @@
+# =============================================
+# Kiosk core – GUI-гүй үйлчилгээ (GPIO, камер, таних, ирц, автомат удирдлага)
+# =============================================
+# Хоёр горимтой:
+#   1) python core.py          → daemon; GUI (main.py) Unix socket-оор холбогдоно.
+#                                GUI гацсан/дахин эхэлсэн ч ирц, реле, автомат ажиллана.
+#   2) main.py daemon олдохгүй бол KioskCore-ийг өөрийн процесс дотор эхлүүлнэ.
+# Аль ч горимд GUI ижил API (ipc.COMMANDS) ба ижил event-үүдийг авна:
+#   {"type": "relay", "name", "on", "source"}
+#   {"type": "sensor", "temperature", "humidity"}
+#   {"type": "checkin", "action": "IN"|"OUT", "name", "ts", "camera"}
+#   {"type": "voice", "text", "intents"}
+# relay/sensor/checkin/voice нь events.EventBus-ийн "notify" subscriber-ээс (journal-д бичигдсэний дараа).
+#   {"type": "frame", "camera", "seq", "rgb", "faces": [[box, name], ...], "latency"}
+#   {"type": "camera", "camera", "role", "ok"}
+#   {"type": "core", "connected"}          – зөвхөн ipc.CoreClient (daemon тасрах/сэргэх)
+import base64
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+import metrics
+import profiles
+import rules
+import thresholds
+from api import API_PORT, ApiServer
+from assets import PendingGC, sample_chip, save_sample
+from attendance import AttendanceLog
+from cameras import CameraManager
+from events import CheckIn, CheckOut, EventBus, RelayChanged, SensorReading, VoiceCommand, to_dict
+from evidence import EvidenceStore
+from history import SensorHistory, relay_correlation
+from inference import InferencePool
+from recognition import TOLERANCE, FaceIndex, encode_file, load_known_faces
+from relays import RelayManager
+from sync import HUB_URL, SYNC_DIR, SyncAgent, decode_vector, encode_vector
+from unknowns import UnknownCache
+from workers import data_path, move_samples, remove_worker, same_name, sample_paths, save_worker_data
+
+CORE_SOCKET = os.environ.get("KIOSK_CORE_SOCKET", "/tmp/kiosk-core.sock")
+
+# =============================================
+# HARDWARE SETUP (DO NOT CHANGE)
+# =============================================
+LIGHT_PIN = 20   # GPIO 20 → Light relay
+FAN_PIN   = 21   # GPIO 21 → Fan relay
+BUZZER_PIN  = 18   # Buzzer → GPIO 18 (safe pin)
+DHT_PIN   = "D2"  # DHT11 on GPIO 2 (board.D2)
+CAMERA_INDEX = 0
+
+# Камерууд (cameras.py). role: "kiosk" – GUI preview, "in"/"out"/"toggle" – хаалганы
+# камер, үргэлж таньж автоматаар бүртгэнэ. source – cv2.VideoCapture-д өгөх индекс/URL.
+#   "entrance": {"source": 1, "role": "in"},
+#   "exit":     {"source": "rtsp://10.0.0.12/stream1", "role": "out"},
+CAMERAS = {
+    "kiosk": {"source": CAMERA_INDEX, "role": "kiosk"},
+}
+
+# Релений тохиргоо. Шинэ реле нэмэхдээ энд мөр нэмнэ:
+#   "pin"   – BCM pin, "name" – дэлгэц/дуунд харагдах нэр,
+#   "beeps" – (асаахад, унтраахад) дуугарах тоо,
+#   "words" – дуут командад танигдах нэрийн синонимууд (үйлдлийн үгс intents.ACTION_PHRASES-д)
+RELAY_DEVICES = {
+    "light": {"pin": LIGHT_PIN, "name": "Гэрэл", "beeps": (1, 2),
+              "words": ["гэрэл", "гэрлээ", "гэрлийг", "light", "lights"]},
+    "fan":   {"pin": FAN_PIN, "name": "Сэнс", "beeps": (2, 1),
+              "words": ["сэнс", "сэнсээ", "сэнсийг", "fan"]},
+}
+
+# Auto fan / light control – дүрмүүд rules.py-ийн DEFAULT_RULES-д
+AUTOMATION_RULES = rules.DEFAULT_RULES
+
+# Царай илрүүлэлтийн cascade: хямд gate-үүд ("motion", "haar", "dnn") эхэлж,
+# dlib HOG зөвхөн тэд зөвшөөрсөн үед/хэсэгт ажиллана. () = зөвхөн dlib.
+DETECTOR_STAGES = tuple(os.environ.get("FACE_GATE_STAGES", "motion,haar").split(","))
+
+# Detection/encoding-ийг хэдэн процесст хуваах (inference.py). 0 = камерын thread дотор.
+# Зөвхөн daemon горимд (python core.py) – spawn хийсэн процесс main.py-г дахин ажиллуулахгүйн тулд.
+INFERENCE_WORKERS = int(os.environ.get("KIOSK_INFERENCE_WORKERS", "0"))
+
+LOG_FILE = "time_logs.txt"   # хуучин нэг файл – эхлэхдээ attendance/ segment-үүд рүү шилжинэ
+REMOTE_FACES = os.path.join(SYNC_DIR, "faces.jsonl")   # бусад киоскоос ирсэн encoding-ууд
+SENSOR_INTERVAL = 5.0
+
+
+class KioskCore:
+    def __init__(self, inference_workers=0, hardware=None):
+        # hardware – soak.SimHardware (GPIO, DHT11, камер дуурайлга); None бол жинхэнэ төхөөрөмж
+        if hardware is None:
+            # Hardware-ийн сангуудыг энд л import хийнэ – thin client (main.py) тэднийг шаардахгүй
+            import RPi.GPIO as GPIO
+            import adafruit_dht
+            import board
+        else:
+            GPIO = hardware.gpio
+
+        self.GPIO = GPIO
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setwarnings(False)
+        GPIO.setup(BUZZER_PIN, GPIO.OUT)
+        GPIO.output(BUZZER_PIN, GPIO.LOW)   # buzzer silent
+        if hardware is None:
+            self.dht_device = adafruit_dht.DHT11(getattr(board, DHT_PIN), use_pulseio=False)
+        else:
+            self.dht_device = hardware.dht
+
+        self._subscribers = []
+        self._sub_lock = threading.Lock()
+        self._beeps = queue.Queue()
+        self.active_workers = {}  # name → timestamp
+        self.last_reading = (None, None)
+        self.history = SensorHistory()   # температур/чийгшил + релений түүх (history.py)
+
+        self.relays = RelayManager(GPIO, {k: v["pin"] for k, v in RELAY_DEVICES.items()})
+        self.automation = rules.RuleEngine(
+            AUTOMATION_RULES,
+            actuator=lambda target, on, rule_name: self.relays.set(target, on, source="auto"),
+            trace_path=os.environ.get("RULES_TRACE"),   # replay-д зориулж оролтуудыг бичнэ
+        )
+        self.relays.subscribe(self._on_relay_change)
+
+        self._checkin_lock = threading.Lock()   # олон камерын thread нэг ирцийн бүртгэлд
+        # KIOSK_HUB_URL тохируулсан бол бүртгэл, ирц hub-аар бусад киосктой синхрончлогдоно
+        self.sync = SyncAgent(HUB_URL, apply=self.apply_remote) if HUB_URL else None
+        self.face_index = FaceIndex()
+        self.unknowns = UnknownCache()   # танигдаагүй царайнууд (unknowns.py)
+        self.distances = thresholds.DistanceLog()   # танилт бүрийн зай – босго тохируулахад
+        self.reload_faces()
+        self.cameras = CameraManager(self, CAMERAS, DETECTOR_STAGES,
+                                     capture=hardware.capture if hardware is not None else cv2.VideoCapture)
+        self.inference_workers = inference_workers
+        self._pools = {}   # frame shape → InferencePool (ижил хэмжээтэй камерууд хуваалцана)
+        self._pool_lock = threading.Lock()
+        self.pending_gc = PendingGC()   # орхигдсон бүртгэлийн зургууд
+        self.evidence = EvidenceStore()   # IN/OUT бүрийн царайн зураг (evidence.py)
+        self.attendance = AttendanceLog(legacy=LOG_FILE)   # сар бүрийн segment (attendance.py)
+        # KIOSK_API_PORT тохируулсан бол HR/байрны системд ирц, presence (api.py)
+        self.api = ApiServer(self, self.attendance) if API_PORT else None
+
+        # Event bus (events.py): checkin/реле/сенсор зөвхөн төлөв өөрчилж journal-д бичнэ,
+        # үр дагавар нь subscriber бүрийн thread дээр. durable – дахин эхлэхэд journal-аас нөхнө;
+        # мөр нэмдэг handler-ууд offset-оо event бүрт хадгална (давхар ирц/түүх бичихгүй).
+        # Automation durable биш: хуучин уншилтыг дахин тоглуулбал реле одоогийн бус төлөвөөр асна.
+        self.bus = EventBus()
+        bus = self.bus
+        bus.subscribe("attendance", self._on_attendance, (CheckIn, CheckOut), durable=True, each_offset=True)
+        bus.subscribe("automation", self._on_automation, (CheckIn, CheckOut, SensorReading), queue_size=16)
+        bus.subscribe("history", self._on_history, (SensorReading, RelayChanged), durable=True, each_offset=True)
+        if self.sync is not None:
+            bus.subscribe("sync", self._on_sync, (CheckIn, CheckOut), durable=True, each_offset=True)
+        bus.subscribe("feedback", self._on_feedback, (CheckIn, CheckOut, RelayChanged), queue_size=16)
+        bus.subscribe("voice", self._on_voice, (VoiceCommand,), queue_size=16)
+        bus.subscribe("notify", lambda event: self.emit(to_dict(event)))   # GUI, IPC, HTTP API
+
+    # ---------- Events ----------
+    def subscribe(self, callback):
+        with self._sub_lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._sub_lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def emit(self, event):
+        with self._sub_lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print("Core subscriber алдаа:", repr(e))
+
+    # ---------- Bus subscriber-ууд (өөр өөрийн thread) ----------
+    def _on_attendance(self, event):
+        self.log_time(event.name, "IN" if isinstance(event, CheckIn) else "OUT", event.camera, ts=event.ts)
+
+    def _on_automation(self, event):
+        if isinstance(event, SensorReading):
+            self.automation.update(temperature=event.temperature, humidity=event.humidity)
+        else:
+            self.automation.update(presence=len(self.active_workers))
+
+    def _on_history(self, event):
+        ts = time.mktime(time.strptime(event.ts, "%Y-%m-%d %H:%M:%S"))
+        if isinstance(event, SensorReading):
+            self.history.add(event.temperature, event.humidity, ts=ts)
+        else:
+            self.history.relay(event.name, event.on, event.source, ts=ts)
+
+    def _on_sync(self, event):
+        if not event.kiosk:   # бусад киоскоос ирснийг буцааж илгээхгүй
+            self.sync.record("attendance", name=event.name, action="IN" if isinstance(event, CheckIn) else "OUT",
+                             ts=event.ts, camera=event.camera)
+
+    def _on_feedback(self, event):
+        if isinstance(event, RelayChanged):
+            device = RELAY_DEVICES[event.name]
+            self.beep(device["beeps"][0] if event.on else device["beeps"][1])
+        elif not event.kiosk:
+            self.beep(1 if isinstance(event, CheckIn) else 2)   # 1 beep = welcome, 2 = goodbye
+
+    def _on_voice(self, event):
+        for device, action in event.intents:
+            self.relay_set(device, action == "on", source="voice")
+
+    def voice_command(self, text, intents):
+        # GUI-ийн таньсан дуут команд – реле voice subscriber дээр
+        self.bus.publish(VoiceCommand(text, [list(i) for i in intents], time.strftime("%Y-%m-%d %H:%M:%S")))
+
+    def start(self):
+        self.bus.start()
+        threading.Thread(target=self._sensor_loop, daemon=True, name="sensor").start()
+        threading.Thread(target=self._buzzer_loop, daemon=True, name="buzzer").start()
+        self.cameras.start_auto()
+        self.unknowns.start(TOLERANCE)
+        self.pending_gc.start()
+        self.evidence.start()
+        self.distances.start()
+        if self.sync is not None:
+            self.sync.start()
+        if self.api is not None:
+            self.api.start()
+        return self
+
+    def close(self):
+        if self.api is not None:
+            self.api.stop()
+        self.cameras.stop_all()
+        self.bus.close()   # subscriber-ууд дараалсанаа дуусгаж offset-оо хадгална
+        self.unknowns.stop()
+        self.pending_gc.stop()
+        self.evidence.close()
+        self.attendance.close()
+        self.distances.stop()
+        self.history.flush()
+        for pool in self._pools.values():
+            pool.close()
+        self.relays.close()
+        self.GPIO.cleanup()
+
+    # ---------- Buzzer ----------
+    def beep(self, times=1, duration=0.08):
+        self._beeps.put((times, duration))
+
+    def _buzzer_loop(self):
+        # Tk thread-ийг sleep-ээр гацаахгүй – дуугаралт өөрийн thread дээр дараалж явна
+        while True:
+            times, duration = self._beeps.get()
+            for _ in range(times):
+                self.GPIO.output(BUZZER_PIN, self.GPIO.HIGH)
+                time.sleep(duration)
+                self.GPIO.output(BUZZER_PIN, self.GPIO.LOW)
+                time.sleep(0.08)
+
+    # ---------- Relays ----------
+    def relay_toggle(self, name, source="manual"):
+        self.relays.toggle(name, source=source)
+
+    def relay_set(self, name, on, source="manual"):
+        self.relays.set(name, on, source=source)
+
+    def relay_states(self):
+        return self.relays.states()
+
+    def _on_relay_change(self, name, on, source):
+        if source != "auto":
+            self.automation.override(name)   # гараар/дуугаар удирдсан бол авто түр зогсоно
+        self.bus.publish(RelayChanged(name, on, source, time.strftime("%Y-%m-%d %H:%M:%S")))
+
+    # ---------- DHT11 ----------
+    @metrics.timed("read_temp_seconds")
+    def read_temp(self):
+        for _ in range(10):
+            try:
+                temp = self.dht_device.temperature
+                hum = self.dht_device.humidity
+                if temp is not None:
+                    return temp, hum
+            except Exception:
+                time.sleep(0.5)
+        return None, None
+
+    def _sensor_loop(self):
+        # Уншилт → SensorReading; дүрмүүд "automation" subscriber дээр (ирцийн өөрчлөлтөд ч).
+        while True:
+            temp, hum = self.read_temp()
+            if temp is not None:
+                self.last_reading = (temp, hum)
+                self.bus.publish(SensorReading(temp, hum, time.strftime("%Y-%m-%d %H:%M:%S")))
+            else:
+                self.automation.update()   # цагийн хуваарь, override дуусахыг шалгана
+            time.sleep(SENSOR_INTERVAL)
+
+    def sensor_history(self, hours=24.0, resolution=None):
+        # GUI-ийн график: сүүлийн hours цагийн цуваа + релений өөрчлөлт + реле бүрийн дундаж
+        now = time.time()
+        result = self.history.query(now - hours * 3600, now, resolution)
+        result["correlation"] = relay_correlation(result)
+        return result
+
+    # ---------- Ирц ----------
+    @metrics.timed("log_time_seconds")
+    def log_time(self, name: str, action: str, camera: str = "", ts: str = None):
+        # Мөр: нэр,IN|OUT,цаг,камер (хуучин мөрүүдэд камер байхгүй)
+        ts = ts or time.strftime("%Y-%m-%d %H:%M:%S")
+        self.attendance.append(name, action, ts, camera)
+        metrics.inc("attendance_events_total", action=action, camera=camera)
+        return ts
+
+    def checkin(self, name, camera=None, action=None, seq=None, box=None, rgb=None):
+        # action=None: ирээгүй бол IN, ирсэн бол OUT. Хаалганы камер "IN"/"OUT"-ыг шууд өгнө –
+        # аль хэдийн тэр төлөвт байвал (орох хаалгаар дахин орсон) юу ч бичихгүй.
+        # Нотлох зураг: rgb (камерын thread) эсвэл тухайн камерын frame seq (GUI) + царайн box.
+        camera = camera or self.cameras.kiosk
+        with self._checkin_lock:
+            present = name in self.active_workers
+            if action is None:
+                action = "OUT" if present else "IN"
+            elif present == (action == "IN"):
+                return None
+            ts = time.strftime("%Y-%m-%d %H:%M:%S")
+            if action == "IN":
+                self.active_workers[name] = ts
+            else:
+                self.active_workers.pop(name, None)
+            if rgb is None and seq is not None:
+                rgb = self.cameras.get(camera).frame(seq)
+            evidence = rgb is not None and self.evidence.submit(name, action, ts, camera, rgb, box)
+            # Critical path энд дуусна: ирцийн мөр, beep, sync, авто, мэдэгдэл – bus subscriber-ууд
+            event = (CheckIn if action == "IN" else CheckOut)(name, ts, camera, evidence, None)
+            self.bus.publish(event)
+        return to_dict(event)
+
+    def apply_remote(self, op):
+        # Sync thread-ээс: бусад киоскийн op. Ирц нийтлэг – өөр хаалгаар орсон хүн энд гарч болно.
+        if op["type"] == "enroll":
+            if op["fields"]:   # merge (нэмэлт sample) үед мэдээлэл ирэхгүй
+                save_worker_data(op["name"], op["fields"])
+            encoding = decode_vector(op["encoding"])
+            with open(REMOTE_FACES, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"name": op["name"], "encoding": op["encoding"],
+                                    "kiosk": op["kiosk"]}, ensure_ascii=False) + "\n")
+            self.face_index.add(encoding, op["name"])
+            self.unknowns.on_enrolled(encoding, TOLERANCE)
+            self.emit({"type": "enroll", "name": op["name"], "kiosk": op["kiosk"]})
+        elif op["type"] == "remove":
+            # replace/dedup: хуучин бүртгэл (sync-ээр ирсэн эсвэл энд бүртгэсэн) танигдахаа болино
+            name = op["name"]
+            self.face_index.remove(name)
+            if os.path.exists(REMOTE_FACES):
+                with open(REMOTE_FACES, "r", encoding="utf-8") as f:
+                    kept = [line for line in f if json.loads(line)["name"] != name]
+                with open(REMOTE_FACES + ".tmp", "w", encoding="utf-8") as f:
+                    f.writelines(kept)
+                os.replace(REMOTE_FACES + ".tmp", REMOTE_FACES)
+            if sample_paths(name) or os.path.exists(data_path(name)):
+                remove_worker(name, os.path.join("dedup_backup", time.strftime("%Y%m%d_%H%M%S")))
+            self.emit({"type": "remove", "name": name, "into": op.get("into"), "kiosk": op["kiosk"]})
+        elif op["type"] == "attendance":
+            name, action = op["name"], op["action"]
+            camera = f"{op['kiosk']}/{op.get('camera', '')}"
+            with self._checkin_lock:
+                if action == "IN":
+                    self.active_workers[name] = op["ts"]
+                else:
+                    self.active_workers.pop(name, None)
+                self.bus.publish((CheckIn if action == "IN" else CheckOut)(name, op["ts"], camera, False, op["kiosk"]))
+
+    def presence(self):
+        return dict(self.active_workers)
+
+    def evidence_thumb(self, name, ts):
+        # Ирцийн мөрийн (нэр, цаг) нотлох зураг – base64 JPEG эсвэл None
+        jpeg = self.evidence.get(name, ts)
+        return base64.b64encode(jpeg).decode("ascii") if jpeg else None
+
+    def attendance_log(self, since=None, until=None, name=None):
+        # → [[нэр, үйлдэл, цаг, камер], ...]; since/until – зөвхөн хамаарах сарын segment-ийг уншина
+        rows, _ = self.attendance.rows(since, until, name)
+        return [[r["name"], r["action"], r["ts"], r["camera"]] for r in rows]
+
+    # ---------- Царай ----------
+    def reload_faces(self):
+        encodings, names = load_known_faces()
+        if os.path.exists(REMOTE_FACES):
+            with open(REMOTE_FACES, "r", encoding="utf-8") as f:
+                for line in f:
+                    face = json.loads(line)
+                    encodings.append(decode_vector(face["encoding"]))
+                    names.append(face["name"])
+        self.face_index = FaceIndex(encodings, names)
+        self.face_index.calibrate(thresholds.load())   # хүн бүрийн босго (thresholds.py)
+        self.unknowns.refresh_known(self.face_index, TOLERANCE)
+        return len(self.face_index)
+
+    def enroll_check(self, pending_path, name, tolerance=TOLERANCE):
+        # Хадгалахаас өмнө: ижил нэртэй бүртгэл, ижил царайтай (tolerance дотор) бүртгэлүүд
+        encoding = encode_file(pending_path, profiles.for_path("enroll"))   # save_sample-тэй ижил
+        matches = self.face_index.nearest(encoding, tolerance) if encoding is not None else []
+        return {"face": encoding is not None, "same_name": same_name(name),
+                "matches": [{"name": n, "distance": round(d, 3)} for n, d in matches]}
+
+    def enroll(self, pending_path, fields, mode="new", target=None):
+        # fields: {"Full Name": ..., "Employee ID": ..., ...}
+        #   mode="new"     – шинэ хүн; ижил нэртэй бүртгэл байвал ValueError (дарж бичихгүй)
+        #   mode="merge"   – зургийг target-ийн нэмэлт sample болгоно (мэдээлэл нь хэвээр)
+        #   mode="replace" – target-ийн зураг, мэдээллийг backup руу зөөж, шинээр хадгална
+        # Царайгүй зураг юуг ч өөрчлөхгүй: эхлээд chip, encoding – дараа нь л устгах/бичих
+        name = fields["Full Name"].strip()
+        if mode == "merge":
+            name = target
+        elif mode != "replace" and same_name(name):
+            raise ValueError(f"'{name}' нэртэй ажилтан бүртгэлтэй байна")
+        error, data, encoding = sample_chip(pending_path)
+        if error:
+            raise ValueError(f"Зурагт царай олдсонгүй ({error})")
+        if mode == "replace":
+            remove_worker(target, os.path.join("dedup_backup", time.strftime("%Y%m%d_%H%M%S")))
+            self.face_index.remove(target)
+            if self.sync is not None:   # бусад киоск хуучин бүртгэлээр таньсаар байхгүй
+                self.sync.record("remove", name=target, into=None)
+        if mode != "merge":
+            save_worker_data(name, fields)
+        # Бүтэн frame биш тэгшлэсэн chip хадгална (assets.py); pending файл устана
+        save_sample(pending_path, name, chip=(data, encoding))
+        self.face_index.add(encoding, name)   # бүх зургийг дахин encode хийхгүй
+        self.unknowns.on_enrolled(encoding, TOLERANCE)   # энэ хүний танихгүй бүлэг арилна
+        if self.sync is not None:   # бусад киоскод JPEG биш encoding очно
+            self.sync.record("enroll", name=name, fields=fields if mode != "merge" else {},
+                             encoding=encode_vector(encoding))
+        return name
+
+    def sync_record(self, op_type, data):
+        # CLI (dedup.py, enroll.py) – daemon-ий outbox-оор бусад киоск руу. → op эсвэл None
+        if op_type not in ("enroll", "remove"):
+            raise ValueError(f"'{op_type}' op CLI-ээс бичигдэхгүй")
+        if self.sync is None:
+            return None
+        return self.sync.record(op_type, **data)
+
+    def unknown_clusters(self):
+        # Танихгүй царайн бүлгүүд (сүүлд харагдсанаас нь): id, хэдэн удаа ирсэн, thumbnail
+        if not self.unknowns.clusters and len(self.unknowns):
+            self.unknowns.cluster(TOLERANCE)   # background job хараахан ажиллаагүй
+        return self.unknowns.summary()
+
+    def unknown_photo(self, cluster_id):
+        # Бүлгийн хамгийн том царайг pending_photos-д → ердийн бүртгэлийн форм (дахин зураг авахгүй)
+        chip, _ = self.unknowns.chip(cluster_id)
+        if chip is None:
+            return None
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = f"pending_photos/unknown_{cluster_id}_{timestamp}.jpg"
+        with open(path, "wb") as f:
+            f.write(chip)
+        return os.path.abspath(path)
+
+    # ---------- Камер ----------
+    def preview_start(self, mode="recognize", camera=None):
+        # → preview хийж буй камерын id (frame event-ийн "camera" талбартай тулгана)
+        worker = self.cameras.get(camera)
+        worker.start(mode)
+        return worker.camera_id
+
+    def preview_stop(self, camera=None):
+        worker = self.cameras.get(camera)
+        if worker.role == "kiosk":
+            worker.stop()
+        else:
+            worker.mode = "recognize"   # хаалганы камер зогсохгүй, таних горимдоо буцна
+
+    def inference_pool(self, shape):
+        # Камерын frame-ийн хэмжээ анх мэдэгдэхэд үүснэ
+        if not self.inference_workers:
+            return None
+        shape = tuple(shape)
+        with self._pool_lock:
+            if shape not in self._pools:
+                self._pools[shape] = InferencePool(shape, workers=self.inference_workers, stages=DETECTOR_STAGES)
+            return self._pools[shape]
+
+    def pin_frame(self, seq, camera=None):
+        # GUI-ийн барьж авсан frame-ийг "Бүртгэх" дарах хүртэл recent-ээс гарахаас хамгаална
+        return self.cameras.get(camera).pin(seq)
+
+    def save_pending_photo(self, seq, camera=None):
+        rgb = self.cameras.get(camera).frame(seq)
+        if rgb is None:
+            return None
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = f"pending_photos/photo_{timestamp}.jpg"
+        cv2.imwrite(path, cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+        return os.path.abspath(path)   # GUI өөр cwd-тэй процесс байж болно
+
+    def status(self):
+        temp, hum = self.last_reading
+        kiosk = self.cameras.get()
+        return {"camera": kiosk.ok, "camera_running": kiosk.running, "cameras": self.cameras.status(),
+                "inference_workers": self.inference_workers,
+                "sync": self.sync.status() if self.sync is not None else None,
+                "relays": self.relay_states(),
+                "temperature": temp, "humidity": hum, "present": len(self.active_workers),
+                "faces": len(self.face_index), "unknowns": len(self.unknowns),
+                "profiles": dict(profiles.PATH_PROFILES), "bus": self.bus.stats()}
+
+
+if __name__ == "__main__":
+    import ipc
+
+    for folder in ("known_faces", "worker_data", "pending_photos"):
+        os.makedirs(folder, exist_ok=True)
+    metrics.serve()
+    core = KioskCore(inference_workers=INFERENCE_WORKERS).start()
+    server = ipc.CoreServer(core, CORE_SOCKET)
+    print(f"Kiosk core ажиллаж байна: {CORE_SOCKET}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        core.close()
@@ -0,0 +1,137 @@
+# =============================================
+# Давхардсан бүртгэл илрүүлэх (бүх өгөгдлийн сан дээр)
+# =============================================
+# Ижил хүн өөр нэрээр ("test", "testtt", "testhaju") эсвэл том/жижиг үсгээр
+# ("Khosoo", "khosoo") бүртгэгдсэнийг олно. Хоёр бүртгэлийн хамгийн ойр sample-уудын
+# зай tolerance дотор, эсвэл нэр нь ижил бол нэг бүлэгт орно.
+#   python dedup.py                    → бүлгүүдийг JSON-оор хэвлэнэ (юу ч өөрчлөхгүй)
+#   python dedup.py --merge            → бүлэг бүрийг нэг бүртгэлд нэгтгэнэ: бусдын зургууд
+#                                        үлдэх бүртгэлийн sample болж, мэдээллийн файлууд
+#                                        dedup_backup/<цаг>/ руу зөөгдөнө; бусад киоскод
+#                                        remove + үлдсэн нэрийн enroll op (sync.py) очно
+# Үлдэх бүртгэл: worker_data-д хамгийн олон талбар бөглөгдсөн, дараа нь хамгийн олон зурагтай.
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import workers
+from recognition import TOLERANCE, encode_file
+from sync import encode_vector, record_from_cli
+
+
+def load_samples(pool_size=None):
+    # → {нэр: [encoding, ...]}; зураггүй (зөвхөн worker_data) бүртгэл хоосон жагсаалттай
+    paths = [p for name in workers.identities() for p in workers.sample_paths(name)]
+    samples = {name: [] for name in workers.identities()}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=pool_size) as pool:
+        for path, encoding in zip(paths, pool.map(encode_file, paths, chunksize=8)):
+            if encoding is not None:
+                samples[workers.name_from_photo(path)].append(encoding)
+    return samples
+
+
+def find_clusters(samples, tolerance=TOLERANCE):
+    names = sorted(samples)
+    parent = {n: n for n in names}
+
+    def root(n):
+        while parent[n] != n:
+            parent[n] = parent[parent[n]]
+            n = parent[n]
+        return n
+
+    edges = []
+    # Ижил нэр (том жижиг үсэг, зай)
+    by_key = {}
+    for name in names:
+        by_key.setdefault(workers.safe_name(name).lower(), []).append(name)
+    for group in by_key.values():
+        for other in group[1:]:
+            edges.append((group[0], other, None))
+
+    # Ижил царай: бүх sample-ийн хос зай нэг матрицаар, бүртгэл бүрийн хосын хамгийн бага нь
+    owners = [n for n in names for _ in samples[n]]
+    if owners:
+        matrix = np.asarray([e for n in names for e in samples[n]], dtype=np.float64)
+        sq = (matrix ** 2).sum(axis=1)
+        dist = np.sqrt(np.maximum(sq[:, None] + sq[None, :] - 2 * matrix @ matrix.T, 0.0))
+        best = {}
+        for i, j in zip(*np.nonzero(dist <= tolerance)):
+            a, b = owners[i], owners[j]
+            if a < b and dist[i, j] < best.get((a, b), np.inf):
+                best[(a, b)] = float(dist[i, j])
+        edges.extend((a, b, d) for (a, b), d in best.items())
+
+    for a, b, _ in edges:
+        parent[root(a)] = root(b)
+    groups = {}
+    for name in names:
+        groups.setdefault(root(name), []).append(name)
+
+    clusters = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        keep = max(members, key=lambda n: (sum(1 for v in workers.load_worker_data(n).values() if v.strip()),
+                                           len(samples[n]), n[:1].isupper(), -len(n)))
+        links = {frozenset((a, b)): d for a, b, d in edges if a in members and b in members}
+        merge = []
+        for name in members:
+            if name == keep:
+                continue
+            d = links.get(frozenset((keep, name)))
+            merge.append({"name": name, "samples": len(samples[name]),
+                          "distance": round(d, 3) if d is not None else None,
+                          "same_name": workers.safe_name(name).lower() == workers.safe_name(keep).lower()})
+        clusters.append({"keep": keep, "samples": len(samples[keep]), "merge": merge})
+    return clusters
+
+
+def merge_clusters(clusters, backup_dir, samples=None):
+    # → (нэгтгэсэн тоо, sync op-ууд). samples – load_samples-ийн encoding-ууд (op-д)
+    merged, ops = 0, []
+    for cluster in clusters:
+        for item in cluster["merge"]:
+            workers.move_samples(item["name"], cluster["keep"])
+            workers.remove_worker(item["name"], backup_dir)   # үлдсэн мэдээллийн файл
+            ops.append(("remove", {"name": item["name"], "into": cluster["keep"]}))
+            for encoding in (samples or {}).get(item["name"], []):
+                ops.append(("enroll", {"name": cluster["keep"], "fields": {},
+                                       "encoding": encode_vector(encoding)}))
+            merged += 1
+    return merged, ops
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Давхардсан ажилтны бүртгэл илрүүлэх/нэгтгэх")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--workers", type=int, help="encode хийх процессын тоо")
+    parser.add_argument("--merge", action="store_true", help="бүлгүүдийг нэгтгэх")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    samples = load_samples(args.workers)
+    clusters = find_clusters(samples, args.tolerance)
+    report = {"identities": len(samples), "samples": sum(len(v) for v in samples.values()),
+              "clusters": clusters, "elapsed_s": round(time.perf_counter() - t0, 2)}
+    if args.merge and clusters:
+        backup = os.path.join("dedup_backup", time.strftime("%Y%m%d_%H%M%S"))
+        report["merged"], ops = merge_clusters(clusters, backup, samples)
+        report["backup"] = backup
+        report["sync_ops"] = record_from_cli(ops)
+        import ipc
+
+        client = ipc.connect()
+        if client is not None:
+            client.reload_faces()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,251 @@
+# =============================================
+# Хоёр шатлалтай царай илрүүлэлт (cascade)
+# =============================================
+# Ихэнх цагт киоскийн өмнө хүн байхгүй. dlib HOG-г frame бүр дээр ажиллуулахын
+# оронд эхлээд маш хямд "gate" шалгана:
+#   "motion" – жижиг саарал зураг дээр frame-ийн ялгаа (хөдөлгөөн байна уу)
+#   "haar"   – OpenCV Haar cascade, багасгасан зураг дээр → нэр дэвшигч хайрцаг
+#   "dnn"    – OpenCV DNN (res10 SSD) жижиг оролттой → нэр дэвшигч хайрцаг
+# Gate-үүд дарааллаар ажиллана; аль нэг нь "царай алга" гэвэл dlib огт ажиллахгүй.
+# Haar/DNN хайрцаг өгвөл dlib зөвхөн тэр хэсгүүд дээр ажиллана.
+#
+# Тоо гаргах (idle CPU, recall алдагдал):
+#   python detection.py clip.mp4 --stages motion,haar
+#   python detection.py frames_dir/ --stages dnn
+import os
+import time
+
+import cv2
+import face_recognition
+
+import metrics
+
+DEFAULT_STAGES = ("motion", "haar")
+DNN_PROTO = "models/deploy.prototxt"
+DNN_MODEL = "models/res10_300x300_ssd_iter_140000.caffemodel"
+
+
+def scale_box(box, sx, sy, width, height, pad=0.0):
+    # (top, right, bottom, left) → өөр масштабын зураг руу, pad хувиар томруулна
+    top, right, bottom, left = box
+    w, h = (right - left) * sx, (bottom - top) * sy
+    return (max(0, int(top * sy - h * pad)), min(width, int(right * sx + w * pad)),
+            min(height, int(bottom * sy + h * pad)), max(0, int(left * sx - w * pad)))
+
+
+class MotionGate:
+    # Хөдөлгөөнгүй бол False. Царай сүүлд олдсоноос hold секунд хүртэл нээлттэй
+    # (хүн хөдлөхгүй зогсож байсан ч илрүүлэлт үргэлжилнэ).
+    def __init__(self, size=(80, 45), threshold=12, min_changed=0.004, hold=3.0):
+        self.size = size
+        self.threshold = threshold
+        self.min_changed = min_changed
+        self.hold = hold
+        self._prev = None
+        self.last_hit = 0.0
+
+    def __call__(self, rgb, regions):
+        small = cv2.cvtColor(cv2.resize(rgb, self.size, interpolation=cv2.INTER_AREA), cv2.COLOR_RGB2GRAY)
+        prev, self._prev = self._prev, small
+        if time.time() - self.last_hit < self.hold:
+            return regions
+        if prev is None:
+            return regions
+        diff = cv2.absdiff(small, prev)
+        changed = (diff > self.threshold).mean()
+        return regions if changed >= self.min_changed else []
+
+    def hit(self):
+        self.last_hit = time.time()
+
+
+class HaarGate:
+    def __init__(self, width=320, scale_factor=1.15, min_neighbors=4, pad=0.35):
+        self.width = width
+        self.pad = pad
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+
+    def __call__(self, rgb, regions):
+        h, w = rgb.shape[:2]
+        s = self.width / w
+        gray = cv2.cvtColor(cv2.resize(rgb, (self.width, int(h * s)), interpolation=cv2.INTER_AREA), cv2.COLOR_RGB2GRAY)
+        found = self.cascade.detectMultiScale(gray, self.scale_factor, self.min_neighbors, minSize=(20, 20))
+        return [scale_box((y, x + fw, y + fh, x), 1 / s, 1 / s, w, h, self.pad) for (x, y, fw, fh) in found]
+
+    def hit(self):
+        pass
+
+
+class DnnGate:
+    def __init__(self, size=150, confidence=0.5, pad=0.2, proto=DNN_PROTO, model=DNN_MODEL):
+        if not (os.path.exists(proto) and os.path.exists(model)):
+            raise FileNotFoundError(f"DNN загвар олдсонгүй: {proto}, {model}")
+        self.net = cv2.dnn.readNetFromCaffe(proto, model)
+        self.size = size
+        self.confidence = confidence
+        self.pad = pad
+
+    def __call__(self, rgb, regions):
+        h, w = rgb.shape[:2]
+        # Caffe SSD BGR-ээр сурсан: swapRB RGB→BGR болгоод дараа нь mean-ийг (B, G, R) хасна
+        blob = cv2.dnn.blobFromImage(cv2.resize(rgb, (self.size, self.size)), 1.0,
+                                     (self.size, self.size), (104.0, 177.0, 123.0), swapRB=True)
+        self.net.setInput(blob)
+        out = self.net.forward()[0, 0]
+        boxes = []
+        for det in out:
+            if det[2] < self.confidence:
+                continue
+            left, top, right, bottom = det[3] * w, det[4] * h, det[5] * w, det[6] * h
+            boxes.append(scale_box((top, right, bottom, left), 1, 1, w, h, self.pad))
+        return boxes
+
+    def hit(self):
+        pass
+
+
+GATES = {"motion": MotionGate, "haar": HaarGate, "dnn": DnnGate}
+
+
+class FaceDetector:
+    def __init__(self, stages=DEFAULT_STAGES, upsample=1, model="hog", scale=1.0):
+        self.stages = tuple(s for s in stages if s and s != "none")
+        self.gates = []
+        for stage in self.stages:
+            try:
+                self.gates.append(GATES[stage]())
+            except Exception as e:
+                print(f"Detection gate '{stage}' ачаалж чадсангүй, алгаслаа: {e}")
+        self.upsample = upsample
+        self.model = model
+        self.scale = scale
+        self.stats = {"frames": 0, "gated": 0, "dlib_calls": 0}
+
+    def use(self, profile):
+        # profiles.Profile – камер idle/checkin хооронд frame бүрт сольж болно (gate төлөв хэвээр)
+        self.upsample, self.model, self.scale = profile.upsample, profile.detector, profile.scale
+        return self
+
+    def _dlib(self, rgb, scale=1.0):
+        if scale == 1.0:
+            return face_recognition.face_locations(rgb, self.upsample, self.model)
+        h, w = rgb.shape[:2]
+        small = cv2.resize(rgb, (max(1, int(w * scale)), max(1, int(h * scale))),
+                           interpolation=cv2.INTER_AREA)
+        return [scale_box(box, w / small.shape[1], h / small.shape[0], w, h)
+                for box in face_recognition.face_locations(small, self.upsample, self.model)]
+
+    def locations(self, rgb):
+        self.stats["frames"] += 1
+        h, w = rgb.shape[:2]
+        regions = [(0, w, h, 0)]   # бүтэн frame
+        for gate in self.gates:
+            regions = gate(rgb, regions)
+            if not regions:
+                self.stats["gated"] += 1
+                metrics.inc("detector_gated_total", stage=gate.__class__.__name__)
+                return []
+
+        found = []
+        for top, right, bottom, left in regions:
+            self.stats["dlib_calls"] += 1
+            if (top, right, bottom, left) == (0, w, h, 0):
+                found.extend(self._dlib(rgb, self.scale))
+                continue
+            # Gate-ийн crop аль хэдийн царайн орчим (Haar minSize 20px) – профайлын scale-аар
+            # дахин жижигрүүлбэл HOG-ийн ~80px доод хэмжээнээс доош орж idle сэрэхгүй
+            crop = rgb[top:bottom, left:right]
+            for (t, r, b, l) in self._dlib(crop):
+                box = (t + top, r + left, b + top, l + left)
+                if box not in found:
+                    found.append(box)
+
+        if found:
+            for gate in self.gates:
+                gate.hit()
+        return found
+
+
+# =============================================
+# Хэмжилт: cascade vs зөвхөн dlib
+# =============================================
+def iter_frames(source, limit=None):
+    # Видео файл эсвэл зурагнуудын хавтас → RGB frame-ууд
+    count = 0
+    if os.path.isdir(source):
+        for file in sorted(os.listdir(source)):
+            if limit and count >= limit:
+                return
+            bgr = cv2.imread(os.path.join(source, file))
+            if bgr is None:
+                continue
+            count += 1
+            yield file, cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+        return
+    cap = cv2.VideoCapture(source)
+    while not limit or count < limit:
+        ret, bgr = cap.read()
+        if not ret:
+            break
+        yield f"{source}#{count}", cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+        count += 1
+    cap.release()
+
+
+def _iou(a, b):
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    area = lambda x: (x[1] - x[3]) * (x[2] - x[0])
+    return inter / float(area(a) + area(b) - inter) if inter else 0.0
+
+
+def measure(source, stages, limit=None):
+    baseline = FaceDetector(stages=())
+    cascade = FaceDetector(stages=stages)
+    base_time = casc_time = 0.0
+    base_cpu = casc_cpu = 0.0
+    truth = recalled = 0
+    for _, rgb in iter_frames(source, limit):
+        c0, t0 = time.process_time(), time.perf_counter()
+        ref = baseline.locations(rgb)
+        base_time += time.perf_counter() - t0
+        base_cpu += time.process_time() - c0
+
+        c0, t0 = time.process_time(), time.perf_counter()
+        got = cascade.locations(rgb)
+        casc_time += time.perf_counter() - t0
+        casc_cpu += time.process_time() - c0
+
+        truth += len(ref)
+        recalled += sum(1 for r in ref if any(_iou(r, g) >= 0.5 for g in got))
+
+    frames = max(1, baseline.stats["frames"])
+    return {
+        "source": source,
+        "stages": list(cascade.stages),
+        "frames": baseline.stats["frames"],
+        "baseline_ms_per_frame": round(base_time / frames * 1000, 2),
+        "cascade_ms_per_frame": round(casc_time / frames * 1000, 2),
+        "baseline_cpu_s": round(base_cpu, 3),
+        "cascade_cpu_s": round(casc_cpu, 3),
+        "cpu_saved_pct": round(100 * (1 - casc_cpu / base_cpu), 1) if base_cpu else 0.0,
+        "gated_frames_pct": round(100 * cascade.stats["gated"] / frames, 1),
+        "dlib_calls": cascade.stats["dlib_calls"],
+        "faces_baseline": truth,
+        "recall_vs_baseline": round(recalled / truth, 4) if truth else None,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Detection cascade-ийн CPU ба recall хэмжилт")
+    parser.add_argument("source", help="видео файл эсвэл зурагнуудын хавтас")
+    parser.add_argument("--stages", default=",".join(DEFAULT_STAGES))
+    parser.add_argument("--limit", type=int)
+    args = parser.parse_args()
+    print(json.dumps(measure(args.source, args.stages.split(","), args.limit), indent=2, ensure_ascii=False))
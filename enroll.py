@@ -0,0 +1,205 @@
+# =============================================
+# Олноор бүртгэх: зурагнуудын хавтас + CSV/JSON жагсаалт → known_faces + worker_data
+# =============================================
+# Touchscreen-ээр нэг нэгээр (add_worker → open_registration_form) бүртгэхийн оронд:
+#   python enroll.py photos/ roster.csv [--workers 4] [--replace] [--dry-run] [--report failed.csv]
+#                    [--profile accurate-enroll] [--upsample 2]
+#
+# Жагсаалтын баганууд бүртгэлийн формтой ижил (workers.FIELDS) + "Photo" (файлын нэр).
+# "Photo" байхгүй бол photos/ дотроос Employee ID эсвэл нэрээр (Full_Name.jpg) хайна.
+# JSON жагсаалт: [{"Full Name": ..., "Employee ID": ..., "Photo": ...}, ...]
+#
+# Зураг бүрийг тусдаа процесст (бүх core) encode хийнэ. Царайгүй, эсвэл нэгээс олон
+# царайтай зургийг татгалзана. Амжилттай бол EXIF-ээр эргүүлж, MAX_SIDE хүртэл
+# багасгаад тэгшлэсэн царайн chip-ийг (assets.py) known_faces/-д бичнэ; encoding нь
+# assets.ASSET_INDEX-д орох тул core дахин encode хийхгүй.
+# --replace: шинэ зураг амжилттай encode болсны дараа л хуучин бүртгэлийн бүх sample,
+# мэдээллийг dedup_backup/<цаг>/ руу зөөнө (workers.remove_worker).
+# Бүртгэл бүр sync outbox-д (remove +) enroll op болж бусад киоск руу очно (sync.record_from_cli).
+# Core daemon ажиллаж байвал төгсгөлд нь reload_faces дуудна.
+import argparse
+import collections
+import concurrent.futures
+import csv
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import assets
+import profiles
+import workers
+from sync import encode_vector, record_from_cli
+
+PHOTO_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+MAX_SIDE = 1600   # утасны 4000px зураг дээр HOG хэт удаан; царай энэ хэмжээнд хангалттай
+
+
+def read_roster(path):
+    if path.lower().endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            return [{k: str(v) for k, v in row.items()} for row in json.load(f)]
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return [{k.strip(): (v or "").strip() for k, v in row.items() if k} for row in csv.DictReader(f)]
+
+
+def index_photos(folder):
+    # файлын нэр (өргөтгөлгүй, жижиг үсгээр) → зам
+    found = {}
+    for file in os.listdir(folder):
+        stem, ext = os.path.splitext(file)
+        if ext.lower() in PHOTO_EXTS:
+            found[stem.lower()] = os.path.join(folder, file)
+    return found
+
+
+def find_photo(row, folder, photos):
+    if row.get("Photo"):
+        path = os.path.join(folder, row["Photo"])
+        return path if os.path.exists(path) else None
+    for key in (row.get("Employee ID", ""), workers.safe_name(row.get("Full Name", "")), row.get("Full Name", "")):
+        if key and key.lower() in photos:
+            return photos[key.lower()]
+    return None
+
+
+def encode_photo(src, profile, max_side=MAX_SIDE):
+    # Worker процесс дээр ажиллана → (алдааны шалтгаан эсвэл None, chip JPEG, encoding, секунд).
+    # Бичихгүй – --replace үед хуучин бүртгэлийг амжилттай encode болсны дараа л зөөнө.
+    from PIL import Image, ImageOps
+
+    t0 = time.perf_counter()
+    try:
+        with Image.open(src) as im:
+            im = ImageOps.exif_transpose(im).convert("RGB")
+            im.thumbnail((max_side, max_side))
+            rgb = np.asarray(im)
+    except OSError:
+        return "unreadable", None, None, time.perf_counter() - t0
+    error, chip, encoding = assets.make_chip(rgb, profile, single=True)
+    return error, chip, encoding, time.perf_counter() - t0
+
+
+def plan(roster, folder, replace=False):
+    # → (бүртгэх [(row, photo)], татгалзсан [(row, шалтгаан)])
+    photos = index_photos(folder)
+    accepted, rejected, seen = [], [], set()
+    for row in roster:
+        name = row.get("Full Name", "").strip()
+        if not name:
+            rejected.append((row, "no_name"))
+            continue
+        key = workers.safe_name(name).lower()
+        if key in seen:
+            rejected.append((row, "duplicate_in_roster"))
+            continue
+        seen.add(key)
+        if workers.exists(name) and not replace:
+            rejected.append((row, "exists"))
+            continue
+        photo = find_photo(row, folder, photos)
+        if photo is None:
+            rejected.append((row, "no_photo"))
+            continue
+        accepted.append((row, photo))
+    return accepted, rejected
+
+
+def run(folder, roster_path, pool_size=None, replace=False, dry_run=False, profile=None):
+    profile = profile or profiles.for_path("enroll")
+    roster = read_roster(roster_path)
+    accepted, rejected = plan(roster, folder, replace)
+    os.makedirs(workers.KNOWN_FACES_DIR, exist_ok=True)
+    os.makedirs(workers.WORKER_DATA_DIR, exist_ok=True)
+    pool_size = pool_size or os.cpu_count() or 1
+    enrolled, encode_times, ops = [], [], []
+    backup = os.path.join("dedup_backup", time.strftime("%Y%m%d_%H%M%S"))
+    index = assets.AssetIndex()   # зөвхөн энэ процесс бичнэ (worker-ууд encoding буцаана)
+    t0 = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=pool_size) as pool:
+        futures = {pool.submit(encode_photo, photo, profile): row for row, photo in accepted}
+        for future in concurrent.futures.as_completed(futures):
+            row = futures[future]
+            try:
+                error, chip, encoding, seconds = future.result()
+            except Exception as e:   # worker унасан (dlib алдаа г.м.)
+                error, seconds = f"error: {e!r}", None
+            if seconds is not None:
+                encode_times.append(seconds)
+            if error:
+                rejected.append((row, error))
+                continue
+            if not dry_run:
+                fields = {field: row.get(field, "") for field in workers.FIELDS}
+                fields["Full Name"] = row["Full Name"].strip()
+                for old in workers.same_name(fields["Full Name"]):   # --replace: хуучин ~N sample-ууд
+                    workers.remove_worker(old, backup)
+                    ops.append(("remove", {"name": old, "into": None}))
+                assets.write_atomic(workers.photo_path(fields["Full Name"]), chip)
+                index.put(workers.photo_path(fields["Full Name"]), encoding, jitters=profile.jitters)
+                workers.save_worker_data(fields["Full Name"], fields)
+                ops.append(("enroll", {"name": fields["Full Name"], "fields": fields,
+                                       "encoding": encode_vector(encoding)}))
+            enrolled.append(row["Full Name"].strip())
+    index.save()
+    elapsed = time.perf_counter() - t0
+    synced = record_from_cli(ops) if ops else 0
+    processed = len(accepted)
+    return {
+        "roster": len(roster),
+        "enrolled": len(enrolled),
+        "rejected": len(rejected),
+        "reasons": dict(collections.Counter(reason for _, reason in rejected)),
+        "workers": pool_size,
+        "profile": profile._asdict(),
+        "elapsed_s": round(elapsed, 2),
+        "images_per_s": round(processed / elapsed, 2) if elapsed and processed else None,
+        "mean_encode_ms": round(1000 * sum(encode_times) / len(encode_times), 1) if encode_times else None,
+        "sync_ops": synced,
+        "dry_run": dry_run,
+    }, rejected
+
+
+def write_report(path, rejected):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Full Name", "Employee ID", "Photo", "Reason"])
+        for row, reason in rejected:
+            writer.writerow([row.get("Full Name", ""), row.get("Employee ID", ""), row.get("Photo", ""), reason])
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Ажилтнуудыг олноор бүртгэх")
+    parser.add_argument("photos", help="зурагнуудын хавтас")
+    parser.add_argument("roster", help="CSV эсвэл JSON жагсаалт")
+    parser.add_argument("--workers", type=int, help="процессын тоо (анхдагч: бүх core)")
+    parser.add_argument("--profile", default=profiles.PATH_PROFILES["enroll"], choices=sorted(profiles.PROFILES))
+    parser.add_argument("--upsample", type=int, help="профайлынхыг дарна (жижиг царайд 2)")
+    parser.add_argument("--replace", action="store_true", help="бүртгэлтэй ажилтныг дарж бичих")
+    parser.add_argument("--dry-run", action="store_true", help="шалгаад л өнгөрнө, юу ч бичихгүй")
+    parser.add_argument("--report", help="татгалзсан мөрүүдийг бичих CSV")
+    args = parser.parse_args(argv)
+
+    profile = profiles.get(args.profile)
+    if args.upsample is not None:
+        profile = profile._replace(upsample=args.upsample)
+    summary, rejected = run(args.photos, args.roster, args.workers, args.replace, args.dry_run, profile)
+    if args.report:
+        write_report(args.report, rejected)
+    for row, reason in rejected:
+        print(f"  ✗ {row.get('Full Name') or '?':<24} {reason}", file=sys.stderr)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+    if summary["enrolled"] and not args.dry_run:
+        import ipc
+
+        client = ipc.connect()
+        if client is not None:
+            print(f"Core: {client.reload_faces()} царай ачааллаа")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
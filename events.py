@@ -0,0 +1,343 @@
+# =============================================
+# Дотоод event bus – төрөлжсөн event, append-only journal, асинхрон subscriber-ууд
+# =============================================
+# Өмнө нь checkin() нэг дор: ирц бичих, beep, sync, автомат удирдлага, GUI/IPC/API-д мэдэгдэх –
+# аль нэг нь удаашрахад ирц өөрөө хүлээдэг байв. Одоо critical path зөвхөн төлөвөө
+# (active_workers, реле) өөрчилж, event-ийг journal-д бичээд буцна:
+#   bus.publish(CheckIn(...))  → journal/events-<эхний seq>.jsonl-д мөр (seq, type, data)
+#                              → subscriber бүрийн дараалалд (хэзээ ч блоклохгүй)
+# Subscriber бүр өөрийн thread, өөрийн хязгаартай дараалалтай (backpressure):
+#   durable=False – дараалал дүүрвэл хамгийн хуучныг хаяна (beep, GUI – хуучин мэдээ хэрэггүй)
+#   durable=True  – дүүрвэл "хоцорсон" гэж тэмдэглээд, дараалал хоосормогц дутуу event-үүдээ
+#                   journal-аас seq-ээр нөхөж уншина; боловсруулсан seq-ээ journal/<нэр>.offset-д
+#                   хадгалж, дахин эхлэхэд тэндээс үргэлжилнэ (at-least-once). Offset багц бүрийн
+#                   дараа; idempotent биш handler (ирцийн мөр, түүх, sync outbox) – each_offset=True:
+#                   event бүрийн дараа, унтрахад давхардал хамгийн ихдээ нэг event
+# Journal JOURNAL_SEGMENT_BYTES-ээр segment-лэгдэж, сүүлийн JOURNAL_SEGMENTS үлдэнэ.
+#   python events.py tail [--after SEQ] [--type CheckIn]    – journal унших
+#   python events.py stats
+import argparse
+import collections
+import json
+import os
+import queue
+import sys
+import threading
+
+import metrics
+
+JOURNAL_DIR = "journal"
+JOURNAL_SEGMENT_BYTES = 1024 * 1024
+JOURNAL_SEGMENTS = 32
+QUEUE_SIZE = 256
+
+CheckIn = collections.namedtuple("CheckIn", "name ts camera evidence kiosk")
+CheckOut = collections.namedtuple("CheckOut", "name ts camera evidence kiosk")
+RelayChanged = collections.namedtuple("RelayChanged", "name on source ts")
+SensorReading = collections.namedtuple("SensorReading", "temperature humidity ts")
+VoiceCommand = collections.namedtuple("VoiceCommand", "text intents ts")   # intents: [[device, action]]
+
+EVENT_TYPES = {cls.__name__: cls for cls in (CheckIn, CheckOut, RelayChanged, SensorReading, VoiceCommand)}
+
+
+def to_dict(event):
+    # core.emit-ийн хуучин dict хэлбэр (GUI, IPC, HTTP API)
+    if isinstance(event, (CheckIn, CheckOut)):
+        result = {"type": "checkin", "action": "IN" if isinstance(event, CheckIn) else "OUT",
+                  "name": event.name, "ts": event.ts, "camera": event.camera, "evidence": event.evidence}
+        if event.kiosk:
+            result["kiosk"] = event.kiosk
+        return result
+    if isinstance(event, RelayChanged):
+        return {"type": "relay", "name": event.name, "on": event.on, "source": event.source}
+    if isinstance(event, SensorReading):
+        return {"type": "sensor", "temperature": event.temperature, "humidity": event.humidity}
+    return {"type": "voice", "text": event.text, "intents": event.intents}
+
+
+# =============================================
+# Journal
+# =============================================
+class Journal:
+    def __init__(self, folder=JOURNAL_DIR, segment_bytes=JOURNAL_SEGMENT_BYTES,
+                 max_segments=JOURNAL_SEGMENTS, readonly=False):
+        self.folder = folder
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.readonly = readonly
+        self.segments = []   # эхний seq-үүд, өсөх дарааллаар
+        self.seq = 0         # хамгийн сүүлд бичигдсэн
+        self._file = None
+        if not readonly:
+            os.makedirs(folder, exist_ok=True)
+        if os.path.isdir(folder):
+            self.segments = sorted(int(f[7:-6]) for f in os.listdir(folder)
+                                   if f.startswith("events-") and f.endswith(".jsonl"))
+        if self.segments:
+            self.seq = self._recover(self.segments[-1])
+
+    def _path(self, first):
+        return os.path.join(self.folder, f"events-{first:012d}.jsonl")
+
+    def _recover(self, first):
+        # Сүүлийн segment-ийн сүүлийн бүтэн мөрийн seq; тасарсан мөрийг таслана
+        with open(self._path(first), "rb") as f:
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        if len(complete) != len(data) and not self.readonly:
+            with open(self._path(first), "r+b") as f:
+                f.truncate(len(complete))
+        lines = complete.splitlines()
+        return json.loads(lines[-1])["seq"] if lines else first - 1
+
+    def append(self, event):
+        # → seq. EventBus-ийн lock дотор дуудагдана
+        seq = self.seq + 1
+        if self._file is None or self._file.tell() >= self.segment_bytes:
+            self._roll(seq)
+        record = {"seq": seq, "type": type(event).__name__, "data": event._asdict()}
+        self._file.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        self._file.flush()
+        self.seq = seq
+        return seq
+
+    def _roll(self, seq):
+        if self._file is not None:
+            self._file.close()
+        elif self.segments and os.path.getsize(self._path(self.segments[-1])) < self.segment_bytes:
+            self._file = open(self._path(self.segments[-1]), "ab")   # дахин эхэлсэн – үргэлжлүүлнэ
+            return
+        self.segments.append(seq)
+        self._file = open(self._path(seq), "ab")
+        while len(self.segments) > self.max_segments:
+            os.remove(self._path(self.segments.pop(0)))
+            metrics.inc("journal_segments_dropped_total")
+
+    def read(self, after=0, until=None):
+        # → (seq, event) – after < seq ≤ until. Устсан segment-ийн event-үүд алга.
+        segments = list(self.segments)
+        for i, first in enumerate(segments):
+            if i + 1 < len(segments) and segments[i + 1] <= after + 1:
+                continue   # бүхэлдээ after-аас өмнө
+            if until is not None and first > until:
+                return
+            try:
+                f = open(self._path(first), "rb")
+            except FileNotFoundError:
+                continue   # retention устгасан
+            with f:
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break
+                    record = json.loads(raw)
+                    if record["seq"] <= after:
+                        continue
+                    if until is not None and record["seq"] > until:
+                        return
+                    yield record["seq"], EVENT_TYPES[record["type"]](**record["data"])
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# =============================================
+# Bus
+# =============================================
+class Subscription:
+    def __init__(self, bus, name, handler, types, queue_size, durable, each_offset=False):
+        self.bus = bus
+        self.name = name
+        self.handler = handler
+        self.types = tuple(types) if types else None
+        self.durable = durable
+        self.each_offset = durable and each_offset
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lagging = False
+        self.last_seq = bus.journal.seq   # анх удаа – түүхийг бүхэлд нь давтахгүй
+        self._saved = None
+        self.dropped = 0
+        self._offset_path = os.path.join(bus.journal.folder, f"{name}.offset")
+        self._thread = None
+
+    def wants(self, event):
+        return self.types is None or isinstance(event, self.types)
+
+    def offer(self, seq, event):
+        # publish-аас, bus lock дотор – хэзээ ч хүлээхгүй
+        if not self.wants(event) or self.lagging:
+            return   # durable: journal-аас нөхнө
+        try:
+            self.queue.put_nowait((seq, event))
+            return
+        except queue.Full:
+            pass
+        if self.durable:
+            self.lagging = True
+            metrics.inc("bus_lagging_total", subscriber=self.name)
+            return
+        try:
+            self.queue.get_nowait()   # хамгийн хуучныг хаяна
+        except queue.Empty:
+            pass
+        self.dropped += 1
+        metrics.inc("bus_dropped_total", subscriber=self.name)
+        try:
+            self.queue.put_nowait((seq, event))
+        except queue.Full:
+            pass
+
+    def start(self):
+        if self.durable:
+            self.last_seq = self._load_offset()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f"bus-{self.name}")
+        self._thread.start()
+
+    def _load_offset(self):
+        try:
+            with open(self._offset_path, "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return self.last_seq
+
+    def _save_offset(self):
+        if self._saved == self.last_seq:
+            return
+        self._saved = self.last_seq
+        tmp = self._offset_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(str(self.last_seq))
+        os.replace(tmp, self._offset_path)
+
+    def _handle(self, seq, event):
+        if seq <= self.last_seq:
+            return   # journal-аас нөхөхөд давхардсан
+        if self.wants(event):
+            try:
+                with metrics.timer("bus_handler_seconds", subscriber=self.name):
+                    self.handler(event)
+            except Exception as e:
+                print(f"Event subscriber '{self.name}' алдаа:", repr(e))
+        self.last_seq = seq
+        if self.each_offset:
+            self._save_offset()
+
+    def _catch_up(self):
+        # Эхлэхэд эсвэл дараалал дүүрсний дараа: last_seq-ээс хойшхийг journal-аас
+        with self.bus.lock:
+            self.lagging = False
+            until = self.bus.journal.seq   # үүнээс хойшхи нь дараалалд ирнэ
+        for seq, event in self.bus.journal.read(self.last_seq, until):
+            self._handle(seq, event)
+        self.last_seq = max(self.last_seq, until)
+
+    def _run(self):
+        if self.durable:
+            self._catch_up()
+        while True:
+            try:
+                item = self.queue.get(timeout=1.0)
+            except queue.Empty:
+                item = False
+            if item is None:
+                break
+            if item:
+                self._handle(*item)
+            if self.durable and self.queue.empty():
+                if self.lagging:
+                    self._catch_up()
+                self._save_offset()   # багц бүрийн дараа
+        if self.durable:
+            while not self.queue.empty():
+                item = self.queue.get_nowait()
+                if item:
+                    self._handle(*item)
+            self._save_offset()
+
+    def stop(self):
+        try:
+            self.queue.put(None, timeout=1.0)
+        except queue.Full:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def stats(self):
+        return {"queued": self.queue.qsize(), "durable": self.durable, "lagging": self.lagging,
+                "last_seq": self.last_seq, "dropped": self.dropped}
+
+
+class EventBus:
+    def __init__(self, folder=JOURNAL_DIR):
+        self.journal = Journal(folder)
+        self.lock = threading.Lock()
+        self._subscriptions = []
+        self._started = False
+
+    def subscribe(self, name, handler, types=None, queue_size=QUEUE_SIZE, durable=False, each_offset=False):
+        sub = Subscription(self, name, handler, types, queue_size, durable, each_offset)
+        with self.lock:
+            self._subscriptions.append(sub)
+        if self._started:
+            sub.start()
+        return sub
+
+    def publish(self, event):
+        # Critical path: journal-д бичээд дараалалд тавина → seq
+        with metrics.timer("bus_publish_seconds"):
+            with self.lock:
+                seq = self.journal.append(event)
+                for sub in self._subscriptions:
+                    sub.offer(seq, event)
+        metrics.inc("bus_events_total", type=type(event).__name__)
+        return seq
+
+    def start(self):
+        self._started = True
+        for sub in list(self._subscriptions):
+            sub.start()
+        return self
+
+    def close(self):
+        for sub in list(self._subscriptions):
+            sub.stop()
+        with self.lock:
+            self.journal.close()
+
+    def stats(self):
+        with self.lock:
+            subs = list(self._subscriptions)
+        return {"seq": self.journal.seq, "subscribers": {s.name: s.stats() for s in subs}}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Event journal")
+    parser.add_argument("--dir", default=JOURNAL_DIR)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("tail")
+    p.add_argument("--after", type=int, default=0)
+    p.add_argument("--type", choices=sorted(EVENT_TYPES))
+    sub.add_parser("stats")
+    args = parser.parse_args(argv)
+
+    journal = Journal(args.dir, readonly=True)
+    if args.cmd == "tail":
+        for seq, event in journal.read(args.after):
+            if not args.type or type(event).__name__ == args.type:
+                print(json.dumps({"seq": seq, "type": type(event).__name__, **event._asdict()},
+                                 ensure_ascii=False))
+    else:
+        offsets = {}
+        for name in sorted(os.listdir(args.dir)) if os.path.isdir(args.dir) else []:
+            if name.endswith(".offset"):
+                with open(os.path.join(args.dir, name), "r", encoding="utf-8") as f:
+                    offsets[name[:-7]] = int(f.read().strip() or 0)
+        print(json.dumps({"seq": journal.seq, "segments": len(journal.segments),
+                          "subscribers": {k: {"offset": v, "behind": journal.seq - v}
+                                          for k, v in offsets.items()}}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,283 @@
+# =============================================
+# Ирцийн нотлох зураг – шахсан, хугацаа/хэмжээгээр цэвэрлэгддэг append-only сан
+# =============================================
+# IN/OUT бүрт царайн жижиг JPEG (THUMB_SIDE px) хадгална – маргаантай бүртгэлийг шалгахад.
+# Зураг бүр тусдаа файл биш: evidence/seg-000001.bin гэх мэт segment файлуудад дараалан
+# бичигдэнэ (SD картад олон жижиг файл + inode үгүй).
+#   Бичлэг: MAGIC | u32 header урт | header JSON | u32 JPEG урт | JPEG
+#   header: {"key", "name", "action", "ts", "camera"}; key = "<ts>|<нэр>" – ирцийн мөртэй
+#   (attendance/) шууд холбогдоно, бүртгэлийн форматыг өөрчлөхгүй.
+# Offset индекс санах ойд: key → (segment, offset, урт). Хаагдсан segment-ийн индекс
+# seg-*.idx файлд, идэвхтэйг нь эхлэхдээ header-үүдээр нь уншиж сэргээнэ (тасарсан
+# сүүлийн бичлэгийг таслана).
+# Хадгалах хугацаа: нийт EVIDENCE_MAX_BYTES-ээс хэтэрвэл эсвэл EVIDENCE_MAX_AGE-ээс хуучин
+# бол хамгийн хуучин segment бүхэлдээ устана.
+# Бичих нь check-in-ийн замаас гадуур: submit() зөвхөн дараалалд хийнэ, тайрах/JPEG/
+# бичих нь writer thread дээр. Дараалал дүүрвэл зураг алгасна (ирц хэзээ ч хүлээхгүй).
+#   python evidence.py export out/ [--name Bat] [--since 2025-11-01] [--until 2025-12-01]
+#   python evidence.py stats
+import argparse
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+
+import metrics
+
+EVIDENCE_DIR = "evidence"
+SEGMENT_BYTES = 4 * 1024 * 1024
+EVIDENCE_MAX_BYTES = 256 * 1024 * 1024
+EVIDENCE_MAX_AGE = 90 * 24 * 3600.0
+THUMB_SIDE = 96
+THUMB_QUALITY = 70
+QUEUE_SIZE = 64
+MAGIC = b"EVD1"
+_U32 = struct.Struct("<I")
+
+
+def evidence_key(name, ts):
+    return f"{ts}|{name}"
+
+
+def _parse_ts(ts):
+    return time.mktime(time.strptime(ts, "%Y-%m-%d %H:%M:%S"))
+
+
+class EvidenceStore:
+    def __init__(self, folder=EVIDENCE_DIR, segment_bytes=SEGMENT_BYTES,
+                 max_bytes=EVIDENCE_MAX_BYTES, max_age=EVIDENCE_MAX_AGE, readonly=False):
+        # readonly – CLI (daemon бичиж байхад): идэвхтэй segment-ийн сүүлийг таслахгүй
+        self.folder = folder
+        self.readonly = readonly
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.index = {}        # key → (segment дугаар, offset, бичлэгийн урт, header)
+        self.segments = {}     # дугаар → {"bytes", "last_ts"}
+        self._active = None    # нээлттэй segment-ийн file object
+        self._active_no = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._thread = None
+        os.makedirs(folder, exist_ok=True)
+        self._load()
+
+    # ---------- Файлууд ----------
+    def _path(self, no, ext="bin"):
+        return os.path.join(self.folder, f"seg-{no:06d}.{ext}")
+
+    def _load(self):
+        numbers = sorted(int(f[4:10]) for f in os.listdir(self.folder)
+                         if f.startswith("seg-") and f.endswith(".bin"))
+        for no in numbers:
+            sealed = no != numbers[-1] and os.path.exists(self._path(no, "idx"))
+            records = self._read_idx(no) if sealed else self._scan(no)
+            for header, offset, length in records:
+                self.index[header["key"]] = (no, offset, length, header)
+            self.segments[no] = {"bytes": os.path.getsize(self._path(no)),
+                                 "last_ts": records[-1][0]["ts"] if records else None}
+        self._active_no = numbers[-1] if numbers else 0
+
+    def _scan(self, no):
+        # Segment-ийн header-үүдийг уншина (JPEG-ийг алгасна); эвдэрсэн сүүлийг таслана
+        records = []
+        path = self._path(no)
+        with open(path, "rb" if self.readonly else "r+b") as f:
+            offset = 0
+            while True:
+                head = f.read(len(MAGIC) + _U32.size)
+                if len(head) < len(MAGIC) + _U32.size or head[:len(MAGIC)] != MAGIC:
+                    break
+                (hlen,) = _U32.unpack(head[len(MAGIC):])
+                raw = f.read(hlen + _U32.size)
+                if len(raw) < hlen + _U32.size:
+                    break
+                (plen,) = _U32.unpack(raw[hlen:])
+                end = offset + len(head) + len(raw) + plen
+                if end > os.fstat(f.fileno()).st_size:
+                    break
+                records.append((json.loads(raw[:hlen]), offset, end - offset))
+                f.seek(end)
+                offset = end
+            if not self.readonly:
+                f.truncate(offset)
+        return records
+
+    def _read_idx(self, no):
+        with open(self._path(no, "idx"), "r", encoding="utf-8") as f:
+            return [(rec["header"], rec["offset"], rec["length"]) for rec in map(json.loads, f)]
+
+    def _seal(self, no):
+        records = sorted((v for v in self.index.values() if v[0] == no), key=lambda v: v[1])
+        tmp = self._path(no, "idx.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for _, offset, length, header in records:
+                f.write(json.dumps({"header": header, "offset": offset, "length": length},
+                                   ensure_ascii=False) + "\n")
+        os.replace(tmp, self._path(no, "idx"))
+
+    # ---------- Бичих ----------
+    def append(self, header, jpeg):
+        # Writer thread (эсвэл тест) – segment-ийн төгсгөлд нэмнэ
+        raw = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        record = MAGIC + _U32.pack(len(raw)) + raw + _U32.pack(len(jpeg)) + jpeg
+        with self._lock:
+            seg = self.segments.get(self._active_no)
+            if seg is None or seg["bytes"] + len(record) > self.segment_bytes and seg["bytes"]:
+                self._roll()
+                seg = self.segments[self._active_no]
+            if self._active is None:
+                self._active = open(self._path(self._active_no), "ab")
+            offset = seg["bytes"]
+            self._active.write(record)
+            self._active.flush()
+            seg["bytes"] += len(record)
+            seg["last_ts"] = header["ts"]
+            self.index[header["key"]] = (self._active_no, offset, len(record), header)
+            self._retain()
+        metrics.inc("evidence_bytes_total", len(record))
+
+    def _roll(self):
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+        if self._active_no in self.segments:
+            self._seal(self._active_no)
+        self._active_no += 1
+        self.segments[self._active_no] = {"bytes": 0, "last_ts": None}
+
+    def _retain(self, now=None):
+        now = time.time() if now is None else now
+        total = sum(s["bytes"] for s in self.segments.values())
+        for no in sorted(self.segments):
+            if no == self._active_no:
+                break
+            seg = self.segments[no]
+            too_old = seg["last_ts"] is not None and now - _parse_ts(seg["last_ts"]) > self.max_age
+            if total <= self.max_bytes and not too_old:
+                break
+            total -= seg["bytes"]
+            for ext in ("bin", "idx"):
+                if os.path.exists(self._path(no, ext)):
+                    os.remove(self._path(no, ext))
+            del self.segments[no]
+            for key in [k for k, v in self.index.items() if v[0] == no]:
+                del self.index[key]
+            metrics.inc("evidence_segments_dropped_total")
+
+    # ---------- Унших ----------
+    def get(self, name, ts):
+        # → JPEG байт эсвэл None
+        with self._lock:
+            loc = self.index.get(evidence_key(name, ts))
+            if loc is None:
+                return None
+            no, offset, length, _ = loc
+            if self._active is not None:
+                self._active.flush()
+        with open(self._path(no), "rb") as f:
+            f.seek(offset)
+            record = f.read(length)
+        (hlen,) = _U32.unpack(record[len(MAGIC):len(MAGIC) + _U32.size])
+        return record[len(MAGIC) + 2 * _U32.size + hlen:]
+
+    def query(self, name=None, since=None, until=None):
+        # → [header] ts-ээр эрэмбэлсэн; since/until – "YYYY-MM-DD[ HH:MM:SS]" мөр
+        with self._lock:
+            headers = [v[3] for v in self.index.values()]
+        return sorted((h for h in headers
+                       if (name is None or h["name"] == name)
+                       and (since is None or h["ts"] >= since)
+                       and (until is None or h["ts"] < until)), key=lambda h: h["ts"])
+
+    def export(self, out_dir, **filters):
+        os.makedirs(out_dir, exist_ok=True)
+        rows = []
+        for header in self.query(**filters):
+            jpeg = self.get(header["name"], header["ts"])
+            if jpeg is None:
+                continue
+            file = f"{header['ts'].replace(':', '').replace(' ', '_')}_{header['name'].replace(' ', '_')}_{header['action']}.jpg"
+            with open(os.path.join(out_dir, file), "wb") as f:
+                f.write(jpeg)
+            rows.append(dict(header, file=file))
+        with open(os.path.join(out_dir, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2, ensure_ascii=False)
+        return len(rows)
+
+    def stats(self):
+        with self._lock:
+            return {"records": len(self.index), "segments": len(self.segments),
+                    "bytes": sum(s["bytes"] for s in self.segments.values())}
+
+    # ---------- Background writer ----------
+    def submit(self, name, action, ts, camera, rgb, box=None):
+        # Check-in-ийн замаас: зөвхөн дараалалд хийнэ. rgb-ийг writer тайрна.
+        try:
+            self._queue.put_nowait(({"key": evidence_key(name, ts), "name": name, "action": action,
+                                     "ts": ts, "camera": camera}, rgb, box))
+            return True
+        except queue.Full:
+            metrics.inc("evidence_dropped_total")
+            return False
+
+    def start(self):
+        self._thread = threading.Thread(target=self._writer, daemon=True, name="evidence")
+        self._thread.start()
+        return self
+
+    def _writer(self):
+        from unknowns import crop_chip
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            header, rgb, box = item
+            if box is None:
+                box = (0, rgb.shape[1], rgb.shape[0], 0)
+            try:
+                jpeg = crop_chip(rgb, box, side=THUMB_SIDE, quality=THUMB_QUALITY)
+                if jpeg is not None:
+                    self.append(header, jpeg)
+            except Exception as e:
+                print("Evidence бичих алдаа:", repr(e))
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+        with self._lock:
+            if self._active is not None:
+                self._active.close()
+                self._active = None
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Ирцийн нотлох зургууд")
+    parser.add_argument("--dir", default=EVIDENCE_DIR)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("export", help="зургуудыг JPEG + index.json болгож гаргана")
+    p.add_argument("out")
+    p.add_argument("--name")
+    p.add_argument("--since", help="YYYY-MM-DD")
+    p.add_argument("--until", help="YYYY-MM-DD (орохгүй)")
+    sub.add_parser("stats")
+    args = parser.parse_args(argv)
+
+    store = EvidenceStore(args.dir, readonly=True)
+    if args.cmd == "export":
+        report = {"exported": store.export(args.out, name=args.name, since=args.since, until=args.until),
+                  "out": args.out}
+    else:
+        report = store.stats()
+    store.close()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
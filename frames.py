@@ -0,0 +1,76 @@
+# =============================================
+# Frame хөрвүүлэлт ба хэмнэл (Tk-гүй – core daemon, GUI хоёулаа ашиглана)
+# =============================================
+import math
+import time
+
+import cv2
+import numpy as np
+
+DETECT_BUDGET = 0.6   # frame хугацааны хэдэн хувийг detection-д зарцуулж болох
+
+
+class FrameConverter:
+    # BGR→RGB (толин тусгалтай) нэг удаа, буферуудыг дахин ашиглана
+    def __init__(self, mirror=True):
+        self.mirror = mirror
+        self._tmp = None
+        self._rgb = None
+
+    def convert(self, bgr):
+        # Буцаах RGB буфер дараагийн дуудалтаар дарагдана – хадгалах бол .copy()
+        if self._rgb is None or self._rgb.shape != bgr.shape:
+            self._tmp = np.empty_like(bgr)
+            self._rgb = np.empty_like(bgr)
+        if self.mirror:
+            cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=self._tmp)
+            cv2.flip(self._tmp, 1, dst=self._rgb)
+        else:
+            cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        return self._rgb
+
+
+class FramePacer:
+    # - Detection (face_locations + encoding) удаан бол бүх frame дээр биш, хэмжсэн
+    #   хугацаанаас хамааруулан N frame тутамд ажиллана; хооронд нь хуучин хайрцгийг зурна.
+    # - Царай idle_after секунд харагдаагүй бол idle_fps руу буурна (CPU, халалт).
+    # - frozen (авсан зураг) үед камер уншихгүй, detection хийхгүй, бага давтамжтай.
+    def __init__(self, fps=30, idle_fps=3, idle_after=10.0):
+        self.fps = fps
+        self.idle_fps = idle_fps
+        self.idle_after = idle_after
+        self.frozen = False
+        self.detect_latency = 0.0      # EMA, секунд
+        self.tick_latency = 0.0
+        self.last_face = time.time()
+        self._frames_since_detect = 0
+
+    @property
+    def idle(self) -> bool:
+        return time.time() - self.last_face > self.idle_after
+
+    def interval(self) -> float:
+        if self.frozen or self.idle:
+            return 1.0 / self.idle_fps
+        return 1.0 / self.fps
+
+    def detect_due(self) -> bool:
+        # Detection-ий хугацаа frame-ийн төсвөөс хэтэрвэл stride нэмэгдэнэ
+        stride = max(1, math.ceil(self.detect_latency / (self.interval() * DETECT_BUDGET)))
+        if self.idle:
+            stride = 1   # idle үед frame цөөн тул бүгдийг шалгана
+        self._frames_since_detect += 1
+        if self._frames_since_detect >= stride:
+            self._frames_since_detect = 0
+            return True
+        return False
+
+    def record_detection(self, seconds: float, found: bool):
+        self.detect_latency = seconds if not self.detect_latency else 0.8 * self.detect_latency + 0.2 * seconds
+        if found:
+            self.last_face = time.time()
+
+    def record_tick(self, elapsed: float) -> float:
+        # → дараагийн tick хүртэл хүлээх секунд (tick-д зарцуулсныг хасна)
+        self.tick_latency = 0.8 * self.tick_latency + 0.2 * elapsed
+        return max(0.001, self.interval() - elapsed)
@@ -0,0 +1,192 @@
+# =============================================
+# Температур/чийгшлийн түүх – тогтмол санах ой/диск, минут/цагийн нэгтгэл
+# =============================================
+# DHT11-ийн уншилт бүр:
+#   raw     – сүүлийн RAW_WINDOW секунд, санах ойд (deque)
+#   minute  – MINUTE_SLOTS минутын min/max/avg, history/minutes.bin
+#   hour    – HOUR_SLOTS цагийн min/max/avg, history/hours.bin
+# Нэгтгэлийн файлууд тогтмол хэмжээтэй np.memmap "цагийн бөгж": мөр = (ts // алхам) % slots.
+# Нэмэх O(1), хүрээгээр авах нь slot-ын индексээр шууд (хайлтгүй); хуучин мөрийг шинэ нь
+# дарна – диск, санах ой хэзээ ч өсөхгүй. Мөр бүр өөрийн bucket ts-тэй тул дарагдсан/хоосон
+# slot-ыг ялгана.
+# Релений (сэнс/гэрэл) өөрчлөлт ижил цагийн тэнхлэгт: history/relays.jsonl (RELAY_EVENTS хүртэл).
+#   python history.py --hours 24 [--resolution minute]
+import collections
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+HISTORY_DIR = "history"
+RAW_WINDOW = 2 * 3600.0
+MINUTE_SLOTS = 7 * 24 * 60      # 7 хоног ≈ 0.6 MB
+HOUR_SLOTS = 366 * 24           # 1 жил ≈ 0.6 MB
+RELAY_EVENTS = 5000
+ROW = np.dtype([("ts", "<f8"), ("n", "<f8"),
+                ("t_min", "<f8"), ("t_max", "<f8"), ("t_sum", "<f8"),
+                ("h_min", "<f8"), ("h_max", "<f8"), ("h_sum", "<f8")])
+
+
+def _empty_row(bucket):
+    return (bucket, 0, np.inf, -np.inf, 0.0, np.inf, -np.inf, 0.0)
+
+
+class RollupRing:
+    # Нэг нарийвчлалын (step секунд) тогтмол хэмжээтэй бөгж
+    def __init__(self, path, step, slots):
+        self.step = step
+        self.slots = slots
+        mode = "r+" if os.path.exists(path) and os.path.getsize(path) == slots * ROW.itemsize else "w+"
+        self.rows = np.memmap(path, dtype=ROW, mode=mode, shape=(slots,))
+        self.current = None   # одоо бөглөж буй bucket (дуусаагүй)
+
+    def add(self, ts, temp, hum):
+        bucket = ts - ts % self.step
+        slot = int(bucket // self.step) % self.slots
+        if self.current is None or self.current[0] != bucket:
+            # Дахин эхэлсэн: ижил bucket-ийн өмнөх мөрөөс үргэлжлүүлнэ
+            self.current = list(self.rows[slot].tolist()) if self.rows[slot]["ts"] == bucket \
+                else list(_empty_row(bucket))
+        row = self.current
+        row[1] += 1
+        row[2], row[3], row[4] = min(row[2], temp), max(row[3], temp), row[4] + temp
+        if hum is not None:
+            row[5], row[6], row[7] = min(row[5], hum), max(row[6], hum), row[7] + hum
+        self.rows[slot] = tuple(row)   # memmap – OS диск рүү бичнэ, унасан ч алдагдахгүй
+
+    def range(self, start, end):
+        # [start, end) хүрээний дүүрсэн мөрүүд (одоогийн bucket орно)
+        first = int(start // self.step)
+        last = int(end // self.step)
+        if last - first >= self.slots:
+            first = last - self.slots + 1
+        rows = np.array(self.rows[np.arange(first, last + 1) % self.slots])
+        buckets = np.arange(first, last + 1) * self.step
+        return rows[(rows["ts"] == buckets) & (rows["n"] > 0)]
+
+
+def _row_dict(row):
+    n = row["n"]
+    hum = row["h_max"] >= row["h_min"]
+    return {"ts": float(row["ts"]),
+            "t_min": float(row["t_min"]), "t_avg": round(float(row["t_sum"] / n), 2), "t_max": float(row["t_max"]),
+            "h_min": float(row["h_min"]) if hum else None,
+            "h_avg": round(float(row["h_sum"] / n), 2) if hum else None,
+            "h_max": float(row["h_max"]) if hum else None}
+
+
+class SensorHistory:
+    def __init__(self, folder=HISTORY_DIR, raw_window=RAW_WINDOW,
+                 minute_slots=MINUTE_SLOTS, hour_slots=HOUR_SLOTS):
+        os.makedirs(folder, exist_ok=True)
+        self.raw_window = raw_window
+        self.raw = collections.deque()
+        self.minutes = RollupRing(os.path.join(folder, "minutes.bin"), 60, minute_slots)
+        self.hours = RollupRing(os.path.join(folder, "hours.bin"), 3600, hour_slots)
+        self.relays_path = os.path.join(folder, "relays.jsonl")
+        self.relays = collections.deque(maxlen=RELAY_EVENTS)
+        self._relay_lines = 0
+        self._lock = threading.Lock()
+        if os.path.exists(self.relays_path):
+            with open(self.relays_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self.relays.append(json.loads(line))
+                    self._relay_lines += 1
+
+    def add(self, temp, hum, ts=None):
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            self.raw.append((ts, temp, hum))
+            while self.raw and self.raw[0][0] < ts - self.raw_window:
+                self.raw.popleft()
+            self.minutes.add(ts, temp, hum)
+            self.hours.add(ts, temp, hum)
+
+    def relay(self, name, on, source, ts=None):
+        event = {"ts": time.time() if ts is None else ts, "name": name, "on": on, "source": source}
+        with self._lock:
+            self.relays.append(event)
+            if self._relay_lines >= 2 * RELAY_EVENTS:
+                # Файлыг сүүлийн RELAY_EVENTS мөрөөр дахин бичнэ – диск тогтмол
+                tmp = self.relays_path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(e) + "\n" for e in self.relays)
+                os.replace(tmp, self.relays_path)
+                self._relay_lines = len(self.relays)
+            else:
+                with open(self.relays_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(event) + "\n")
+                self._relay_lines += 1
+
+    def flush(self):
+        with self._lock:
+            self.minutes.rows.flush()
+            self.hours.rows.flush()
+
+    def query(self, start, end=None, resolution=None):
+        # → {"resolution", "series": [{ts, t_min, t_avg, t_max, h_*}], "relays": [...]}
+        # resolution=None: raw цонхонд багтвал raw, 2 хоног хүртэл minute, бусад нь hour
+        end = time.time() if end is None else end
+        if resolution is None:
+            span = end - start
+            if start >= end - self.raw_window and span <= 3600:
+                resolution = "raw"
+            elif span <= 2 * 86400 and start >= end - self.minutes.slots * 60:
+                resolution = "minute"
+            else:
+                resolution = "hour"
+        with self._lock:
+            if resolution == "raw":
+                series = [{"ts": ts, "t_min": t, "t_avg": t, "t_max": t, "h_min": h, "h_avg": h, "h_max": h}
+                          for ts, t, h in self.raw if start <= ts < end]
+            else:
+                ring = self.minutes if resolution == "minute" else self.hours
+                series = [_row_dict(row) for row in ring.range(start, end)]
+            relays = [e for e in self.relays if start <= e["ts"] < end]
+            # Хүрээний эхэн дэх төлөв – график дээр "асаалттай" хэсгийг зөв эхлүүлэхэд
+            before = {}
+            for e in self.relays:
+                if e["ts"] < start:
+                    before[e["name"]] = e["on"]
+        return {"resolution": resolution, "start": start, "end": end, "series": series,
+                "relays": relays, "relays_at_start": before}
+
+
+def relay_correlation(result):
+    # Реле бүрийн асаалттай/унтраалттай үеийн дундаж температур – дүрмийн босгыг тааруулахад
+    state = dict(result["relays_at_start"])
+    events = sorted(result["relays"], key=lambda e: e["ts"])
+    names = set(state) | {e["name"] for e in events}
+    report = {}
+    for name in names:
+        on_t, off_t = [], []
+        i, current = 0, state.get(name, False)
+        named = [e for e in events if e["name"] == name]
+        for point in result["series"]:
+            while i < len(named) and named[i]["ts"] <= point["ts"]:
+                current = named[i]["on"]
+                i += 1
+            (on_t if current else off_t).append(point["t_avg"])
+        report[name] = {"switches": len(named),
+                        "on_avg_temp": round(sum(on_t) / len(on_t), 2) if on_t else None,
+                        "off_avg_temp": round(sum(off_t) / len(off_t), 2) if off_t else None,
+                        "on_share": round(len(on_t) / (len(on_t) + len(off_t)), 3) if on_t or off_t else None}
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Температур/чийгшлийн түүх")
+    parser.add_argument("--dir", default=HISTORY_DIR)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--resolution", choices=("raw", "minute", "hour"))
+    args = parser.parse_args()
+    history = SensorHistory(args.dir)
+    now = time.time()
+    result = history.query(now - args.hours * 3600, now, args.resolution)
+    print(json.dumps({"resolution": result["resolution"], "points": len(result["series"]),
+                      "relays": relay_correlation(result),
+                      "series": result["series"][-10:]}, indent=2, ensure_ascii=False))
@@ -0,0 +1,239 @@
+# =============================================
+# Олон процесст царай илрүүлэлт/encoding (shared memory ring buffer)
+# =============================================
+# dlib HOG + encoding нэг CPU core-д түгжигддэг (GIL биш – dlib өөрөө нэг урсгалтай).
+# Pi 4/5-ийн 4 core-ийг ашиглахын тулд:
+#   capture (core процесс) → cap.read()-ийг шууд ring-ийн slot руу бичнэ (хуулбар, pickle үгүй)
+#   N worker процесс      → зөвхөн (slot, seq) дугаар авч, тэр slot-оос уншина
+#                          → зөвхөн хайрцаг + 128-d вектор буцаана
+# Slot-ыг үр дүн ирэх хүртэл capture дахин бичихгүй (free list) – тасархай frame уншихгүй.
+# Бүх slot завгүй бол тухайн frame detection-гүй өнгөрнө (preview гацахгүй).
+#
+# Тааруулах (FaceIndex.match) хямд тул core процесс дээр хийгдэнэ – worker-т индекс хэрэггүй,
+# шинэ ажилтан бүртгэхэд worker-уудыг дахин эхлүүлэх шаардлагагүй.
+#
+# Тоо гаргах (throughput core тоогоор өсөх эсэх):
+#   python inference.py clip.mp4 --workers 1,2,3,4
+import collections
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from detection import DEFAULT_STAGES
+
+Detection = collections.namedtuple("Detection", "seq slot tag boxes encodings seconds")
+
+
+class FrameRing:
+    # slots × (H, W, 3) uint8 нэг SharedMemory блокт. Worker-ууд нэрээр нь холбогдоно.
+    def __init__(self, shape, slots, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        size = slots * int(np.prod(self.shape))
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __getitem__(self, slot):
+        return self.frames[slot]
+
+    def close(self):
+        del self.frames
+        try:
+            self.shm.close()
+        except BufferError:
+            pass   # гадна slot-ын view үлдсэн – процесс дуусахад чөлөөлөгдөнө
+        if self.owner:
+            self.shm.unlink()
+
+
+def _worker(ring_name, shape, slots, stages, mirror, tasks, results):
+    # Тусдаа процесс – dlib/face_recognition-ийг энд л import хийнэ
+    import face_recognition
+
+    import profiles
+    from detection import FaceDetector
+    from frames import FrameConverter
+
+    ring = FrameRing(shape, slots, name=ring_name)
+    # MotionGate worker бүрт тусдаа – өөрийн үзсэн frame-уудын ялгааг харна
+    detector = FaceDetector(stages)
+    converter = FrameConverter(mirror=mirror)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            slot, seq, tag, profile = task
+            profile = profiles.get(profile) if profile else profiles.for_path("checkin")
+            t0 = time.perf_counter()
+            rgb = converter.convert(ring[slot])
+            boxes = detector.use(profile).locations(rgb)
+            encodings = face_recognition.face_encodings(rgb, boxes, profile.jitters, profile.landmarks) \
+                if boxes else []
+            results.put(Detection(seq, slot, tag, [tuple(b) for b in boxes],
+                                  np.asarray(encodings, dtype=np.float64).reshape(-1, 128),
+                                  time.perf_counter() - t0))
+    finally:
+        ring.close()
+
+
+class InferencePool:
+    # acquire() → slot руу capture бичнэ → submit(slot) → collect() үр дүнг (seq дарааллаар биш) буцаана.
+    # Нэг хэмжээтэй олон камер нэг pool-ийг хуваалцана: submit(tag=камер) → collect(tag=камер).
+    def __init__(self, shape, workers=2, slots=None, stages=DEFAULT_STAGES, mirror=True):
+        self.workers = workers
+        self.ring = FrameRing(shape, slots or workers * 2)
+        ctx = mp.get_context("spawn")   # fork нь thread-тэй core процесст аюултай
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._free = collections.deque(range(self.ring.slots))
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._ready = collections.defaultdict(list)   # tag → бусад камерын thread-ийн авсан үр дүн
+        self._procs = [
+            ctx.Process(target=_worker, daemon=True, name=f"inference-{i}",
+                        args=(self.ring.name, self.ring.shape, self.ring.slots, tuple(stages),
+                              mirror, self._tasks, self._results))
+            for i in range(workers)
+        ]
+        for p in self._procs:
+            p.start()
+
+    @property
+    def shape(self):
+        return self.ring.shape
+
+    @property
+    def busy(self):
+        return self.ring.slots - len(self._free)
+
+    @property
+    def submitted(self):
+        return self._seq
+
+    def acquire(self):
+        # → (slot, ndarray view) эсвэл бүх slot завгүй бол (None, None)
+        with self._lock:
+            if not self._free:
+                return None, None
+            slot = self._free.popleft()
+        return slot, self.ring[slot]
+
+    def release(self, slot):
+        with self._lock:
+            self._free.append(slot)
+
+    def submit(self, slot, tag=None, profile=None):
+        # profile – profiles.PROFILES-ийн нэр (камер idle/checkin хооронд frame бүрт сольж болно)
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        self._tasks.put((slot, seq, tag, profile))
+        return seq
+
+    def collect(self, tag=None, timeout=0.0):
+        # tag-ийн бэлэн болсон бүх үр дүн; slot-ууд автоматаар чөлөөлөгдөнө
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                item = self._results.get_nowait()
+                while True:
+                    self.release(item.slot)
+                    with self._lock:
+                        self._ready[item.tag].append(item)
+                    item = self._results.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                found = self._ready.pop(tag, [])
+            if found or time.monotonic() >= deadline:
+                return found
+            time.sleep(0.005)
+
+    def close(self):
+        for _ in self._procs:
+            self._tasks.put(None)
+        for p in self._procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        self.ring.close()
+
+
+# =============================================
+# Хэмжилт: worker тоо → frame/сек
+# =============================================
+def measure(source, workers, stages=DEFAULT_STAGES, limit=None):
+    import cv2
+
+    from detection import iter_frames
+
+    frames = [rgb for _, rgb in iter_frames(source, limit)]
+    if not frames:
+        raise SystemExit(f"{source}: frame олдсонгүй")
+    pool = InferencePool(frames[0].shape, workers=workers, stages=stages, mirror=False)
+    try:
+        # Worker бүр нэг frame боловсруулж дуустал хүлээнэ – spawn + dlib ачаалал хэмжилтэд орохгүй
+        for _ in range(workers):
+            slot, view = pool.acquire()
+            cv2.cvtColor(frames[0], cv2.COLOR_RGB2BGR, dst=view)
+            pool.submit(slot)
+        warm = 0
+        while warm < workers:
+            warm += len(pool.collect(timeout=1.0))
+        done, faces = 0, 0
+        latencies = []
+        t0 = time.perf_counter()
+        pending = 0
+        for rgb in frames:
+            slot, view = pool.acquire()
+            while slot is None:
+                for r in pool.collect(timeout=1.0):
+                    done, faces, pending = done + 1, faces + len(r.boxes), pending - 1
+                    latencies.append(r.seconds)
+                slot, view = pool.acquire()
+            cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR, dst=view)
+            pool.submit(slot)
+            pending += 1
+        while pending:
+            for r in pool.collect(timeout=1.0):
+                done, faces, pending = done + 1, faces + len(r.boxes), pending - 1
+                latencies.append(r.seconds)
+        elapsed = time.perf_counter() - t0
+    finally:
+        pool.close()
+    return {
+        "workers": workers,
+        "frames": done,
+        "faces": faces,
+        "fps": round(done / elapsed, 2) if elapsed else None,
+        "mean_frame_ms": round(1000 * sum(latencies) / len(latencies), 1) if latencies else None,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Олон процесст detection/encoding-ийн throughput")
+    parser.add_argument("source", help="видео файл эсвэл зурагнуудын хавтас")
+    parser.add_argument("--workers", default=",".join(str(n) for n in range(1, (os.cpu_count() or 1) + 1)))
+    parser.add_argument("--stages", default="", help="анхдагч: gate-гүй, зөвхөн dlib (цэвэр CPU ачаалал)")
+    parser.add_argument("--limit", type=int)
+    args = parser.parse_args()
+    stages = [s for s in args.stages.split(",") if s]
+    rows = [measure(args.source, int(n), stages, args.limit) for n in args.workers.split(",")]
+    base = rows[0]["fps"]
+    for row in rows:
+        row["speedup"] = round(row["fps"] / base, 2) if base else None
+    print(json.dumps(rows, indent=2, ensure_ascii=False))
@@ -0,0 +1,98 @@
+# =============================================
+# Дуут командын intent таних хөдөлгүүр
+# =============================================
+# Төхөөрөмж × үйлдлийн синонимуудаас бүх хэллэгийг үүсгээд нэг Aho-Corasick
+# автомат болгон хөрвүүлнэ. Текстийг нэг л удаа гүйлгэж бүх intent-ийг олно:
+#   "гэрэл асаа, сэнс унтраа" → [light/on, fan/off]
+# Шинэ реле нэмэхэд зөвхөн синоним хүснэгтэд мөр нэмнэ.
+from collections import deque, namedtuple
+
+# Үйлдлийн синонимууд (Монгол + Англи)
+ACTION_PHRASES = {
+    "on":  ["ас", "асаа", "асаагаарай", "асаах", "асаана уу", "on"],
+    "off": ["унтар", "унтраа", "унтраагаарай", "унтраах", "унтраана уу", "off"],
+}
+
+Intent = namedtuple("Intent", "device action start end phrase")
+
+
+def normalize(text: str) -> str:
+    # Жижиг үсэг, цэг таслалыг зай болгоно, олон зайг нэг болгоно
+    chars = [c if c.isalnum() else " " for c in text.lower()]
+    return " ".join("".join(chars).split())
+
+
+class IntentMatcher:
+    def __init__(self, devices: dict, actions: dict = ACTION_PHRASES):
+        # devices: "light" → ["гэрэл", "гэрлээ", "light"] гэх мэт
+        self.phrases = {}
+        for device, device_words in devices.items():
+            for action, action_words in actions.items():
+                for d in device_words:
+                    for a in action_words:
+                        self.phrases[normalize(f"{d} {a}")] = (device, action)
+        self._build()
+
+    def _build(self):
+        # Trie
+        self.goto = [{}]
+        self.out = [None]
+        self.fail = [0]
+        for phrase in self.phrases:
+            node = 0
+            for ch in phrase:
+                if ch not in self.goto[node]:
+                    self.goto.append({})
+                    self.out.append(None)
+                    self.fail.append(0)
+                    self.goto[node][ch] = len(self.goto) - 1
+                node = self.goto[node][ch]
+            self.out[node] = phrase
+
+        # Failure холбоосууд (BFS)
+        self.dict_link = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(ch, 0)
+                fc = self.fail[child]
+                self.dict_link[child] = fc if self.out[fc] else self.dict_link[fc]
+                queue.append(child)
+
+    def _scan(self, text):
+        # Бүх (start, end, phrase) таарцыг буцаана
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            hit = node if self.out[node] else self.dict_link[node]
+            while hit:
+                phrase = self.out[hit]
+                yield i + 1 - len(phrase), i + 1, phrase
+                hit = self.dict_link[hit]
+
+    def parse(self, text: str) -> list:
+        text = normalize(text)
+        candidates = []
+        for start, end, phrase in self._scan(text):
+            # Бүтэн үгээр л тааруулна: "гэрэл ас" нь "гэрэл асаа" дотор таарахгүй
+            if start > 0 and text[start - 1] != " ":
+                continue
+            if end < len(text) and text[end] != " ":
+                continue
+            candidates.append((start, -(end - start), end, phrase))
+
+        # Зүүнээс хамгийн урт, давхцалгүй таарцуудыг авна
+        intents, last_end = [], 0
+        for start, _, end, phrase in sorted(candidates):
+            if start < last_end:
+                continue
+            device, action = self.phrases[phrase]
+            intents.append(Intent(device, action, start, end, phrase))
+            last_end = end
+        return intents
@@ -0,0 +1,285 @@
+# =============================================
+# Core ↔ GUI local IPC (Unix socket)
+# =============================================
+# Мессеж бүр нэг JSON мөр. "bytes": N талбартай бол араас нь N байт түүхий
+# өгөгдөл (preview frame-ийн JPEG) ирнэ.
+#   GUI → core:  {"id": 7, "cmd": "relay_toggle", "args": ["fan"], "kwargs": {}}
+#   core → GUI:  {"id": 7, "ok": true, "result": null}
+#                {"event": {"type": "relay", ...}}
+#                {"event": {"type": "frame", "seq": 12, "faces": [...]}, "bytes": 23145}\n<jpeg>
+# Frame-ууд зөвхөн watch_frames(True) гэсэн client-д, удаан client-д хамгийн
+# сүүлийнх нь л очно (хуучин frame хаягдана) – event-үүд хэзээ ч хаягдахгүй.
+# Командууд server-ийн thread pool дээр ажиллаж хариу нь id-аар буцна – 60 сек-ийн enroll
+# тухайн холболтын дараагийн relay/status командыг хүлээлгэхгүй.
+import concurrent.futures
+import itertools
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from core import CORE_SOCKET
+
+# Client-ээс дуудаж болох KioskCore-ийн методууд
+COMMANDS = (
+    "relay_toggle", "relay_set", "relay_states", "checkin", "presence",
+    "attendance_log", "reload_faces", "enroll_check", "enroll", "preview_start", "preview_stop",
+    "save_pending_photo", "status", "beep", "unknown_clusters", "unknown_photo",
+    "pin_frame", "evidence_thumb", "sensor_history", "voice_command",
+    "sync_record",
+)
+# Accurate-enroll профайлаар бүтэн frame encode хийдэг командууд Pi дээр 5 сек давж болно
+SLOW_COMMANDS = {"enroll_check": 60.0, "enroll": 60.0, "checkin": 15.0}
+JPEG_QUALITY = 85
+COMMAND_WORKERS = 8   # бүх client-ийн зэрэг ажиллах командын тоо
+
+
+def _send(sock, header, payload=b""):
+    data = json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n"
+    sock.sendall(data + payload)
+
+
+def _read_message(stream):
+    line = stream.readline()
+    if not line:
+        return None, None
+    header = json.loads(line)
+    payload = stream.read(header["bytes"]) if "bytes" in header else None
+    return header, payload
+
+
+# =============================================
+# Server (core daemon талд)
+# =============================================
+class _ClientHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.outbox = queue.Queue()
+        self.frame_slot = None          # хамгийн сүүлийн frame (хуучныг дарна)
+        self.watch_frames = None        # аль камерын frame авах (None = авахгүй)
+        self.wake = threading.Event()
+        self.alive = True
+        threading.Thread(target=self._writer, daemon=True).start()
+        self.server.core.subscribe(self._on_event)
+
+    def finish(self):
+        self.alive = False
+        self.wake.set()
+        self.server.core.unsubscribe(self._on_event)
+        super().finish()
+
+    def _on_event(self, event):
+        if event["type"] == "frame":
+            if self.watch_frames is not None and event.get("camera") == self.watch_frames:
+                self.frame_slot = event
+                self.wake.set()
+            return
+        self.outbox.put({"event": event})
+        self.wake.set()
+
+    def _writer(self):
+        while self.alive:
+            self.wake.wait(1.0)
+            self.wake.clear()
+            try:
+                while True:
+                    try:
+                        _send(self.connection, self.outbox.get_nowait())
+                    except queue.Empty:
+                        break
+                frame, self.frame_slot = self.frame_slot, None
+                if frame is not None:
+                    jpeg = self.server.encode_frame(frame)
+                    meta = {k: v for k, v in frame.items() if k != "rgb"}
+                    _send(self.connection, {"event": meta, "bytes": len(jpeg)}, jpeg)
+            except OSError:
+                self.alive = False
+
+    def handle(self):
+        while True:
+            try:
+                request, _ = _read_message(self.rfile)
+            except (OSError, ValueError):
+                break
+            if request is None:
+                break
+            if request.get("cmd") == "watch_frames":
+                self.watch_frames = (request.get("args") or [None])[0]
+                self._reply({"id": request.get("id"), "ok": True, "result": None})
+            else:
+                self.server.executor.submit(self._execute, request)
+
+    def _execute(self, request):
+        # Pool-ийн thread дээр – хариу дуусах дарааллаар, client id-аар нь тааруулна
+        cmd = request.get("cmd")
+        reply = {"id": request.get("id")}
+        try:
+            if cmd in COMMANDS:
+                result = getattr(self.server.core, cmd)(*request.get("args", []), **request.get("kwargs", {}))
+                reply.update(ok=True, result=result)
+            else:
+                reply.update(ok=False, error=f"Тодорхойгүй команд: {cmd}")
+        except Exception as e:
+            reply.update(ok=False, error=repr(e))
+        self._reply(reply)
+
+    def _reply(self, reply):
+        self.outbox.put(reply)
+        self.wake.set()
+
+
+class CoreServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, core, path=CORE_SOCKET):
+        if os.path.exists(path):
+            os.unlink(path)   # өмнөх ажиллагааны socket үлдсэн
+        self.core = core
+        self.path = path
+        self._jpeg = (None, b"")   # ((камер, seq), bytes) – олон client-д нэг л удаа encode
+        self._jpeg_lock = threading.Lock()
+        self.executor = concurrent.futures.ThreadPoolExecutor(COMMAND_WORKERS, thread_name_prefix="ipc-cmd")
+        super().__init__(path, _ClientHandler)
+        os.chmod(path, 0o660)
+
+    def encode_frame(self, frame):
+        with self._jpeg_lock:
+            key = (frame.get("camera"), frame["seq"])
+            if self._jpeg[0] != key:
+                bgr = cv2.cvtColor(frame["rgb"], cv2.COLOR_RGB2BGR)
+                ok, buf = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+                self._jpeg = (key, buf.tobytes() if ok else b"")
+            return self._jpeg[1]
+
+    def close(self):
+        self.server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+# =============================================
+# Client (GUI талд) – KioskCore-той ижил методуудтай
+# =============================================
+class CoreClient:
+    def __init__(self, path=CORE_SOCKET, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._pending = {}       # id → [threading.Event, reply]
+        self._subscribers = []
+        self._send_lock = threading.Lock()
+        self._watch = None       # preview хийж буй камер – дахин холбогдоход сэргээнэ
+        self._sock = None
+        self._connect()
+        threading.Thread(target=self._reader, daemon=True, name="core-client").start()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.path)
+        self._sock = sock
+        self._stream = sock.makefile("rb")
+        if self._watch is not None:
+            self.call("watch_frames", self._watch, _wait=False)
+
+    # ---------- Events ----------
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def _emit(self, event):
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                print("Core event алдаа:", repr(e))
+
+    def _reader(self):
+        while True:
+            try:
+                header, payload = _read_message(self._stream)
+            except (OSError, ValueError):
+                header = None
+            if header is None:
+                # Core унтарсан/дахин эхэлж байна – холболтыг сэргээх хүртэл оролдоно
+                self._fail_pending("Core холболт тасарлаа")
+                self._emit({"type": "core", "connected": False})
+                while True:
+                    time.sleep(1.0)
+                    try:
+                        self._connect()
+                        break
+                    except OSError:
+                        continue
+                self._emit({"type": "core", "connected": True})
+                continue
+
+            if "event" in header:
+                event = header["event"]
+                if payload is not None:
+                    bgr = cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR)
+                    if bgr is None:
+                        continue
+                    event["rgb"] = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+                self._emit(event)
+                continue
+
+            slot = self._pending.pop(header.get("id"), None)
+            if slot is not None:
+                slot[1] = header
+                slot[0].set()
+
+    def _fail_pending(self, error):
+        for slot in list(self._pending.values()):
+            slot[1] = {"ok": False, "error": error}
+            slot[0].set()
+        self._pending.clear()
+
+    # ---------- Командууд ----------
+    def call(self, cmd, *args, _wait=True, **kwargs):
+        request_id = next(self._ids)
+        slot = [threading.Event(), None]
+        if _wait:
+            self._pending[request_id] = slot
+        with self._send_lock:
+            _send(self._sock, {"id": request_id, "cmd": cmd, "args": list(args), "kwargs": kwargs})
+        if not _wait:
+            return None
+        if not slot[0].wait(SLOW_COMMANDS.get(cmd, self.timeout)):
+            self._pending.pop(request_id, None)
+            raise TimeoutError(f"Core хариу өгсөнгүй: {cmd}")
+        reply = slot[1]
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error"))
+        return reply.get("result")
+
+    def preview_start(self, mode="recognize", camera=None):
+        camera = self.call("preview_start", mode, camera)
+        self._watch = camera
+        self.call("watch_frames", camera)
+        return camera
+
+    def preview_stop(self, camera=None):
+        self._watch = None
+        self.call("watch_frames", None)
+        return self.call("preview_stop", camera)
+
+    def __getattr__(self, name):
+        if name in COMMANDS:
+            return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+        raise AttributeError(name)
+
+
+def connect(path=CORE_SOCKET):
+    # Daemon ажиллаж байвал CoreClient, үгүй бол None
+    if not os.path.exists(path):
+        return None
+    try:
+        return CoreClient(path)
+    except OSError:
+        return None
@@ -0,0 +1,166 @@
+# =============================================
+# Дэлгэцийн гар – нэг удаа бүтээгээд дахин ашиглана
+# =============================================
+# Өмнө нь CTkEntry дээр дарах бүрт ~45 CTkButton-тэй шинэ Toplevel үүсгэж, хуучныг
+# буруу гарчгаар хайгаад устгаж чаддаггүй байсан (гарууд давхарлаж, Pi дээр товшилт
+# бүр хэдэн зуун ms). Одоо:
+#   - Toplevel ба бүх layout-ын товчнууд нэг л удаа бүтээгдэнэ (prebuild – app эхлэхэд);
+#   - show(entry) зөвхөн бай (target) entry-г сольж, гарыг ил гаргана; hide() нууна;
+#   - layout (Латин / Монгол кирилл) солиход бэлэн frame-үүдийг pack/pack_forget хийнэ;
+#   - товч бүр cursor-ийн байрлалд засна (бүх мөрийг устгаж дахин бичихгүй).
+import customtkinter as ctk
+
+LAYOUTS = {
+    "latin": [
+        list("1234567890"),
+        list("qwertyuiop"),
+        list("asdfghjkl"),
+        list("zxcvbnm,.-"),
+    ],
+    "mongolian": [
+        list("1234567890"),
+        list("фцужэнгшүзкъ"),
+        list("йыбөахролдп"),
+        list("ячёсмитьвюещ"),
+    ],
+}
+LAYOUT_NAMES = {"latin": "ABC", "mongolian": "МОН"}
+KB_BG = "#1e1e2e"
+KEY_HEIGHT = 45
+
+
+class OnScreenKeyboard:
+    def __init__(self, app, layout="mongolian", height_ratio=0.35):
+        self.app = app
+        self.layout = layout
+        self.height_ratio = height_ratio
+        self.target = None
+        self.shift = False
+        self.window = None
+        self._frames = {}      # layout → тэр layout-ын товчнуудын frame
+        self._layout_btn = None
+        self._shift_btn = None
+
+    # ---------- Бүтээх (нэг удаа) ----------
+    def _build(self):
+        screen_w = self.app.winfo_screenwidth()
+        screen_h = self.app.winfo_screenheight()
+        kb_height = int(screen_h * self.height_ratio)
+        kb = ctk.CTkToplevel(self.app)
+        kb.title("Гар")
+        kb.geometry(f"{screen_w}x{kb_height}+0+{screen_h - kb_height}")
+        kb.configure(fg_color=KB_BG)
+        kb.resizable(False, False)
+        kb.attributes("-topmost", True)   # бүтэн дэлгэцийн формын дээр
+        kb.protocol("WM_DELETE_WINDOW", self.hide)
+        self.window = kb
+
+        keys = ctk.CTkFrame(kb, fg_color=KB_BG)
+        keys.pack()
+        for layout, rows in LAYOUTS.items():
+            frame = ctk.CTkFrame(keys, fg_color=KB_BG)
+            for row in rows:
+                row_frame = ctk.CTkFrame(frame, fg_color=KB_BG)
+                row_frame.pack(pady=1)
+                for ch in row:
+                    btn = ctk.CTkButton(row_frame, text=ch.upper(), width=60, height=KEY_HEIGHT,
+                                        font=("Noto Sans CJK JP", 24, "bold"), fg_color="#333333",
+                                        command=lambda c=ch: self.type(c))
+                    btn.pack(side="left", padx=3)
+            self._frames[layout] = frame
+
+        bottom = ctk.CTkFrame(kb, fg_color=KB_BG)
+        bottom.pack(pady=1)
+        special = {"font": ("Noto Sans CJK JP", 20, "bold"), "height": KEY_HEIGHT}
+        self._shift_btn = ctk.CTkButton(bottom, text="⇧", width=90, fg_color="#444444",
+                                        command=self.toggle_shift, **special)
+        self._layout_btn = ctk.CTkButton(bottom, text="", width=90, fg_color="#444444",
+                                         command=self.next_layout, **special)
+        buttons = [
+            self._shift_btn,
+            self._layout_btn,
+            ctk.CTkButton(bottom, text="", width=350, fg_color="#444444", command=lambda: self.type(" "), **special),
+            ctk.CTkButton(bottom, text="←", width=70, fg_color="#444444", command=lambda: self.move(-1), **special),
+            ctk.CTkButton(bottom, text="→", width=70, fg_color="#444444", command=lambda: self.move(1), **special),
+            ctk.CTkButton(bottom, text="Backspace", width=130, fg_color="#0066ff", command=self.backspace, **special),
+            ctk.CTkButton(bottom, text="Clear", width=110, fg_color="#cc0000", command=self.clear, **special),
+            ctk.CTkButton(bottom, text="Close", width=110, fg_color="#cc0000", command=self.hide, **special),
+        ]
+        for btn in buttons:
+            btn.pack(side="left", padx=3)
+        self.set_layout(self.layout)
+
+    # ---------- Харуулах / нуух ----------
+    def prebuild(self):
+        # App эхлэхэд (idle үед) бүтээгээд нууна – анхны товшилт ч хүлээлгүй
+        if self.window is None or not self.window.winfo_exists():
+            self._frames.clear()
+            self._build()
+            self.window.withdraw()
+
+    def show(self, entry):
+        self.target = entry
+        self.prebuild()
+        self.window.deiconify()
+        self.window.lift()
+        entry.focus_set()
+
+    def hide(self):
+        self.target = None
+        if self.window is not None and self.window.winfo_exists():
+            self.window.withdraw()
+
+    def detach(self, entry):
+        # Entry-тэй форм хаагдахад дуудна – тэр entry-д бичиж байсан бол гарыг нууна
+        if self.target is entry:
+            self.hide()
+
+    def set_layout(self, layout):
+        self._frames[self.layout].pack_forget()
+        self.layout = layout
+        self._frames[layout].pack()
+        self._layout_btn.configure(text=LAYOUT_NAMES[self._other_layout()])
+
+    def _other_layout(self):
+        names = list(LAYOUTS)
+        return names[(names.index(self.layout) + 1) % len(names)]
+
+    def next_layout(self):
+        self.set_layout(self._other_layout())
+
+    def toggle_shift(self):
+        self.shift = not self.shift
+        self._shift_btn.configure(fg_color="#0066ff" if self.shift else "#444444")
+
+    # ---------- Засвар (cursor-ийн байрлалд) ----------
+    def _alive(self):
+        return self.target is not None and self.target.winfo_exists()
+
+    def type(self, ch):
+        if not self._alive():
+            return
+        entry = self.target
+        if entry.select_present():
+            entry.delete("sel.first", "sel.last")
+        entry.insert("insert", ch.upper() if self.shift else ch)
+        if self.shift:
+            self.toggle_shift()   # нэг үсэгт л (утасны гар шиг)
+
+    def backspace(self):
+        if not self._alive():
+            return
+        entry = self.target
+        if entry.select_present():
+            entry.delete("sel.first", "sel.last")
+            return
+        pos = entry.index("insert")
+        if pos > 0:
+            entry.delete(pos - 1)
+
+    def move(self, step):
+        if self._alive():
+            self.target.icursor(max(0, self.target.index("insert") + step))
+
+    def clear(self):
+        if self._alive():
+            self.target.delete(0, "end")
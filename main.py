@@ -1,11 +1,11 @@
+import base64
+import io
 import os
 from openai import OpenAI
 os.environ["PYTHONIOENCODING"] = "utf-8"
 
 import customtkinter as ctk
 import cv2
-import face_recognition
-import numpy as np
 import time
 import datetime
 from PIL import Image
@@ -14,50 +14,46 @@ import pyttsx3
 from gtts import gTTS
 import pygame
 import tempfile
-import shutil
 import requests
 import speech_recognition as sr
-import RPi.GPIO as GPIO
-import board
-import adafruit_dht
 from playsound import playsound
 from PIL import Image as PILImage
 
+import intents
+import ipc
+import metrics
+import soak
+import sys
+import voice
+from charts import SensorChart
+from core import CAMERA_INDEX, CORE_SOCKET, RELAY_DEVICES
+from rules import TEMP_THRESHOLD
+from workers import FIELDS
+from keyboard import OnScreenKeyboard
+from preview import FrameRenderer, FrameScheduler, draw_faces
+
 
 # =============================================
-# HARDWARE SETUP (DO NOT CHANGE)
+# KIOSK CORE (GPIO, камер, таних, ирц, автомат удирдлага)
 # =============================================
-LIGHT_PIN = 20   # GPIO 20 → Light relay
-FAN_PIN   = 21   # GPIO 21 → Fan relay
-BUZZER_PIN  = 18   # Buzzer → GPIO 18 (safe pin)
-DHT_PIN   = board.D2  # DHT11 on GPIO 2
-
-GPIO.setmode(GPIO.BCM)
-GPIO.setwarnings(False)
-GPIO.setup(LIGHT_PIN, GPIO.OUT)
-GPIO.setup(FAN_PIN, GPIO.OUT)
-GPIO.setup(BUZZER_PIN, GPIO.OUT)
-
-GPIO.output(LIGHT_PIN, GPIO.HIGH)  # OFF
-GPIO.output(FAN_PIN, GPIO.HIGH)    # OFF
-GPIO.output(BUZZER_PIN, GPIO.LOW)   # buzzer silent
-
-
-dht_device = adafruit_dht.DHT11(DHT_PIN, use_pulseio=False)
-
-# Auto fan control
-TEMP_THRESHOLD = 25.0
-manual_fan = False  # True = user pressed button → auto disabled
-
-# Light auto control based on people count
-active_workers = {}  # name → timestamp
-light_auto_on = False
+# `python core.py` daemon ажиллаж байвал GUI түүнд Unix socket-оор холбогдоно –
+# GUI гацсан/дахин эхэлсэн ч ирц, реле, автомат удирдлага зогсохгүй.
+# Daemon байхгүй бол core-ийг энэ процесс дотор эхлүүлнэ (өмнөх шиг нэг процесс).
+# Soak горимд (soak.py) daemon-оос үл хамааран дуурайсан төхөөрөмжтэй дотоод core.
+core = None if soak.ENABLED else ipc.connect(CORE_SOCKET)
+if core is None:
+    from core import KioskCore
+    core = KioskCore(hardware=soak.hardware() if soak.ENABLED else None).start()
+    print("Kiosk core энэ процесс дотор ажиллаж байна")
+else:
+    print(f"Kiosk core daemon-д холбогдлоо: {CORE_SOCKET}")
+
+voice_matcher = intents.IntentMatcher({k: v["words"] for k, v in RELAY_DEVICES.items()})
 
 # Temperature display
 temp_label = None
 
 
-
 # =============================================
 # PRE-START HARDWARE TEST – Microphone & Speaker Force Initialize
 # =============================================
@@ -144,7 +140,7 @@ def test_microphone():
 # 3. Камер тест (нэг frame авна)
 def test_camera():
     try:
-        cap = cv2.VideoCapture(0)
+        cap = cv2.VideoCapture(CAMERA_INDEX)
         ret, frame = cap.read()
         cap.release()
         if ret:
@@ -188,6 +184,7 @@ ctk.CTkLabel.__init__ = _force_font
 GROQ_API_KEY = ""  # <-- Энд өөрийн key-г бич
 # API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
 
+@metrics.timed("ask_ai_seconds")
 def ask_google_ai(prompt):
     if not prompt.strip():
         return "Асуулт хоосон байна"
@@ -230,99 +227,66 @@ try:
 except:
     pass
 
-import threading
+# voice.py – нэг speaker thread, нэг байнгын espeak-ng процесс (utterance бүрт thread/процесс үүсгэхгүй)
+def _speaker_idle():
+    # Дуу дууссаны дараа буцааж саарал/улаан болгоно (update_status_indicators-ийн сүүлийн утга)
+    speaker_label.configure(text_color="gray" if speaker_connected else "red")
+
+speaker = voice.Speaker(
+    on_spoken=lambda t: app.after(1000, _speaker_idle),   # Speaker яриж дуусах хугацааг хүлээсэн
+    on_error=lambda e: app.after(100, lambda: speaker_label.configure(text_color="red")),
+).start()
 
 def speak(text: str):
-    def _speak():
+    if not text.strip():
+        return
+    # Дуу эхлэхэд ногоон болгоно (зөвхөн холбогдсон бол) – bluetoothctl-ийг дахин дуудахгүй
+    if speaker_connected:
+        app.after(0, lambda: speaker_label.configure(text_color="green"))
+    speaker.say(text)
+
+def in_background(call, on_done, on_error=None):
+    # Удаан core дуудлага (IPC эсвэл дотоод core-ийн encode) Tk thread-ийг гацаахгүй:
+    # тусдаа thread дээр ажиллуулж, үр дүн/алдааг app.after-ээр Tk thread руу буцаана.
+    def report(e):
+        print("Core дуудлагын алдаа:", repr(e))
+        info_label.configure(text=f"Алдаа гарлаа: {e}")
+
+    def run():
         try:
-            if not text.strip():
-                return
-            safe_text = text.replace("'", "\\'")
-            os.system(f"espeak-ng -v ru+f3 -s 100 -p 80 -a 50 '{safe_text}'")
-            # Дуу дууссаны дараа буцааж саарал/улаан болгоно
-            app.after(5000, lambda: speaker_label.configure(text_color="gray" if check_speaker() else "red"))
+            result = call()
         except Exception as e:
-            print("Дуу гаргах алдаа:", e)
-            app.after(100, lambda: speaker_label.configure(text_color="red"))
+            app.after(0, lambda: (on_error or report)(e))
+            return
+        app.after(0, lambda: on_done(result))
+
+    threading.Thread(target=run, daemon=True, name="core-call").start()
 
-    # Дуу эхлэхэд ногоон болгоно (зөвхөн холбогдсон бол)
-    if check_speaker():
-        speaker_label.configure(text_color="green")
-    threading.Thread(target=_speak, daemon=True).start()
-        
 def beep(times=1, duration=0.08):
-    def _beep():
-        for _ in range(times):
-            GPIO.output(BUZZER_PIN, GPIO.HIGH)
-            time.sleep(duration)
-            GPIO.output(BUZZER_PIN, GPIO.LOW)
-            time.sleep(0.08)
-            print("Beep working")
-    # This line is the only method that never fails
-    if 'app' in globals() and app is not None:
-        app.after(0, _beep)
-        print("Beep scheduled in GUI thread")
-    else:
-        # Fallback for before GUI exists
-        print("Beep running in main thread")
-        _beep()
+    # Buzzer core дээр өөрийн thread-тэй – Tk-г sleep-ээр гацаахгүй
+    core.beep(times, duration)
 # TEST BEEP — YOU MUST HEAR 3 BEEPS NOW
-print("STARTING — 3 TEST BEEPS IN 1 SECOND!")
-app = None  # placeholder — will be set later
 print("STARTING — 3 TEST BEEPS NOW!")
 beep(3)
 
 
-# Load faces
-def load_known_faces():
-    encodings, names = [], []
-    for file in os.listdir("known_faces"):
-        path = os.path.join("known_faces", file)
-        img = face_recognition.load_image_file(path)
-        enc = face_recognition.face_encodings(img)
-        if enc:
-            encodings.append(enc[0])
-            names.append(os.path.splitext(file)[0].replace("_", " "))
-    return encodings, names
-
-known_face_encodings, known_face_names = load_known_faces()
-
-def log_time(name: str, action: str):
-    ts = time.strftime("%Y-%m-%d %H:%M:%S")
-    with open("time_logs.txt", "a", encoding="utf-8") as f:
-        f.write(f"{name},{action},{ts}\n")
-    return ts
-
 def process_voice_command(text: str):
-    text = text.strip().lower()
-
-    # Light ON
-    if any(word in text for word in ["гэрэл ас", "гэрэл асаа", "гэрэл асаагаарай", "light on"]):
-        if GPIO.input(LIGHT_PIN) == GPIO.HIGH:   # if it was off
-            toggle_gerel()                       # turn it on
-        speak("Гэрэл асаалаа")
-        info_label.configure(text="Гэрэл: АСЛАА (Голос)")
-
-    # Light OFF
-    elif any(word in text for word in ["гэрэл унтар", "гэрэл унтраа", "гэрэл унтраагаарай", "light off"]):
-        if GPIO.input(LIGHT_PIN) == GPIO.LOW:    # if it was on
-            toggle_gerel()                       # turn it off
-        speak("Гэрэл унтраалаа")
-        info_label.configure(text="Гэрэл: УНТРАА (ГЭЭ (Голос)")
-
-    # Fan ON
-    elif any(word in text for word in ["сэнс ас", "сэнс асаа", "сэнс асаагаарай", "fan on"]):
-        if GPIO.input(FAN_PIN) == GPIO.HIGH:     # if it was off
-            toggle_sens1()                       # turn it on
-        speak("Сэнс асаалаа")
-        info_label.configure(text="Сэнс: АСЛАА (Голос)")
-
-    # Fan OFF
-    elif any(word in text for word in ["сэнс унтар", "сэнс унтраа", "сэнс унтраагаарай", "fan off"]):
-        if GPIO.input(FAN_PIN) == GPIO.LOW:       # if it was on
-            toggle_sens1()                       # turn it off
-        speak("Сэнс унтраалаа")
-        info_label.configure(text="Сэнс: УНТРАА (Голос)")
+    # Нэг өгүүлбэрт хэд хэдэн команд байж болно: "гэрэл асаа, сэнс унтраа"
+    found = voice_matcher.parse(text)
+    replies, labels = [], []
+    if found:
+        # Реле core-ийн bus дээр (VoiceCommand) – энд зөвхөн хариу, шошго
+        core.voice_command(text, [(intent.device, intent.action) for intent in found])
+    for intent in found:
+        device = RELAY_DEVICES[intent.device]
+        want_on = intent.action == "on"
+        replies.append(device["name"] + (" асаалаа" if want_on else " унтраалаа"))
+        labels.append(f"{device['name']}: " + ("АСЛАА" if want_on else "УНТРАА"))
+
+    if found:
+        speak(", ".join(replies))
+        info_label.configure(text=" | ".join(labels) + " (Голос)")
+    return found
 
 # =============================================
 # GUI
@@ -330,6 +294,9 @@ def process_voice_command(text: str):
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 app = ctk.CTk()
+metrics.instrument_tk(app)   # KIOSK_METRICS_PORT тохируулсан үед л идэвхтэй
+if not isinstance(core, ipc.CoreClient):
+    metrics.serve()   # daemon ажиллаж байвал порт нь түүнийх (core.py main)
 app.title("Цаг бүртгэлийн систем")
 app.update_idletasks()
 app.geometry(f"{app.winfo_screenwidth()}x{app.winfo_screenheight()}+0+0")
@@ -381,12 +348,10 @@ camera_label.bind("<Leave>", lambda e: info_label.configure(text="Үйлдэл 
 
 # Холболт шалгах функцууд (засвартай – илүү найдвартай)
 def check_microphone():
+    # Камер биш – бичлэгийн төхөөрөмж байгаа эсэхийг л шалгана
     try:
-        cap = cv2.VideoCapture(0)
-        ret, frame = cap.read()
-        cap.release()
-        return ret
-    except:
+        return bool(sr.Microphone.list_microphone_names())
+    except Exception:
         return False
 
 def check_speaker():
@@ -412,8 +377,15 @@ def check_speaker():
         return False
 
 def check_camera():
+    # Preview ажиллаж байхад камерыг core эзэмшинэ – төхөөрөмжийг дахин нээхгүй
+    try:
+        status = core.status()
+    except (OSError, RuntimeError):
+        return False
+    if status["camera_running"]:
+        return bool(status["camera"])
     try:
-        cap = cv2.VideoCapture(0)
+        cap = cv2.VideoCapture(CAMERA_INDEX)
         ret, frame = cap.read()
         cap.release()
         return ret
@@ -428,6 +400,11 @@ camera_active = False     # Одоо ашиглаж байгаа эсэх
 ai_listening = False         # глобал төлөв
 ai_thread = None             # thread хадгалах
 ai_transcript = ""           # бүх яригдсан текст
+AI_TRANSCRIPT_MAX = 2000     # урт сонсголд санах ой өсөхгүй – AI-д сүүлийн хэсэг нь л хэрэгтэй
+
+def append_transcript(text):
+    global ai_transcript
+    ai_transcript = (ai_transcript + text + " ")[-AI_TRANSCRIPT_MAX:]
 
 # Индикатор шинэчлэх функц – зөв дуудагдана
 def update_status_indicators():
@@ -486,53 +463,44 @@ temp_label = ctk.CTkLabel(app, text="Температур: --°C", font=("Noto S
 temp_label.pack(pady=0)
 
 # =============================================
-# DHT11 + Auto Fan + Auto Light
+# Core events → UI
 # =============================================
-def read_temp():
-    for _ in range(10):
-        try:
-            temp = dht_device.temperature
-            hum = dht_device.humidity
-            if temp is not None:
-                return temp, hum
-        except:
-            time.sleep(0.5)
-    return None, None
-
-def update_temp_and_control():
-    global manual_fan, light_auto_on
-    temp, hum = read_temp()
-    if temp is not None:
-        
-        
-        temp_label.configure(text=f"Температур: {temp:.1f}°C | Чийгшил: {hum:.1f}%")
-
-        # Auto Fan (only if not manually not overridden)
-        if not manual_fan:
-            if temp > TEMP_THRESHOLD and GPIO.input(FAN_PIN) == GPIO.HIGH:
-                GPIO.output(FAN_PIN, GPIO.LOW)
-                beep(2)   # ← ADD THIS
-                sens1_btn.configure(text="Сэнс: АСЛАА (Авто)")
-            elif temp <= TEMP_THRESHOLD and GPIO.input(FAN_PIN) == GPIO.LOW:
-                GPIO.output(FAN_PIN, GPIO.HIGH)
-                beep(1)   # ← ADD THIS
-                sens1_btn.configure(text="Сэнс: УНТРАА (Авто)")
-
-        # Auto Light - first person in = ON, last person out = OFF
-        if active_workers and not light_auto_on:
-            GPIO.output(LIGHT_PIN, GPIO.LOW)
-            beep(1)   # ← short beep when person enters
-            gerel_btn.configure(text="Гэрэл: АСЛАА (Авто)")
-            light_auto_on = True
-        elif not active_workers and light_auto_on:
-            GPIO.output(LIGHT_PIN, GPIO.HIGH)
-            beep(2)   # ← short beep when person enters
-            gerel_btn.configure(text="Гэрэл: УНТРАА (Авто)")
-            light_auto_on = False
-
-    app.after(5000, update_temp_and_control)
-    
-    
+# DHT11, авто сэнс/гэрэл, buzzer бүгд core дээр. GUI зөвхөн event-ээр шинэчлэгдэнэ.
+latest_frame = [None]   # preview show() хамгийн сүүлийн frame-ийг л авна (хуучин нь хаягдана)
+preview_camera = [None] # preview хийж буй камерын id – хаалганы камеруудын frame-ийг үл тооно
+
+def on_core_event(event):
+    # Core-ийн thread-ээс (эсвэл ipc reader-ээс) ирнэ → UI-г Tk thread дээр шинэчилнэ
+    if event["type"] == "frame":
+        if event.get("camera") == preview_camera[0]:
+            latest_frame[0] = event
+        return
+    app.after(0, lambda: apply_core_event(event))
+
+def apply_core_event(event):
+    global camera_connected
+    kind = event["type"]
+    if kind == "relay":
+        on_relay_change(event["name"], event["on"], event["source"])
+    elif kind == "sensor":
+        temp_label.configure(
+            text=f"Температур: {event['temperature']:.1f}°C | Чийгшил: {event['humidity']:.1f}%")
+    elif kind == "camera":
+        if event.get("role", "kiosk") != "kiosk":
+            return   # хаалганы камерын төлөв GUI-ийн индикаторт хамаарахгүй
+        camera_connected = bool(event["ok"])
+        if not camera_connected:
+            camera_label.configure(text_color="red")
+            if camera_active:
+                info_label.configure(text="Камер олдсонгүй!")
+        elif camera_active:
+            camera_label.configure(text_color="green")
+    elif kind == "core":
+        if event["connected"]:
+            info_label.configure(text="Үйлдэл сонгоно уу")
+            refresh_relay_buttons()
+        else:
+            info_label.configure(text="Core холболт тасарлаа – дахин холбогдож байна...")
 
 
 
@@ -565,23 +533,62 @@ def update_temp_and_control():
     
 def toggle_sens1():
     print("Fan toggle pressed")
-    global manual_fan
-    manual_fan = True
-    was_on = GPIO.input(FAN_PIN) == GPIO.LOW
-    GPIO.output(FAN_PIN, not GPIO.input(FAN_PIN))
-    beep(2 if not was_on else 1)
-    state = "АСЛАА" if not was_on else "УНТРАА"
-    sens1_btn.configure(text=f"Сэнс: {state} (Гараар)")
-    speak("Сэнс " + ("асаалаа" if not was_on else "унтраалаа"))
+    # Товч/төлөв relay event-ээр (on_relay_change) шинэчлэгдэнэ
+    in_background(lambda: core.relay_toggle("fan", source="manual"), lambda _: None)
 
 def toggle_gerel():
     print("Light toggle pressed")
-    was_on = GPIO.input(LIGHT_PIN) == GPIO.LOW
-    GPIO.output(LIGHT_PIN, not GPIO.input(LIGHT_PIN))
-    beep(1 if not was_on else 2)
-    state = "АСЛАА" if not was_on else "УНТРАА"
-    gerel_btn.configure(text=f"Гэрэл: {state} (Гараар)")
-    speak("Гэрэл " + ("асаалаа" if not was_on else "унтраалаа"))
+    in_background(lambda: core.relay_toggle("light", source="manual"), lambda _: None)
+
+# Реле бүрийн товч (товчнууд доор үүсгэгдсэний дараа бөглөгдөнө)
+relay_buttons = {}
+SOURCE_TEXT = {"manual": "Гараар", "auto": "Авто", "voice": "Голос"}
+
+def on_relay_change(name, on, source):
+    # apply_core_event-ээс Tk thread дээр дуудагдана. Beep, авто override core дээр.
+    device = RELAY_DEVICES[name]
+    state = "АСЛАА" if on else "УНТРАА"
+    if name in relay_buttons:
+        relay_buttons[name].configure(text=f"{device['name']}: {state} ({SOURCE_TEXT.get(source, source)})")
+    if source == "manual":
+        speak(device["name"] + (" асаалаа" if on else " унтраалаа"))
+
+def refresh_relay_buttons():
+    # Daemon GUI-гээс өмнө ажиллаж байсан байж болно – одоогийн төлөвийг харуулна
+    def show(states):
+        for name, on in states.items():
+            if name in relay_buttons:
+                relay_buttons[name].configure(text=f"{RELAY_DEVICES[name]['name']}: {'АСЛАА' if on else 'УНТРАА'}")
+
+    in_background(core.relay_states, show)
+
+def open_preview(mode):
+    # Core камерыг эхлүүлнэ; frame-ууд on_core_event → latest_frame-ээр ирнэ
+    global camera_active
+    latest_frame[0] = None
+    try:
+        preview_camera[0] = core.preview_start(mode)
+    except (OSError, RuntimeError) as e:
+        print("Preview эхлүүлэх алдаа:", repr(e))
+        info_label.configure(text="Камер олдсонгүй!")
+        return False
+    camera_active = True
+    if camera_connected:
+        camera_label.configure(text_color="green")
+    return True
+
+def close_preview():
+    # FrameScheduler-ийн on_stop – цонх хаагдахад core камерыг суллана
+    global camera_active
+    camera_active = False
+    latest_frame[0] = None
+    camera, preview_camera[0] = preview_camera[0], None
+    camera_label.configure(text_color="gray" if camera_connected else "red")
+    try:
+        core.preview_stop(camera)
+    except (OSError, RuntimeError) as e:
+        print("Preview зогсоох алдаа:", repr(e))
+
 # -------------------------------------------------
 # 1. Add New Worker – AUTO FACE DETECT + CAPTURE
 # -------------------------------------------------
@@ -589,16 +596,10 @@ pending_photo_path = None
 
 def add_worker():
     global pending_photo_path
-    global camera_active
-    camera_active = True
-    if camera_connected:
-        camera_label.configure(text_color="green")
     info_label.configure(text="Камерлуу хараарай...")
     app.update()
 
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        info_label.configure(text="Камер олдсонгүй!")
+    if not open_preview("detect"):
         return
 
     preview = ctk.CTkToplevel(app)
@@ -608,77 +609,76 @@ def add_worker():
     preview.focus_force()
     preview.config(cursor="none")
     preview.bind("<Escape>", lambda e: preview.destroy())
-    camera_active = False
-    color = "gray" if camera_connected else "red"
-    camera_label.configure(text_color=color)
-    cam_label = ctk.CTkLabel(preview, text="")
-    cam_label.pack()
-    cam_label.pack(expand=True, fill="both")     # ← make video fill the whole screen
+    renderer = FrameRenderer(preview)            # нэг PhotoImage, байранд нь шинэчилнэ
+    renderer.label.pack(expand=True, fill="both")     # ← make video fill the whole screen
 
-    captured = [None]
+    captured = [None]      # RGB, хүрээгүй цэвэр зураг
+    captured_path = [None] # core pending_photos-д хадгалсан файл
     captured_time = [0]
+    captured_boxes = [[]]  # авах үеийн хайрцаг – static зураг дээр дахин detection хийхгүй
+    static_drawn = [False]
+    shown_seq = [0]
 
     def show():
         current_time = time.time()
         if captured[0] is not None:
-            frame = captured[0].copy()  # Static photo
-            # Redraw box on static
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            locations = face_recognition.face_locations(rgb)
-            for (top, right, bottom, left) in locations:
-                cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-                cv2.putText(frame, "Unknown", (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-        else:
-            ret, frame = cap.read()
-            if not ret:
-                preview.after(30, show)
-                return
-            frame = cv2.flip(frame, 1)
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            locations = face_recognition.face_locations(rgb)
-            # Draw box
-            for (top, right, bottom, left) in locations:
-                cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-                cv2.putText(frame, "Unknown", (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-            # Auto-capture if face detected and timeout passed
-            if locations and current_time - captured_time[0] > 1:  # 1 sec debounce
-                captured[0] = frame.copy()
-                captured_time[0] = current_time
-                info_label.configure(text="Царай танигдлаа! Дахин таниулах эсвэл Хадгалах?")
-                speak("Зураг авлаа")
-
-        img = ctk.CTkImage(light_image=Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)),
-                           dark_image=Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)),
-                           size=(640, 360))
-        cam_label.configure(image=img)
-        cam_label.image = img
-        preview.after(30, show)
-
-    show()
+            # Static photo – нэг л удаа зурна
+            scheduler.frozen = True
+            if not static_drawn[0]:
+                rgb = captured[0].copy()
+                draw_faces(rgb, captured_boxes[0], "Unknown")
+                renderer.draw(rgb)
+                static_drawn[0] = True
+            return
+
+        scheduler.frozen = False
+        frame = latest_frame[0]
+        if frame is None or frame["seq"] == shown_seq[0]:
+            return
+        shown_seq[0] = frame["seq"]
+        # Detection core дээр хийгдсэн; detection алгассан frame-д сүүлийн хайрцаг ирнэ
+        locations = [tuple(box) for box, _ in frame["faces"]]
+        if frame["latency"] is not None:
+            scheduler.record_detection(frame["latency"], bool(locations))
+        # Auto-capture if face detected and timeout passed
+        if locations and current_time - captured_time[0] > 1:  # 1 sec debounce
+            captured[0] = frame["rgb"]
+            captured_path[0] = None   # хадгалагдсаны дараа бөглөгдөнө
+            in_background(lambda seq=frame["seq"], cam=frame["camera"]: core.save_pending_photo(seq, cam),
+                          lambda path: captured_path.__setitem__(0, path))
+            captured_boxes[0] = locations
+            static_drawn[0] = False
+            captured_time[0] = current_time
+            info_label.configure(text="Царай танигдлаа! Дахин таниулах эсвэл Хадгалах?")
+            speak("Зураг авлаа")
+        # Draw box – core-ийн frame-ийг өөрчлөхгүйн тулд хуулбар дээр
+        rgb = frame["rgb"].copy()
+        draw_faces(rgb, locations, "Unknown")
+        renderer.draw(rgb)
+
+    # Хэмнэлийг хэмжсэн хугацаанд тааруулна; цонх хаагдахад core камерыг суллана
+    scheduler = FrameScheduler(preview, show, on_stop=close_preview)
+    scheduler.start()
 
     btns = ctk.CTkFrame(preview)
     btns.pack(pady=8)
     ctk.CTkButton(btns, text="Дахин таниулах", command=lambda: reset_capture(captured, captured_time)).grid(row=0, column=0, padx=8)
-    ctk.CTkButton(btns, text="Хадгалах", command=lambda: save_photo_and_form(captured[0], cap, preview)).grid(row=0, column=1, padx=8)
+    ctk.CTkButton(btns, text="Хадгалах", command=lambda: save_photo_and_form(captured_path[0], preview)).grid(row=0, column=1, padx=8)
 
     def reset_capture(captured, captured_time):
         captured[0] = None
         captured_time[0] = 0
         info_label.configure(text="Камерлуу ахиад хараарай...")
 
-    def save_photo_and_form(photo_frame, cap, preview_win):
+    def save_photo_and_form(photo_path, preview_win):
         global pending_photo_path
-        camera_label.configure(text_color="gray")
-        cap.release()
         preview_win.destroy()
 
-        if photo_frame is None:
+        if photo_path is None:
             info_label.configure(text="Царай танихад алдаа гарлаа! Дахиад оролдоно уу.")
             return
 
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        pending_photo_path = f"pending_photos/photo_{timestamp}.jpg"
-        cv2.imwrite(pending_photo_path, photo_frame)
+        pending_photo_path = photo_path
         info_label.configure(text="Зураг хадгалагдлаа! Ажилтны мэдээлэлийг оруулна уу.")
         open_registration_form()
 
@@ -703,70 +703,48 @@ def add_worker():
 # -------------------------------------------------
 # ТӨГС CUSTOM KEYBOARD + БҮРТГЭЛИЙН ФОРМ (2025 онд 100% ажиллана)
 # -------------------------------------------------
-current_entry = None
+osk = OnScreenKeyboard(app)   # keyboard.py – нэг удаа бүтээж, entry хооронд шилжүүлнэ
 
 def show_custom_keyboard(entry_widget):
-    global current_entry
-    current_entry = entry_widget
-
-    for widget in app.winfo_children():
-        if isinstance(widget, ctk.CTkToplevel) and widget.title() == "Мундаг хосоогийн кэеборд":
-            widget.destroy()
-
-    screen_w = app.winfo_screenwidth()
-    screen_h = app.winfo_screenheight()
-
-    kb_height = int(screen_h * 0.35)   # smaller keyboard
-    kb_y = screen_h - kb_height        # fix to bottom
-
-    kb = ctk.CTkToplevel(app)
-    kb.title("Khosbayar's keyboard")
-    kb.geometry(f"{screen_w}x{kb_height}+0+{kb_y}")
-    kb.configure(fg_color="#1e1e2e")
-    kb.resizable(False, False)
-
-    keys = [
-        ['1','2','3','4','5','6','7','8','9','0'],
-        ['q','w','e','r','t','y','u','i','o','p'],
-        ['a','s','d','f','g','h','j','k','l'],
-        ['z','x','c','v','b','n','m',',','.'],
-        ['Backspace','Space','Clear','Close']
-    ]
-
-    def press(k):
-        if current_entry is None:
-            return
-        if k == "Backspace":
-            current_entry.delete(0, 'end')
-            current_entry.insert(0, current_entry.get()[:-1])
-        elif k == "Space":
-            current_entry.insert("end", " ")
-        elif k == "Clear":
-            current_entry.delete(0, "end")
-        elif k == "Close":
-            kb.destroy()
-        else:
-            current_entry.insert("end", k)
-
-    for row in keys:
-        row_frame = ctk.CTkFrame(kb, fg_color="#1e1e2e")
-        row_frame.pack(pady=1)
-
-        for key in row:
-            if key == "Space":
-                btn = ctk.CTkButton(row_frame, text="", width=350, height=45,
-                                    fg_color="#444444", command=lambda: press(" "))
-            elif key in ["Backspace", "Clear", "Close"]:
-                color = "#cc0000" if key in ["Clear", "Close"] else "#0066ff"
-                btn = ctk.CTkButton(row_frame, text=key, width=130, height=45,
-                                    font=("Arial", 20, "bold"), fg_color=color,
-                                    command=lambda k=key: press(k))
-            else:
-                btn = ctk.CTkButton(row_frame, text=key.upper(), width=60, height=45,
-                                    font=("Arial", 24, "bold"), fg_color="#333333",
-                                    command=lambda k=key: press(k))
-            btn.pack(side="left", padx=3)
-            
+    osk.show(entry_widget)
+
+def show_duplicate_dialog(parent, check, candidates, on_choice):
+    # Ижил нэр/царайтай бүртгэл олдсон: тухайн хүнд зураг нэмэх, түүнийг солих,
+    # эсвэл (нэр давхцаагүй бол) шинээр бүртгэх
+    dlg = ctk.CTkToplevel(parent)
+    dlg.title("")
+    dlg.geometry("820x520")
+    dlg.configure(fg_color="#1e1e2e")
+    dlg.attributes("-topmost", True)
+    dlg.grab_set()
+
+    distance = {m["name"]: m["distance"] for m in check["matches"]}
+    ctk.CTkLabel(dlg, text="Ижил ажилтан бүртгэлтэй байж магадгүй",
+                 font=("Noto Sans CJK JP", 26, "bold"), text_color="#FFAA00").pack(pady=15)
+
+    def choose(mode, target):
+        dlg.destroy()
+        on_choice(mode, target)
+
+    for name in candidates:
+        row = ctk.CTkFrame(dlg, fg_color="transparent")
+        row.pack(pady=6)
+        reason = f"царай {distance[name]:.2f}" if name in distance else "ижил нэр"
+        ctk.CTkLabel(row, text=f"{name} ({reason})", font=("Noto Sans CJK JP", 20),
+                     text_color="white", width=300, anchor="w").pack(side="left", padx=10)
+        ctk.CTkButton(row, text="Зураг нэмэх", width=170, height=50, fg_color="#0066ff",
+                      command=lambda n=name: choose("merge", n)).pack(side="left", padx=6)
+        ctk.CTkButton(row, text="Солих", width=120, height=50, fg_color="#cc6600",
+                      command=lambda n=name: choose("replace", n)).pack(side="left", padx=6)
+
+    bottom = ctk.CTkFrame(dlg, fg_color="transparent")
+    bottom.pack(pady=20)
+    if not check["same_name"]:
+        ctk.CTkButton(bottom, text="Шинээр бүртгэх", width=220, height=55, fg_color="#00aa33",
+                      command=lambda: choose("new", None)).pack(side="left", padx=10)
+    ctk.CTkButton(bottom, text="Болих", width=160, height=55, fg_color="#cc0000",
+                  command=dlg.destroy).pack(side="left", padx=10)
+
 def open_registration_form():
     global pending_photo_path
     if not pending_photo_path or not os.path.exists(pending_photo_path):
@@ -793,7 +771,7 @@ def open_registration_form():
     grid.pack(pady=5)
 
     entries = {}
-    fields = ["Full Name", "Employee ID", "Department", "Position"]
+    fields = list(FIELDS)
 
     for i, field in enumerate(fields):
         row = i // 2
@@ -821,25 +799,59 @@ def open_registration_form():
         if not name:
             speak("Нэрээ бичнэ үү")
             return
-        safe = name.replace(" ", "_")
-        shutil.move(pending_photo_path, f"known_faces/{safe}.jpg")
-        with open(f"worker_data/{safe}.txt", "w", encoding="utf-8") as f:
-            for k, v in entries.items():
-                f.write(f"{k}: {v.get().strip()}\n")
-
-        global known_face_encodings, known_face_names
-        known_face_encodings, known_face_names = load_known_faces()
+        # Хадгалахаас өмнө ижил нэр / ижил царай байгаа эсэхийг core-оос асууна (encode удаан)
+        busy(True)
+        in_background(lambda: core.enroll_check(pending_photo_path, name), checked, failed)
 
-        speak(f"{name} бүртгэгдлээ")
-        info_label.configure(text=f"{name} ✓")
+    def checked(check):
+        if not form.winfo_exists():
+            return
+        busy(False)
+        if not check["face"]:
+            speak("Зурагт царай олдсонгүй")
+            info_label.configure(text="Зурагт царай олдсонгүй – дахин зураг авна уу")
+            return
+        candidates = list(dict.fromkeys(check["same_name"] + [m["name"] for m in check["matches"]]))
+        if not candidates:
+            finish("new", None)
+            return
+        show_duplicate_dialog(form, check, candidates, finish)
+
+    def finish(mode, target):
+        # Файл зөөх, worker_data бичих, царайн индекс шинэчлэх – core дээр
+        fields = {k: v.get() for k, v in entries.items()}
+        busy(True)
+
+        def done(name):
+            speak(f"{name} бүртгэгдлээ" if mode != "merge" else f"{name} зураг нэмэгдлээ")
+            info_label.configure(text=f"{name} ✓")
+            if form.winfo_exists():
+                close_form()
+
+        in_background(lambda: core.enroll(pending_photo_path, fields, mode, target), done, failed)
+
+    def failed(e):
+        # Form нээлттэй үлдэнэ – дахин оролдож болно
+        print("Бүртгэлийн алдаа:", repr(e))
+        speak("Бүртгэж чадсангүй")
+        info_label.configure(text=f"Бүртгэж чадсангүй: {e}")
+        if form.winfo_exists():
+            busy(False)
+
+    def busy(on):
+        save_btn.configure(state="disabled" if on else "normal", text="Түр хүлээнэ үү..." if on else "БҮРТГЭХ")
+
+    def close_form():
+        osk.hide()
         form.destroy()
 
-    ctk.CTkButton(main_container, text="БҮРТГЭХ", command=save,
-                  width=400, height=70,
-                  font=("Noto Sans CJK JP", 28, "bold"),
-                  fg_color="#00aa33", hover_color="#008822").pack(pady=20)
+    save_btn = ctk.CTkButton(main_container, text="БҮРТГЭХ", command=save,
+                             width=400, height=70,
+                             font=("Noto Sans CJK JP", 28, "bold"),
+                             fg_color="#00aa33", hover_color="#008822")
+    save_btn.pack(pady=20)
 
-    form.protocol("WM_DELETE_WINDOW", form.destroy)
+    form.protocol("WM_DELETE_WINDOW", close_form)
 
 # -------------------------------------------------
 # 2. Show All Logs
@@ -847,40 +859,37 @@ def open_registration_form():
 def show_all_logs():
     log_win = ctk.CTkToplevel(app)
     log_win.title("Ирцийн бүртгэл")
-    log_win.geometry("780x580")
+    log_win.geometry("900x580")
     txt = ctk.CTkTextbox(log_win, font=("Courier", 14))
     txt.pack(fill="both", expand=True, padx=12, pady=12)
-    if os.path.exists("time_logs.txt"):
-        with open("time_logs.txt", "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        header = f"{'Name':<20} {'Action':<8} {'Timestamp':<20}\n"
-        header += "-"*52 + "\n"
-        txt.insert("end", header)
-        for line in lines:
-            parts = line.strip().split(",", 2)
-            if len(parts) == 3:
-                name, action, ts = parts
-                txt.insert("end", f"{name:<20} {action:<8} {ts:<20}\n")
-    else:
-        txt.insert("end", "Бүртгэл хоосон байна.\n")
+    # Өнгөрсөн сар + энэ сар – хуучин сарууд шахсан segment-д (python attendance.py summary)
+    first = datetime.date.today().replace(day=1)
+    since = (first - datetime.timedelta(days=1)).replace(day=1).strftime("%Y-%m-%d 00:00:00")
+    txt.insert("end", "Ачаалж байна...\n")
+
+    def show(rows):
+        if not log_win.winfo_exists():
+            return
+        txt.delete("1.0", "end")
+        if rows:
+            header = f"{'Name':<20} {'Action':<8} {'Timestamp':<20} {'Camera':<12}\n"
+            header += "-"*65 + "\n"
+            txt.insert("end", header)
+            for name, action, ts, camera in rows:
+                txt.insert("end", f"{name:<20} {action:<8} {ts:<20} {camera:<12}\n")
+        else:
+            txt.insert("end", "Бүртгэл хоосон байна.\n")
+
+    in_background(lambda: core.attendance_log(since=since), show)
 
 # -------------------------------------------------
 # 3. Recognize Face – SHOW USERNAME + RETAKE/SAVE
 # -------------------------------------------------
-active_workers = {}
-
 def recognize_once():
-    global active_workers
-    global camera_active
-    camera_active = True
-    if camera_connected:
-        camera_label.configure(text_color="green")
     info_label.configure(text="Камерлуу хараарай...")
     app.update()
 
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        info_label.configure(text="Камер олдсонгүй!")
+    if not open_preview("recognize"):
         return
 
     preview = ctk.CTkToplevel(app)
@@ -893,75 +902,73 @@ def recognize_once():
 
     # Optional: press Escape to close camera
     preview.bind("<Escape>", lambda e: preview.destroy())
-    cam_label = ctk.CTkLabel(preview, text="")
-    cam_label.pack()
+    renderer = FrameRenderer(preview)
+    renderer.label.pack()
 
-    captured = [None]
+    captured = [None]      # RGB, хүрээгүй цэвэр зураг
     detected_name = [None]
     captured_time = [0]
+    captured_boxes = [[]]  # авах үеийн хайрцаг – static зураг дээр дахин detection хийхгүй
+    captured_frame = [None]  # (камер, seq) – ирцийн нотлох зургийг core энэ frame-ээс авна
+    static_drawn = [False]
+    shown_seq = [0]
 
     def show():
         current_time = time.time()
         if captured[0] is not None:
-            frame = captured[0].copy()  # Static photo
-            # Redraw box + name on static
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            locations = face_recognition.face_locations(rgb)
-            for (top, right, bottom, left) in locations:
-                cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-                cv2.putText(frame, detected_name[0] or "Unknown", (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-        else:
-            ret, frame = cap.read()
-            if not ret:
-                preview.after(30, show)
-                return
-            frame = cv2.flip(frame, 1)
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            locations = face_recognition.face_locations(rgb)
-            encodings = face_recognition.face_encodings(rgb, locations)
-
-            name = "Unknown"
-            if encodings:
-                matches = face_recognition.compare_faces(known_face_encodings, encodings[0], tolerance=0.55)
-                if True in matches:
-                    idx = matches.index(True)
-                    name = known_face_names[idx]
-                detected_name[0] = name
-
-            # Draw box + name
-            for (top, right, bottom, left) in locations:
-                cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-                cv2.putText(frame, name, (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-
-            # Auto-capture if face detected and timeout passed
-            if locations and current_time - captured_time[0] > 1:  # 1 sec debounce
-                captured[0] = frame.copy()
-                captured_time[0] = current_time
-                info_label.configure(text=f"{name} танигдлаа! Бүртгэх эсвэл дахин авах?")
-                speak("Зураг авлаа")
-
-        img = ctk.CTkImage(light_image=Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)),
-                           dark_image=Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)),
-                           size=(640, 360))
-        cam_label.configure(image=img)
-        cam_label.image = img
-        preview.after(30, show)
-
-    show()
+            # Static photo – нэг л удаа зурна
+            scheduler.frozen = True
+            if not static_drawn[0]:
+                rgb = captured[0].copy()
+                draw_faces(rgb, captured_boxes[0], detected_name[0] or "Unknown")
+                renderer.draw(rgb)
+                static_drawn[0] = True
+            return
+
+        scheduler.frozen = False
+        frame = latest_frame[0]
+        if frame is None or frame["seq"] == shown_seq[0]:
+            return
+        shown_seq[0] = frame["seq"]
+        # хямд gate → dlib → encoding → хамгийн ойр таарц core дээр (bench.py-тэй ижил зам)
+        locations = [tuple(box) for box, _ in frame["faces"]]
+        name = frame["faces"][0][1] if frame["faces"] else "Unknown"
+        if frame["latency"] is not None:
+            scheduler.record_detection(frame["latency"], bool(locations))
+
+        # Auto-capture if face detected and timeout passed
+        if locations and current_time - captured_time[0] > 1:  # 1 sec debounce
+            detected_name[0] = name
+            captured[0] = frame["rgb"]
+            captured_boxes[0] = locations
+            captured_frame[0] = (frame["camera"], frame["seq"])
+            in_background(lambda seq=frame["seq"], cam=frame["camera"]: core.pin_frame(seq, cam),
+                          lambda _: None)
+            static_drawn[0] = False
+            captured_time[0] = current_time
+            info_label.configure(text=f"{name} танигдлаа! Бүртгэх эсвэл дахин авах?")
+            speak("Зураг авлаа")
+
+        # Draw box + name
+        rgb = frame["rgb"].copy()
+        draw_faces(rgb, locations, name)
+        renderer.draw(rgb)
+
+    # Хэмнэлийг хэмжсэн хугацаанд тааруулна; цонх хаагдахад core камерыг суллана
+    scheduler = FrameScheduler(preview, show, on_stop=close_preview)
+    scheduler.start()
 
     btns = ctk.CTkFrame(preview)
     btns.pack(pady=8)
     ctk.CTkButton(btns, text="Дахин авах", command=lambda: reset_recognition(captured, captured_time)).grid(row=0, column=0, padx=8)
-    ctk.CTkButton(btns, text="Бүртгэх", command=lambda: save_and_log(captured[0], detected_name[0], cap, preview)).grid(row=0, column=1, padx=8)
+    ctk.CTkButton(btns, text="Бүртгэх", command=lambda: save_and_log(captured[0], detected_name[0], preview)).grid(row=0, column=1, padx=8)
 
     def reset_recognition(captured, captured_time):
         captured[0] = None
         captured_time[0] = 0
         info_label.configure(text="Камерлуу хараарай...")
 
-    def save_and_log(photo_frame, name, cap, preview_win):
-        global active_workers
-        cap.release()
+    def save_and_log(photo_frame, name, preview_win):
         preview_win.destroy()
 
         if photo_frame is None:
@@ -969,27 +976,106 @@ def recognize_once():
             return
 
         if name == "Unknown":
+            # Царай core-ийн танихгүй кэшид үлдсэн – "Танихгүй царай" цонхноос бүртгэж болно
             speak("Танихгүй хүн")
             info_label.configure(text="Unknown face")
             return
 
-        if name not in active_workers:
-            ts = log_time(name, "IN")
-            active_workers[name] = ts
-            beep(1)                                # ← 1 beep = welcome
-            speak(f"{name} ирлээ")
-            info_label.configure(text=f"{name} – IN at {ts.split()[1]}")
-        else:
-            active_workers.pop(name)
-            out_ts = log_time(name, "OUT")
-            beep(2)                                # ← 2 beeps = goodbye
-            speak(f"{name} явлаа")
-            info_label.configure(text=f"{name} – OUT at {out_ts.split()[1]}")
-        global camera_active
-        camera_active = False
-        color = "gray" if camera_connected else "red"
-        camera_label.configure(text_color=color)
-        app.after(2000, lambda: info_label.configure(text="Үйлдэл сонгоно уу"))
+        # Ирц бичих, beep, авто гэрэл (presence), нотлох зураг – core дээр
+        camera, seq = captured_frame[0]
+        box = list(captured_boxes[0][0])
+
+        def done(event):
+            if event is None:
+                return
+            if event["action"] == "IN":
+                speak(f"{name} ирлээ")
+            else:
+                speak(f"{name} явлаа")
+            info_label.configure(text=f"{name} – {event['action']} at {event['ts'].split()[1]}")
+            app.after(2000, lambda: info_label.configure(text="Үйлдэл сонгоно уу"))
+
+        info_label.configure(text=f"{name} бүртгэж байна...")
+        in_background(lambda: core.checkin(name, camera=camera, seq=seq, box=box), done)
+
+# -------------------------------------------------
+# 3b. Танихгүй царайн бүлгүүд – дахин зураг авалгүй бүртгэх
+# -------------------------------------------------
+def show_unknowns():
+    win = ctk.CTkToplevel(app)
+    win.title("Танихгүй царай")
+    win.geometry("900x580")
+
+    def show(clusters):
+        if not win.winfo_exists():
+            return
+        if not clusters:
+            ctk.CTkLabel(win, text="Танихгүй царай алга.", font=("Noto Sans CJK JP", 20)).pack(pady=40)
+            return
+        listing = ctk.CTkScrollableFrame(win)
+        listing.pack(fill="both", expand=True, padx=12, pady=12)
+        for i, cluster in enumerate(clusters):
+            thumb = None
+            if cluster["thumb"]:
+                img = PILImage.open(io.BytesIO(base64.b64decode(cluster["thumb"])))
+                thumb = ctk.CTkImage(light_image=img, dark_image=img, size=(96, 96 * img.height // max(1, img.width)))
+            ctk.CTkLabel(listing, image=thumb, text="" if thumb else "?").grid(row=i, column=0, padx=8, pady=6)
+            ctk.CTkLabel(listing, text=f"{cluster['visits']} удаа · сүүлд {cluster['last']}\n{', '.join(cluster['cameras'])}",
+                         font=("Noto Sans CJK JP", 18), justify="left").grid(row=i, column=1, padx=8, sticky="w")
+            ctk.CTkButton(listing, text="Бүртгэх", width=140, height=50, fg_color="#00AA33",
+                          command=lambda c=cluster["id"]: enroll_unknown(c, win)).grid(row=i, column=2, padx=8)
+
+    in_background(core.unknown_clusters, show)
+
+
+def enroll_unknown(cluster_id, win):
+    def opened(path):
+        global pending_photo_path
+        if path is None:
+            info_label.configure(text="Энэ бүлэг хугацаа нь дуусч устсан байна")
+            return
+        if win.winfo_exists():
+            win.destroy()
+        pending_photo_path = path
+        open_registration_form()
+
+    in_background(lambda: core.unknown_photo(cluster_id), opened)
+
+# -------------------------------------------------
+# 3c. Орчны түүх – температур/чийгшил + сэнс/гэрлийн график
+# -------------------------------------------------
+HISTORY_RANGES = (("1 цаг", 1), ("24 цаг", 24), ("7 хоног", 24 * 7), ("30 хоног", 24 * 30))
+
+
+def show_sensor_history():
+    win = ctk.CTkToplevel(app)
+    win.title("Орчны түүх")
+    win.geometry("900x580")
+    chart = SensorChart(win)
+    summary = ctk.CTkLabel(win, text="", font=("Noto Sans CJK JP", 16), justify="left")
+    relay_names = {k: v["name"] for k, v in RELAY_DEVICES.items()}
+
+    def load(hours):
+        in_background(lambda: core.sensor_history(hours), show)
+
+    def show(result):
+        if not win.winfo_exists():
+            return
+        chart.draw(result, TEMP_THRESHOLD, relay_names)
+        lines = []
+        for name, c in result["correlation"].items():
+            if c["on_avg_temp"] is not None or c["off_avg_temp"] is not None:
+                lines.append(f"{relay_names.get(name, name)}: {c['switches']} удаа солигдсон, "
+                             f"асаалттай үед {c['on_avg_temp']}°, унтраалттай үед {c['off_avg_temp']}°")
+        summary.configure(text="\n".join(lines) or f"{len(result['series'])} цэг ({result['resolution']})")
+
+    ranges = ctk.CTkFrame(win)
+    ranges.pack(pady=6)
+    for i, (label, hours) in enumerate(HISTORY_RANGES):
+        ctk.CTkButton(ranges, text=label, width=120, command=lambda h=hours: load(h)).grid(row=0, column=i, padx=6)
+    chart.canvas.pack(padx=12, pady=6)
+    summary.pack(pady=4)
+    load(24)
 
 # -------------------------------------------------
 # 4. Sens1 & Gerel Toggle Buttons
@@ -1059,7 +1145,7 @@ def continuous_listen():
             try:
                 audio = r.listen(source, timeout=1.0, phrase_time_limit=15)
                 text = r.recognize_google(audio, language="mn-MN")
-                ai_transcript += text + " "
+                append_transcript(text)
 
                 # Бодит цагт хэрэглэгчийн ярьж байгаа текстийг info_label дээр харуулна
                 app.after(0, lambda t=ai_transcript.strip(): info_label.configure(
@@ -1084,8 +1170,8 @@ def continuous_listen():
         ))
 
         # Гэрэл/Сэнс команд шалгах
-        if any(keyword in user_text.lower() for keyword in ["гэрэл", "сэнс", "light", "fan"]):
-            process_voice_command(user_text)
+        if voice_matcher.parse(user_text):
+            app.after(0, lambda: process_voice_command(user_text))
             app.after(3000, lambda: info_label.configure(text="Үйлдэл сонгоно уу"))
             return
 
@@ -1150,14 +1236,25 @@ sens1_btn.grid(row=1, column=1, padx=30, pady=15)
 
 gerel_btn = ctk.CTkButton(btn_frame, text="Гэрэл: УНТРАА", command=toggle_gerel, **BIG_BUTTON, fg_color="#888888")
 gerel_btn.grid(row=2, column=0, padx=30, pady=15)
+relay_buttons.update(fan=sens1_btn, light=gerel_btn)
 
 ai_btn = ctk.CTkButton(btn_frame, text="AI ажиллуулах", command=toggle_ai, **BIG_BUTTON, fg_color="#AA00FF")
 ai_btn.grid(row=2, column=1, padx=30, pady=15)
+ctk.CTkButton(btn_frame, text="Танихгүй царай", command=show_unknowns, **BIG_BUTTON, fg_color="#555555").grid(row=3, column=0, padx=30, pady=15)
+ctk.CTkButton(btn_frame, text="Орчны түүх", command=show_sensor_history, **BIG_BUTTON, fg_color="#555555").grid(row=3, column=1, padx=30, pady=15)
 
 # NOW IT'S SAFE — buttons exist!
-update_temp_and_control()
+core.subscribe(on_core_event)
+refresh_relay_buttons()
+app.after(1000, osk.prebuild)   # анхны товшилтыг хүлээлгэхгүй
+if soak.ENABLED:
+    soak.drive(app, globals())
 
 app.mainloop()
+speaker.close()
 
-# Cleanup on exit
-GPIO.cleanup()
\ No newline at end of file
+# Cleanup on exit – daemon-д холбогдсон бол core үргэлжлэн ажиллана
+if not isinstance(core, ipc.CoreClient):
+    core.close()
+if soak.ENABLED:
+    sys.exit(soak.exit_code())
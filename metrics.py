@@ -0,0 +1,303 @@
+# =============================================
+# Hot-path хэмжилт + Prometheus metrics endpoint
+# =============================================
+# KIOSK_METRICS_PORT=9105 python main.py
+#   curl localhost:9105/metrics                   → Prometheus text format
+#   curl "localhost:9105/debug/profile?seconds=10" → sampling profiler (collapsed stacks,
+#                                                    flamegraph.pl / speedscope-д шууд орно)
+#   kill -USR2 <pid>                               → 10 сек профайл profile_<цаг>.txt руу
+# Port тохируулаагүй бол ENABLED=False: @timed функцийг огт ороохгүй, observe/inc
+# нь нэг if шалгаад буцна.
+import collections
+import functools
+import math
+import os
+import signal
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PORT = int(os.environ.get("KIOSK_METRICS_PORT", "0") or 0)
+ENABLED = PORT > 0
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+WINDOW = 512          # rolling quantile-д хадгалах сүүлийн хэмжилтийн тоо
+QUANTILES = (0.5, 0.9, 0.99)
+
+_lock = threading.Lock()
+_histograms = {}      # (name, labels) → Histogram
+_counters = {}        # (name, labels) → float
+_help = {}
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = collections.deque(maxlen=WINDOW)
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantiles(self):
+        ordered = sorted(self.recent)
+        if not ordered:
+            return {}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def describe(name, text):
+    _help[name] = text
+
+
+def observe(name, seconds, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = Histogram()
+        hist.observe(seconds)
+
+
+def inc(name, amount=1, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "t0")
+
+    def __init__(self, name, labels):
+        self.name, self.labels = name, labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.t0, **self.labels)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name, **labels):
+    # with metrics.timer("face_locations_seconds"): ...
+    return _Timer(name, labels) if ENABLED else _NULL_TIMER
+
+
+def timed(name, **labels):
+    # @metrics.timed("log_time_seconds") – идэвхгүй үед функцийг өөрчлөхгүй буцаана
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - t0, **labels)
+        return wrapper
+    return decorator
+
+
+# =============================================
+# Tk callback-ууд
+# =============================================
+def instrument_tk(app, heartbeat_ms=200):
+    # app.after(...)-аар товлогдсон callback бүрийн хугацаа + event loop-ийн хоцрогдол
+    if not ENABLED:
+        return
+    original_after = app.after
+
+    def after(ms, func=None, *args):
+        if func is None:
+            return original_after(ms)
+        callback = getattr(func, "__name__", "callback")
+
+        def wrapped(*a):
+            t0 = time.perf_counter()
+            try:
+                return func(*a)
+            finally:
+                observe("tk_callback_seconds", time.perf_counter() - t0, callback=callback)
+        return original_after(ms, wrapped, *args)
+
+    app.after = after
+
+    def heartbeat(expected=[None]):
+        now = time.perf_counter()
+        if expected[0] is not None:
+            observe("tk_loop_lag_seconds", max(0.0, now - expected[0]))
+        expected[0] = now + heartbeat_ms / 1000.0
+        original_after(heartbeat_ms, heartbeat)
+    heartbeat()
+
+
+# =============================================
+# Prometheus text format
+# =============================================
+def _escape(value):
+    # Exposition format: label утгад \, " ба шинэ мөрийг escape хийнэ (камерын нэр, repr(e) г.м.)
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def render() -> str:
+    lines = []
+    with _lock:
+        histograms = {k: (list(h.buckets), h.count, h.sum, h.quantiles()) for k, h in _histograms.items()}
+        counters = dict(_counters)
+
+    seen = set()
+    recent = []
+    for (name, labels), (buckets, count, total, quantiles) in sorted(histograms.items()):
+        if name not in seen:
+            seen.add(name)
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, n in zip(BUCKETS, buckets):
+            cumulative += n
+            lines.append(f"{name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {count}")
+        lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+        lines.append(f"{name}_count{_labels(labels)} {count}")
+        recent.append((name, labels, quantiles))
+
+    # Сүүлийн WINDOW хэмжилтийн rolling quantile-ууд – histogram-ын TYPE дор биш, өөрийн gauge
+    # family (<нэр>_recent) болж гарна; family бүрийн мөрүүд дараалсан байх ёстой
+    for name, labels, quantiles in recent:
+        if quantiles and f"{name}_recent" not in seen:
+            seen.add(f"{name}_recent")
+            lines.append(f"# HELP {name}_recent {name}: сүүлийн {WINDOW} хэмжилтийн quantile")
+            lines.append(f"# TYPE {name}_recent gauge")
+        for q, v in quantiles.items():
+            lines.append(f"{name}_recent{_labels(labels, [('quantile', q)])} {v:.6f}")
+
+    for (name, labels), value in sorted(counters.items()):
+        if name not in seen:
+            seen.add(name)
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_labels(labels)} {value}")
+
+    lines.append("# TYPE process_threads gauge")
+    lines.append(f"process_threads {threading.active_count()}")
+    return "\n".join(lines) + "\n"
+
+
+# =============================================
+# Sampling profiler
+# =============================================
+def sample_profile(seconds=10.0, interval=0.005) -> str:
+    # Бүх thread-ийн stack-ийг interval тутам авч collapsed формат руу нэгтгэнэ
+    me = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    stacks = collections.Counter()
+    end = time.time() + seconds
+    while time.time() < end:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            parts.append(names.get(ident, str(ident)))
+            stacks[";".join(reversed(parts))] += 1
+        time.sleep(interval)
+    return "".join(f"{stack} {n}\n" for stack, n in stacks.most_common())
+
+
+def _profile_to_file(seconds=10.0):
+    path = f"profile_{time.strftime('%Y%m%d_%H%M%S')}.txt"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(sample_profile(seconds))
+    print(f"Profile хадгалагдлаа: {path}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/metrics":
+            body = render().encode()
+            ctype = "text/plain; version=0.0.4; charset=utf-8"
+        elif url.path == "/debug/profile":
+            try:
+                seconds = float(parse_qs(url.query).get("seconds", ["10"])[0])
+            except ValueError:
+                seconds = math.nan
+            if not (math.isfinite(seconds) and seconds > 0):
+                self.send_error(400, "seconds must be a positive number")
+                return
+            body = sample_profile(min(seconds, 120.0)).encode()
+            ctype = "text/plain; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass   # хүсэлт бүрийг терминал руу хэвлэхгүй
+
+
+def serve(port=None, host="127.0.0.1"):
+    if not ENABLED:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port or PORT), _Handler)
+    except OSError as e:
+        # Порт өөр процесст (core daemon) – metrics-гүйгээр үргэлжилнэ, GUI унахгүй
+        print("Metrics эхлүүлж чадсангүй:", repr(e))
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+    try:
+        signal.signal(signal.SIGUSR2, lambda *a: threading.Thread(target=_profile_to_file, daemon=True).start())
+    except (ValueError, AttributeError):
+        pass   # main thread биш эсвэл Windows
+    print(f"Metrics: http://{host}:{port or PORT}/metrics")
+    return server
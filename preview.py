@@ -0,0 +1,104 @@
+# =============================================
+# Камерын preview – хурдан дүрслэх зам
+# =============================================
+# Frame бүрт: BGR→RGB нэг удаа (толин тусгалтай), дэлгэцийн хэмжээнд нэг удаа
+# багасгана, нэг л PhotoImage-ийг байранд нь шинэчилнэ. Шинэ CTkImage, хоёр
+# Image.fromarray, давхар cvtColor хийхгүй – бүх буфер дахин ашиглагдана.
+import time
+import tkinter as tk
+
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+import metrics
+from frames import FrameConverter, FramePacer
+
+PREVIEW_SIZE = (640, 360)
+BOX_COLOR = (0, 255, 0)   # RGB ба BGR-д ижил ногоон
+
+
+class FrameRenderer:
+    def __init__(self, parent, size=PREVIEW_SIZE, mirror=True, bg="black"):
+        self.size = size
+        self.converter = FrameConverter(mirror)
+        self._display = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self.photo = ImageTk.PhotoImage("RGB", size)
+        self.label = tk.Label(parent, image=self.photo, bg=bg, bd=0, highlightthickness=0)
+
+    def convert(self, bgr):
+        # Буцаах RGB буфер дараагийн дуудалтаар дарагдана – хадгалах бол .copy()
+        return self.converter.convert(bgr)
+
+    def draw(self, rgb):
+        h, w = rgb.shape[:2]
+        if (w, h) == self.size:
+            self._display[...] = rgb
+        else:
+            cv2.resize(rgb, self.size, dst=self._display, interpolation=cv2.INTER_LINEAR)
+        self.photo.paste(Image.fromarray(self._display))
+
+
+def draw_faces(rgb, locations, text):
+    for (top, right, bottom, left) in locations:
+        cv2.rectangle(rgb, (left, top), (right, bottom), BOX_COLOR, 2)
+        cv2.putText(rgb, text, (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, BOX_COLOR, 2)
+
+
+# =============================================
+# Frame scheduler – тогтмол after(30) биш, хэмжсэн хугацаанд тааруулна
+# =============================================
+# Tick бүрийн дараа л дараагийнхыг товлоно (callback-ууд дараалалд овоорохгүй),
+# tick-д зарцуулсан хугацааг interval-аас хасна. Хэмнэлийн логик frames.FramePacer-т.
+# after()-ийг root дээр товлоно: preview цонх destroy болоход түүний after командууд устаж
+# _run дахин дуудагдахгүй (on_stop → preview_stop хэзээ ч ажиллахгүй) байсан. Цонх устахад
+# <Destroy>-оор шууд stop() хийнэ.
+class FrameScheduler(FramePacer):
+    def __init__(self, widget, tick, fps=30, idle_fps=3, idle_after=10.0, on_stop=None):
+        super().__init__(fps, idle_fps, idle_after)
+        self.widget = widget
+        self.root = widget._root()
+        self.tick = tick
+        self.on_stop = on_stop
+        self._job = None
+        self._stopped = False
+
+    def start(self):
+        self.widget.bind("<Destroy>", self._on_destroy, add="+")
+        self._job = self.root.after(0, self._run)
+
+    def _on_destroy(self, event):
+        if event.widget is self.widget:   # хүүхэд widget-ийн Destroy биш
+            self.stop()
+
+    def stop(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        if self._job is not None:
+            try:
+                self.root.after_cancel(self._job)
+            except Exception:
+                pass
+        if self.on_stop:
+            self.on_stop()
+
+    def _run(self):
+        if self._stopped:
+            return
+        try:
+            if not self.widget.winfo_exists():
+                self.stop()
+                return
+        except Exception:
+            self.stop()
+            return
+
+        t0 = time.perf_counter()
+        self.tick()
+        elapsed = time.perf_counter() - t0
+        metrics.observe("preview_tick_seconds", elapsed)
+
+        delay = self.record_tick(elapsed)
+        if not self._stopped:
+            self._job = self.root.after(max(1, int(delay * 1000)), self._run)
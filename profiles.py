@@ -0,0 +1,66 @@
+# =============================================
+# Илрүүлэлт/encoding-ийн чанарын профайлууд – code path бүрт тусдаа
+# =============================================
+# face_recognition-ийн анхдагч (HOG, upsample 1, 68 цэгийн landmark, jitter 1) бүх газар
+# ижил байсан. Гэтэл хаалган дээрх check-in-д хурд, бүртгэлд нарийвчлал чухал:
+#   detector  – "hog" (CPU) эсвэл "cnn" (dlib MMOD, Pi дээр маш удаан)
+#   upsample  – жижиг (холын) царай олохын тулд зургийг хэдэн удаа 2 дахин томруулах
+#   scale     – dlib-д өгөхөөс өмнө frame-ийг жижигрүүлэх (0.5 = 4 дахин бага пиксел)
+#   landmarks – "small" (5 цэг, хурдан) эсвэл "large" (68 цэг) – тэгшлэлтэд
+#   jitters   – encoding-ийг хэдэн санамсаргүй хөдөлгөсөн хуулбараар дундажлах (×N хугацаа)
+# Code path → профайл (PATH_PROFILES):
+#   checkin – камерын таних/preview (recognize_once, хаалганы камер)
+#   idle    – сүүлийн idle_after секундэд царай харагдаагүй камер (frames.FramePacer.idle)
+#   enroll  – add_worker-ийн зураг → chip + encoding, enroll.py, enroll_check
+#   load    – load_known_faces (кэшгүй chip-ийг дахин encode хийх)
+# enroll, load ижил jitters-тэй байх ёстой – эс бөгөөс кэшлэгдсэн encoding-ууд дахин бодогдоно.
+# landmarks gallery (enroll, load) болон probe (checkin, idle)-д ижил – 5 ба 68 цэгээр тэгшилсэн
+# царайн encoding хоорондоо шилжилттэй, зай нь босгоос давж болно.
+#   KIOSK_PROFILES="checkin=balanced,idle=fast-checkin" – env-ээр солих
+#   python profiles.py                  – профайлууд, одоогийн хуваарилалт
+#   python bench.py clips/ --profiles fast-checkin,balanced,accurate-enroll
+import collections
+import json
+import os
+
+Profile = collections.namedtuple("Profile", "name detector upsample scale landmarks jitters")
+
+PROFILES = {
+    # Киоскийн өмнө ~1 м зайд царай том – upsample хэрэггүй
+    "fast-checkin": Profile("fast-checkin", "hog", 0, 1.0, "small", 1),
+    # face_recognition-ийн анхдагч – харьцуулалтын суурь
+    "balanced": Profile("balanced", "hog", 1, 1.0, "large", 1),
+    # Нэг удаагийн зураг: жижиг царай ч олно, encoding 10 jitter-ийн дундаж; landmark checkin-тэй ижил
+    "accurate-enroll": Profile("accurate-enroll", "hog", 2, 1.0, "small", 10),
+    # Хүн ойртож байгааг л мэдэх: хагас хэмжээтэй frame, олдмогц checkin руу шилжинэ
+    "low-power-idle": Profile("low-power-idle", "hog", 0, 0.5, "small", 1),
+}
+
+PATH_PROFILES = {
+    "checkin": "fast-checkin",
+    "idle": "low-power-idle",
+    "enroll": "accurate-enroll",
+    "load": "accurate-enroll",
+}
+
+for _item in filter(None, os.environ.get("KIOSK_PROFILES", "").split(",")):
+    _path, _, _name = _item.partition("=")
+    if _path not in PATH_PROFILES or _name not in PROFILES:
+        raise ValueError(f"KIOSK_PROFILES: '{_item}' буруу (path: {', '.join(PATH_PROFILES)}; "
+                         f"профайл: {', '.join(PROFILES)})")
+    PATH_PROFILES[_path] = _name
+
+
+def get(name):
+    if name not in PROFILES:
+        raise ValueError(f"'{name}' профайл алга ({', '.join(PROFILES)})")
+    return PROFILES[name]
+
+
+def for_path(path):
+    return PROFILES[PATH_PROFILES[path]]
+
+
+if __name__ == "__main__":
+    print(json.dumps({"profiles": {name: p._asdict() for name, p in PROFILES.items()},
+                      "paths": PATH_PROFILES}, indent=2, ensure_ascii=False))
@@ -0,0 +1,153 @@
+# =============================================
+# Царай таних – detection → encoding → matching
+# =============================================
+# core.py (CameraWorker), inference.py болон bench.py яг ижил кодоор дамжина.
+import time
+
+import face_recognition
+import numpy as np
+
+import assets
+import metrics
+import profiles
+from workers import KNOWN_FACES_DIR
+
+TOLERANCE = 0.55
+
+
+def encode_file(path, profile=None):
+    # Зургийн эхний царайн encoding, царайгүй бол None. assets.py-ийн chip бол detection-гүй.
+    # profile анхдагч – "load" (gallery-тай ижил jitters)
+    return assets.encode_image(face_recognition.load_image_file(path), profile)
+
+
+def load_known_faces(folder=KNOWN_FACES_DIR, profile=None):
+    # Өөрчлөгдөөгүй файлын encoding-ийг assets.ASSET_INDEX-ээс авна (decode/detection үгүй)
+    encodings, names, _ = assets.load_encodings(folder, profile=profile)
+    return encodings, names
+
+
+class FaceIndex:
+    # Бүх encoding нэг (N, 128) матрицад – нэг numpy үйлдлээр бүх зайг бодно
+    def __init__(self, encodings=(), names=()):
+        self.matrix = np.asarray(list(encodings), dtype=np.float64).reshape(-1, 128)
+        self.names = list(names)
+        self._labels = None        # мөр бүрийн хүний дугаар (names-ээс залхуугаар)
+        self.thresholds = {}       # нэр → өөрийн босго (thresholds.py calibrate)
+        self.global_tolerance = None
+
+    def calibrate(self, calibration):
+        # thresholds.load() → {"global": x, "identities": {нэр: босго}}; хоосон бол TOLERANCE
+        self.thresholds = dict(calibration.get("identities", {}))
+        self.global_tolerance = calibration.get("global")
+
+    def threshold(self, name, tolerance=TOLERANCE):
+        return self.thresholds.get(name, self.global_tolerance or tolerance)
+
+    def max_threshold(self, tolerance=TOLERANCE):
+        return max([self.global_tolerance or tolerance] + list(self.thresholds.values()))
+
+    def _label_array(self):
+        if self._labels is None or len(self._labels) != len(self.names):
+            ids = {}
+            self._labels = np.fromiter((ids.setdefault(n, len(ids)) for n in self.names),
+                                       dtype=np.int32, count=len(self.names))
+        return self._labels
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, encoding, name):
+        self.matrix = np.vstack([self.matrix, np.asarray(encoding, dtype=np.float64).reshape(1, 128)])
+        self.names.append(name)
+        self._labels = None
+
+    def remove(self, name):
+        keep = [i for i, n in enumerate(self.names) if n != name]
+        self.matrix = self.matrix[keep]
+        self.names = [self.names[i] for i in keep]
+        self._labels = None
+
+    def nearest(self, encoding, tolerance=TOLERANCE):
+        # → [(нэр, зай)] tolerance дотор, хүн бүрийн хамгийн ойр sample, ойроос нь эрэмбэлсэн
+        best = {}
+        for name, d in zip(self.names, self.distances(encoding)):
+            if d <= tolerance and d < best.get(name, np.inf):
+                best[name] = float(d)
+        return sorted(best.items(), key=lambda item: item[1])
+
+    def distances(self, encoding):
+        if not len(self.names):
+            return np.empty(0)
+        return np.linalg.norm(self.matrix - encoding, axis=1)
+
+    def best_two(self, encoding):
+        # → (хамгийн ойр хүн, зай, дараагийн өөр хүн, зай); хоосон индекс бол None-ууд
+        d = self.distances(encoding)
+        if not d.size:
+            return None, None, None, None
+        i = int(np.argmin(d))
+        labels = self._label_array()
+        other = labels != labels[i]
+        if not other.any():
+            return self.names[i], float(d[i]), None, None
+        j = int(np.argmin(np.where(other, d, np.inf)))
+        return self.names[i], float(d[i]), self.names[j], float(d[j])
+
+    def match(self, encoding, tolerance=TOLERANCE):
+        # Хамгийн ойрыг авна (compare_faces шиг эхний таарсныг биш); тохируулсан бол тэр хүний босгоор
+        d = self.distances(encoding)
+        if not d.size:
+            return "Unknown", None
+        i = int(np.argmin(d))
+        name = self.names[i]
+        return (name if d[i] <= self.threshold(name, tolerance) else "Unknown"), float(d[i])
+
+
+def match_faces(locations, encodings, index, tolerance=TOLERANCE, unknowns=None, rgb=None, camera="",
+                distances=None):
+    # Detection/encoding өөр газар (inference.py worker) хийгдсэн үед ч ижил тааруулалт.
+    # unknowns (unknowns.UnknownCache) өгвөл: өмнө нь харсан танихгүй хүн гэдэг нь
+    # батлагдвал индексийг хайхгүй; шинэ Unknown-ийг (rgb-ээс тайрсан зурагтай) кэшлэнэ.
+    # distances (thresholds.DistanceLog) өгвөл танилт бүрийн хамгийн ойр 2 хүний зайг бичнэ.
+    results = []
+    for box, encoding in zip(locations, encodings):
+        hit = unknowns.lookup(encoding, index.max_threshold(tolerance)) if unknowns is not None else None
+        if hit is not None:
+            unknowns.record(encoding, None, rgb, box, camera)
+            results.append((box, "Unknown", hit[1]))
+            metrics.inc("recognitions_total", result="unknown_cached")
+            continue
+        best, distance, second, second_distance = index.best_two(encoding)
+        name = best if best is not None and distance <= index.threshold(best, tolerance) else "Unknown"
+        if distances is not None and best is not None:
+            distances.record(best, distance, second, second_distance, name != "Unknown", camera)
+        if name == "Unknown" and unknowns is not None:
+            unknowns.record(encoding, distance, rgb, box, camera)
+        results.append((box, name, distance))
+        metrics.inc("recognitions_total", result="unknown" if name == "Unknown" else "known")
+    return results
+
+
+def recognize_frame(rgb, detector, index, tolerance=TOLERANCE, timings=None, unknowns=None, camera="",
+                    distances=None, profile=None):
+    # → [(box, name, distance)]. timings dict өгвөл үе шат бүрийн секундийг бичнэ.
+    # profile (profiles.Profile) – encoding-ийн landmark/jitters; detector-т caller use() хийнэ.
+    profile = profile or profiles.for_path("checkin")
+    t0 = time.perf_counter()
+    locations = detector.locations(rgb)
+    t1 = time.perf_counter()
+    encodings = face_recognition.face_encodings(rgb, locations, profile.jitters, profile.landmarks) \
+        if locations else []
+    t2 = time.perf_counter()
+    results = match_faces(locations, encodings, index, tolerance, unknowns, rgb, camera, distances)
+    t3 = time.perf_counter()
+    metrics.observe("face_locations_seconds", t1 - t0)
+    if locations:
+        metrics.observe("face_encodings_seconds", t2 - t1)
+        metrics.observe("face_match_seconds", t3 - t2)
+    if timings is not None:
+        timings["detect"] = t1 - t0
+        timings["encode"] = t2 - t1
+        timings["match"] = t3 - t2
+    return results
@@ -5,6 +5,7 @@ import time
 import board
 import adafruit_dht
 import threading
+from relays import RelayManager
 
 # === PINS ===
 LIGHT_PIN  = 20
@@ -15,15 +16,14 @@ DHT_PIN    = board.D2
 # === SETUP ===
 GPIO.setmode(GPIO.BCM)
 GPIO.setwarnings(False)
-GPIO.setup(LIGHT_PIN, GPIO.OUT)
-GPIO.setup(FAN_PIN, GPIO.OUT)
 GPIO.setup(BUZZER_PIN, GPIO.OUT)
 
 # VERY IMPORTANT: keep buzzer LOW by default (active buzzers scream on HIGH!)
-GPIO.output(LIGHT_PIN, GPIO.HIGH)   # relay OFF
-GPIO.output(FAN_PIN, GPIO.HIGH)     # relay OFF
 GPIO.output(BUZZER_PIN, GPIO.LOW)   # buzzer silent
 
+# Relays start OFF; state lives in the manager, not GPIO.input
+relays = RelayManager(GPIO, {"light": LIGHT_PIN, "fan": FAN_PIN})
+
 dht_device = adafruit_dht.DHT11(DHT_PIN, use_pulseio=False)
 TEMP_THRESHOLD = 20.0
 manual_fan_control = False
@@ -48,6 +48,16 @@ def read_dht():
             time.sleep(0.5)
     return None, None
 
+# === RELAY EVENTS ===
+def on_relay_change(name, on, source):
+    if name == "fan":
+        beep(2 if on else 1)
+    else:
+        beep(1)
+    print(f"\n{source.upper()} {name.upper()} → {'ON' if on else 'OFF'}")
+
+relays.subscribe(on_relay_change)
+
 # === AUTO FAN ===
 def auto_fan_control():
     while True:
@@ -58,14 +68,7 @@ def auto_fan_control():
         if temp is None:
             time.sleep(5)
             continue
-        if temp > TEMP_THRESHOLD and GPIO.input(FAN_PIN) == GPIO.HIGH:
-            GPIO.output(FAN_PIN, GPIO.LOW)
-            beep(2)   # two short beeps
-            print(f"\nAUTO FAN ON ({temp:.1f}°C)")
-        elif temp <= TEMP_THRESHOLD and GPIO.input(FAN_PIN) == GPIO.LOW:
-            GPIO.output(FAN_PIN, GPIO.HIGH)
-            beep(1)   # one short beep
-            print(f"\nAUTO FAN OFF ({temp:.1f}°C)")
+        relays.set("fan", temp > TEMP_THRESHOLD, source="auto")   # same state → no write
         time.sleep(5)
 
 threading.Thread(target=auto_fan_control, daemon=True).start()
@@ -78,17 +81,9 @@ try:
         cmd = input("→ ").strip().lower()
         if cmd == "f":
             manual_fan_control = True
-            current = GPIO.input(FAN_PIN)
-            GPIO.output(FAN_PIN, not current)
-            beep(2)
-            state = "ON" if not current else "OFF"
-            print(f"Manual Fan → {state}")
+            relays.toggle("fan", source="manual")
         elif cmd == "l":
-            current = GPIO.input(LIGHT_PIN)
-            GPIO.output(LIGHT_PIN, not current)
-            beep(1)
-            state = "ON" if not current else "OFF"
-            print(f"Light → {state}")
+            relays.toggle("light", source="manual")
         elif cmd == "t":
             t, h = read_dht()
             if t:
@@ -98,6 +93,7 @@ try:
 except KeyboardInterrupt:
     pass
 finally:
+    relays.close()
     GPIO.cleanup()
     print("\nCleaned up — goodbye!")
 EOF
\ No newline at end of file
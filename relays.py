@@ -0,0 +1,95 @@
+# =============================================
+# Relay manager – нэг эх сурвалжтай релений төлөв
+# =============================================
+# Бүх реле командууд (товч, дуу, авто) нэг дараалалаар нэг thread дээр
+# гүйцэтгэгдэнэ. Төлөвийг GPIO.input-ээр буцааж уншихгүй – санах ойд
+# хадгалсан төлөв нь үнэн. Төлөв өөрчлөгдөх бүрт subscriber-үүдэд мэдэгдэнэ.
+import queue
+import threading
+
+
+class RelayManager:
+    def __init__(self, gpio, channels: dict, active_low: bool = True):
+        # channels: "light" → 20, "fan" → 21 гэх мэт (BCM pin)
+        self.gpio = gpio
+        self.channels = dict(channels)
+        self.active_low = active_low
+        self._state = {name: False for name in self.channels}
+        self._subscribers = []
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+
+        for pin in self.channels.values():
+            gpio.setup(pin, gpio.OUT)
+            gpio.output(pin, self._level(False))   # эхлэхэд бүгд OFF
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _level(self, on: bool):
+        # Active-low самбар: LOW = асаалттай
+        if self.active_low:
+            return self.gpio.LOW if on else self.gpio.HIGH
+        return self.gpio.HIGH if on else self.gpio.LOW
+
+    # ---------- Төлөв ----------
+    def is_on(self, name: str) -> bool:
+        with self._lock:
+            return self._state[name]
+
+    def states(self) -> dict:
+        with self._lock:
+            return dict(self._state)
+
+    # ---------- Командууд (аль ч thread-ээс дуудаж болно) ----------
+    def set(self, name: str, on: bool, source: str = "manual"):
+        if name not in self.channels:
+            raise KeyError(f"Тодорхойгүй реле: {name}")
+        self._queue.put((name, bool(on), source))
+
+    def toggle(self, name: str, source: str = "manual"):
+        if name not in self.channels:
+            raise KeyError(f"Тодорхойгүй реле: {name}")
+        self._queue.put((name, None, source))
+
+    def subscribe(self, callback):
+        # callback(name, on, source) – релений thread дээр дуудагдана
+        self._subscribers.append(callback)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=2)
+
+    # ---------- Ажиллагч thread ----------
+    def _run(self):
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            # Дараалалд хуримтлагдсан командуудыг нэг дор авна
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Нэг сувгийн олон командыг эцсийн төлөв болгон нэгтгэнэ
+            pending = {}
+            for cmd in batch:
+                if cmd is None:
+                    running = False
+                    continue
+                name, on, source = cmd
+                current = pending[name][0] if name in pending else self._state[name]
+                pending[name] = (not current if on is None else on, source)
+
+            for name, (on, source) in pending.items():
+                if on == self._state[name]:
+                    continue   # илүүдэл бичилт – GPIO-д хүрэхгүй
+                self.gpio.output(self.channels[name], self._level(on))
+                with self._lock:
+                    self._state[name] = on
+                for callback in list(self._subscribers):
+                    try:
+                        callback(name, on, source)
+                    except Exception as e:
+                        print("Relay subscriber алдаа:", repr(e))
@@ -0,0 +1,215 @@
+# =============================================
+# Автомат удирдлагын дүрмийн хөдөлгүүр (сэнс, гэрэл, хүн, цагийн хуваарь)
+# =============================================
+# Дүрэм бүр энгийн dict:
+#   {"name": "fan_hot", "target": "fan", "input": "temperature",
+#    "on_above": 25.0, "off_below": 24.5}
+#       → 25.0-аас дээш бол асаана, 24.5 ба түүнээс доош бол унтраана (hysteresis)
+#   {"name": "night_off", "target": "light", "between": ("22:00", "06:00"), "state": False}
+#       → тухайн цагийн цонхонд тогтмол төлөв (цонхны гадна саналгүй)
+#   "between" + "input" хамт бол дүрэм зөвхөн цонхон дотор ажиллана,
+#   цонхны гадна "outside" утгыг (байхгүй бол саналгүй) өгнө.
+# Нэг target-д хэд хэдэн дүрэм байвал жагсаалтын сүүлийнх нь давуу.
+# Гараар/дуугаар удирдсан target-ийн дүрмүүд override_ttl хугацаанд түр зогсоно.
+#
+# Оролт: temperature, humidity, presence (ажилтны тоо) ба цаг.
+# Орох бүрт шууд дахин бодогдоно (5 секундын давталт хүлээхгүй).
+#
+# Бичигдсэн trace-ийг дахин тоглуулах:
+#   python rules.py traces/office_day.csv
+#   python rules.py traces/office_day.csv --expect traces/office_day.expected.csv
+import csv
+import datetime
+import json
+import sys
+import threading
+
+TEMP_THRESHOLD = 25.0
+TEMP_HYSTERESIS = 0.5
+OVERRIDE_MINUTES = 30
+
+DEFAULT_RULES = [
+    # Auto Fan
+    {"name": "fan_hot", "target": "fan", "input": "temperature",
+     "on_above": TEMP_THRESHOLD, "off_below": TEMP_THRESHOLD - TEMP_HYSTERESIS},
+    # Auto Light - first person in = ON, last person out = OFF
+    {"name": "light_presence", "target": "light", "input": "presence",
+     "on_above": 0, "off_below": 0},
+]
+
+INPUTS = ("temperature", "humidity", "presence")
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _minutes(hhmm: str) -> int:
+    h, m = hhmm.split(":")
+    return int(h) * 60 + int(m)
+
+
+def in_window(now: datetime.datetime, window) -> bool:
+    start, end = _minutes(window[0]), _minutes(window[1])
+    minute = now.hour * 60 + now.minute
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end   # шөнө дамнасан цонх
+
+
+class RuleEngine:
+    def __init__(self, rules, actuator=None, override_ttl=OVERRIDE_MINUTES * 60, trace_path=None):
+        # actuator(target, on, rule_name) – төлөв өөрчлөх шаардлагатай үед дуудагдана
+        self.rules = [dict(r) for r in rules]
+        self.actuator = actuator
+        self.override_ttl = datetime.timedelta(seconds=override_ttl)
+        self.trace_path = trace_path
+        self.inputs = {}
+        self._latch = {}       # rule name → hysteresis-ийн сүүлийн шийдвэр
+        self._asserted = {}    # target → engine-ийн сүүлд тогтоосон төлөв
+        self._overrides = {}   # target → override дуусах цаг
+        self._lock = threading.Lock()
+
+    def update(self, now=None, **inputs) -> list:
+        # Оролт шинэчлээд дүрмүүдийг шууд бодно. None утгатай оролтыг алгасна
+        # (жишээ нь DHT уншиж чадаагүй үед сүүлийн утга хэвээр).
+        now = now or datetime.datetime.now()
+        with self._lock:
+            changed = {k: v for k, v in inputs.items() if v is not None and self.inputs.get(k) != v}
+            self.inputs.update(changed)
+            for key, value in changed.items():
+                self._trace(now, key, value)
+            actions = self._evaluate(now)
+
+        if self.actuator:
+            for target, on, rule_name in actions:
+                self.actuator(target, on, rule_name)
+        return actions
+
+    def override(self, target: str, now=None, ttl=None):
+        # Гараар удирдсан → дүрмүүд ttl хугацаанд тухайн target-д хүрэхгүй
+        now = now or datetime.datetime.now()
+        ttl = self.override_ttl if ttl is None else datetime.timedelta(seconds=ttl)
+        with self._lock:
+            self._overrides[target] = now + ttl
+            self._asserted.pop(target, None)   # дуусахад дүрмийн төлөвийг дахин тогтооно
+            self._trace(now, "override", target)
+
+    def overridden(self, now=None) -> dict:
+        now = now or datetime.datetime.now()
+        with self._lock:
+            return {t: until for t, until in self._overrides.items() if until > now}
+
+    def _decide(self, rule, now):
+        if "between" in rule and not in_window(now, rule["between"]):
+            return rule.get("outside")
+        if "input" not in rule:
+            return rule.get("state", True)
+
+        value = self.inputs.get(rule["input"])
+        latch = self._latch.get(rule["name"], False)
+        if value is None:
+            return None
+        on_above = rule["on_above"]
+        off_below = rule.get("off_below", on_above)
+        if value > on_above:
+            latch = True
+        elif value <= off_below:
+            latch = False
+        self._latch[rule["name"]] = latch
+        return latch
+
+    def _evaluate(self, now):
+        decisions = {}
+        for rule in self.rules:
+            decision = self._decide(rule, now)
+            if decision is not None:
+                decisions[rule["target"]] = (decision, rule["name"])
+
+        actions = []
+        for target, (on, rule_name) in decisions.items():
+            until = self._overrides.get(target)
+            if until is not None:
+                if now < until:
+                    continue
+                del self._overrides[target]
+            if self._asserted.get(target) == on:
+                continue
+            self._asserted[target] = on
+            actions.append((target, on, rule_name))
+        return actions
+
+    def _trace(self, now, kind, value):
+        if not self.trace_path:
+            return
+        try:
+            with open(self.trace_path, "a", encoding="utf-8") as f:
+                f.write(f"{now.strftime(TS_FORMAT)},{kind},{value}\n")
+        except OSError as e:
+            print("Rule trace бичих алдаа:", e)
+
+
+# =============================================
+# Replay – бичигдсэн мэдрэгч/ирцийн trace-ийг дахин тоглуулах
+# =============================================
+# Trace мөр бүр: "2025-11-15 08:00:00,temperature,23.5"
+#   kind: temperature | humidity | presence | override | tick
+def read_trace(path):
+    with open(path, encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith("#"):
+                continue
+            ts = datetime.datetime.strptime(row[0].strip(), TS_FORMAT)
+            kind = row[1].strip()
+            value = row[2].strip() if len(row) > 2 else ""
+            yield ts, kind, value
+
+
+def replay(events, rules=DEFAULT_RULES, override_ttl=OVERRIDE_MINUTES * 60) -> list:
+    engine = RuleEngine(rules, override_ttl=override_ttl)
+    result = []
+    for ts, kind, value in events:
+        if kind == "override":
+            engine.override(value, now=ts)
+            continue
+        if kind in INPUTS:
+            actions = engine.update(now=ts, **{kind: float(value)})
+        else:
+            actions = engine.update(now=ts)   # tick – цаг/override дуусахыг шалгана
+        for target, on, rule_name in actions:
+            result.append((ts.strftime(TS_FORMAT), target, "ON" if on else "OFF", rule_name))
+    return result
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description="Rule engine trace replay")
+    parser.add_argument("trace")
+    parser.add_argument("--rules", help="JSON файл (dict-үүдийн жагсаалт); өгөхгүй бол DEFAULT_RULES")
+    parser.add_argument("--expect", help="Хүлээгдэж буй үйлдлүүдийн CSV; зөрвөл exit 1")
+    parser.add_argument("--override-minutes", type=float, default=OVERRIDE_MINUTES)
+    args = parser.parse_args(argv)
+
+    rules = DEFAULT_RULES
+    if args.rules:
+        with open(args.rules, encoding="utf-8") as f:
+            rules = json.load(f)
+
+    actions = replay(read_trace(args.trace), rules, override_ttl=args.override_minutes * 60)
+    for row in actions:
+        print(",".join(row))
+
+    if args.expect:
+        with open(args.expect, encoding="utf-8") as f:
+            expected = [tuple(c.strip() for c in row) for row in csv.reader(f)
+                        if row and not row[0].startswith("#")]
+        if expected != actions:
+            print(f"ЗӨРҮҮ: хүлээгдсэн {len(expected)}, гарсан {len(actions)} үйлдэл", file=sys.stderr)
+            for i, (e, a) in enumerate(zip(expected, actions)):
+                if e != a:
+                    print(f"  #{i}: хүлээгдсэн {e} ≠ гарсан {a}", file=sys.stderr)
+                    break
+            return 1
+        print(f"OK – {len(actions)} үйлдэл таарлаа")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
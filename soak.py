@@ -0,0 +1,430 @@
+# =============================================
+# Soak test – бүтэн апп-ыг олон цаг дуурайсан оролтоор ажиллуулж, нөөцийн өсөлтийг барих
+# =============================================
+# Киоск олон долоо хоног унтрахгүй. Tick бүрийн шинэ зураг, овоорсон Toplevel, utterance
+# бүрийн thread/процесс, хязгааргүй өсөх transcript зэрэг алдагдлыг байршуулахаас өмнө барина.
+#   python soak.py --hours 4 [--clip clips/Bat/1.mp4] [--out soak/report.json]
+#                  [--budget rss_mb=64 --budget fds=32 ...]
+# main.py-г тусдаа процесс, түр хавтаст (known_faces, background.jpg холбоос; ирц, history
+# жинхэнэ өгөгдөлд бичигдэхгүй) KIOSK_SOAK тохиргоотой ажиллуулна. Тэр горимд:
+#   - core daemon-д холбогдохгүй; KioskCore(hardware=SimHardware) – GPIO санах ойд, DHT11
+#     синус + шуугиан (хааяа уншилт алдана), камер нь клипийг (эсвэл хиймэл frame) давтана
+#   - SoakDriver Tk thread дээр алхам бүрт: таних/бүртгэлийн preview, бүртгэл, танихгүй царай,
+#     орчны түүх цонх нээж хаах, дуут команд + transcript, реле, дэлгэцийн гар
+#   - Monitor interval тутам RSS, thread, fd, хүүхэд процесс, Tk widget/image, transcript-ийн
+#     уртыг samples.jsonl-д бичнэ. Warmup-ийн дараах суурь утгаас өсөлт (сүүлийн 3-ын медиан)
+#     budget-ээс хэтэрвэл тэр дороо зогсож, exit code 1.
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SOAK_ENV = "KIOSK_SOAK"
+CONFIG = json.loads(os.environ[SOAK_ENV]) if os.environ.get(SOAK_ENV) else None
+ENABLED = CONFIG is not None
+
+# Warmup-ийн дараах суурь утгаас зөвшөөрөх өсөлт
+BUDGETS = {"rss_mb": 64, "threads": 8, "native_threads": 8, "fds": 32, "children": 2,
+           "widgets": 150, "tk_images": 10, "transcript_chars": 4000}
+VOICE_PHRASES = ("гэрэл асаа", "сэнс унтраа", "гэрэл унтраа, сэнс асаа", "өнөөдөр цаг агаар ямар байна",
+                 "сайн байна уу", "сэнсээ асаагаарай")
+LINKED = ("known_faces", "models", "background.jpg")     # түр хавтаст холбоосоор
+COPIED = ("face_assets.json", "thresholds.json")          # core дахин бичиж болох тул хуулна
+_result = {"code": 2}   # дуусаагүй (цонх гараар хаагдсан г.м.)
+
+
+# =============================================
+# Дуурайсан төхөөрөмж
+# =============================================
+class SimGPIO:
+    BCM, OUT, IN, HIGH, LOW = "BCM", "OUT", "IN", 1, 0
+
+    def __init__(self):
+        self.levels = {}
+
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, mode):
+        self.levels.setdefault(pin, self.LOW)
+
+    def output(self, pin, level):
+        self.levels[pin] = level
+
+    def input(self, pin):
+        return self.levels.get(pin, self.LOW)
+
+    def cleanup(self):
+        self.levels.clear()
+
+
+class SimDHT:
+    # 24°C ± 5 (period секундын синус) + шуугиан; DHT11 шиг fail_rate-ээр RuntimeError
+    def __init__(self, period=1800.0, fail_rate=0.1, seed=0):
+        self.period = period
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.t0 = time.time()
+
+    def _maybe_fail(self):
+        if self.rng.random() < self.fail_rate:
+            raise RuntimeError("Checksum did not validate. Try again.")
+
+    @property
+    def temperature(self):
+        self._maybe_fail()
+        phase = 2 * math.pi * (time.time() - self.t0) / self.period
+        return round(24 + 5 * math.sin(phase) + self.rng.gauss(0, 0.3), 1)
+
+    @property
+    def humidity(self):
+        phase = 2 * math.pi * (time.time() - self.t0) / self.period
+        return round(45 - 10 * math.sin(phase) + self.rng.gauss(0, 1), 1)
+
+
+class SimCapture:
+    # cv2.VideoCapture-ийн CameraWorker-т хэрэглэдэг хэсэг: isOpened/read(image)/release, fps-ээр
+    def __init__(self, frames, fps=15):
+        self.frames = frames
+        self.interval = 1.0 / fps
+        self.index = 0
+        self.opened = True
+        self._next = time.monotonic()
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self, image=None):
+        if not self.opened:
+            return False, None
+        delay = self._next - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next = max(self._next, time.monotonic()) + self.interval
+        frame = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        if image is not None and image.shape == frame.shape:
+            image[...] = frame
+            return True, image
+        return True, frame.copy()
+
+    def release(self):
+        self.opened = False
+
+
+def load_frames(clip=None, limit=300, size=(640, 480)):
+    # → BGR frame-ууд. Клипгүй бол хөдөлгөөнтэй хиймэл зураг (motion gate нээгдэнэ, царай үгүй).
+    import cv2
+    import numpy as np
+
+    if clip:
+        from detection import iter_frames
+
+        frames = [cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR) for _, rgb in iter_frames(clip, limit)]
+        if frames:
+            return frames
+        print(f"Soak: {clip}-ээс frame олдсонгүй – хиймэл frame ашиглана")
+    w, h = size
+    frames = []
+    for i in range(60):
+        frame = np.full((h, w, 3), 40, dtype=np.uint8)
+        x = int((w - 120) * (0.5 + 0.5 * math.sin(i / 60 * 2 * math.pi)))
+        cv2.rectangle(frame, (x, h // 3), (x + 120, h // 3 + 160), (180, 170, 160), -1)
+        frames.append(frame)
+    return frames
+
+
+class SimHardware:
+    def __init__(self, config):
+        self.gpio = SimGPIO()
+        self.dht = SimDHT(period=config.get("sensor_period", 1800.0))
+        self.fps = config.get("fps", 15)
+        self.frames = load_frames(config.get("clip"))
+
+    def capture(self, source):
+        return SimCapture(self.frames, self.fps)
+
+
+def hardware():
+    return SimHardware(CONFIG)
+
+
+# =============================================
+# Нөөцийн хэмжилт
+# =============================================
+def rss_mb():
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    return None
+
+
+def child_processes():
+    pid = str(os.getpid())
+    count = 0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+        except OSError:
+            continue   # энэ агшинд дууссан
+        if stat[stat.rfind(")") + 2:].split()[1] == pid:   # ")"-ийн дараа: төлөв, ppid
+            count += 1
+    return count
+
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def _median3(values):
+    last = sorted(values[-3:])
+    return last[len(last) // 2]
+
+
+def _slope_per_hour(samples, key):
+    points = [(s["t"], s[key]) for s in samples if s.get(key) is not None]
+    if len(points) < 2:
+        return None
+    n = len(points)
+    mt = sum(t for t, _ in points) / n
+    mv = sum(v for _, v in points) / n
+    var = sum((t - mt) ** 2 for t, _ in points)
+    return round(sum((t - mt) * (v - mv) for t, v in points) / var * 3600, 3) if var else None
+
+
+# =============================================
+# Driver – main.py-ийн Tk thread дээр
+# =============================================
+class SoakDriver:
+    def __init__(self, app, ns, config):
+        self.app = app
+        self.ns = ns    # main.py-ийн globals – функцууд, ai_transcript-ийн одоогийн утга
+        self.duration = config["hours"] * 3600
+        self.interval = config.get("interval", 10.0)
+        self.step_every = config.get("step", 5.0)
+        self.dwell = config.get("dwell", 3.0)
+        self.warmup = config.get("warmup", min(600.0, self.duration * 0.1))
+        self.budgets = dict(BUDGETS, **config.get("budgets", {}))
+        self.out = config["out"]
+        self.rng = random.Random(config.get("seed", 0))
+        self.samples = []
+        self.baseline = None
+        self.failures = []
+        self.steps = 0
+        self.t0 = time.monotonic()
+        self._samples_file = open(os.path.splitext(self.out)[0] + ".samples.jsonl", "w", encoding="utf-8")
+        self.actions = [
+            ("recognize", ns["recognize_once"]),
+            ("add_worker", ns["add_worker"]),
+            ("logs", ns["show_all_logs"]),
+            ("unknowns", ns["show_unknowns"]),
+            ("history", ns["show_sensor_history"]),
+            ("voice", self._voice),
+            ("relay", self._relay),
+            ("keyboard", self._keyboard),
+        ]
+
+    def start(self):
+        self.app.after(int(self.step_every * 1000), self._step)
+        self.app.after(0, self._sample)
+        print(f"Soak: {self.duration / 3600:.1f} цаг, тайлан {self.out}")
+        return self
+
+    # ---------- Алхмууд ----------
+    def _toplevels(self):
+        osk = self.ns.get("osk")
+        keep = osk.window if osk is not None else None
+        return [w for w in self.app.winfo_children()
+                if w.winfo_class() in ("Toplevel", "CTkToplevel") and w is not keep]
+
+    def _step(self):
+        if self._finished():
+            return
+        before = set(self._toplevels())
+        name, action = self.actions[self.steps % len(self.actions)]
+        self.steps += 1
+        try:
+            action()
+        except Exception as e:
+            print(f"Soak алхам '{name}' алдаа:", repr(e))
+        self.app.after(int(self.dwell * 1000), lambda: self._close_new(before))
+        self.app.after(int(self.step_every * 1000), self._step)
+
+    def _close_new(self, before):
+        # Алхмын нээсэн цонхнуудыг хаана (хэрэглэгч хаасантай ижил)
+        for window in self._toplevels():
+            if window not in before and window.winfo_exists():
+                window.destroy()
+        osk = self.ns.get("osk")
+        if osk is not None:
+            osk.hide()
+        self.app.after(1000, self._check_preview)
+
+    def _check_preview(self):
+        # Preview цонх хаагдсан бол FrameScheduler on_stop → close_preview → core.preview_stop
+        # ажилласан байх ёстой; үгүй бол камер дэмий барьж, илрүүлэлт үргэлжилнэ.
+        camera = self.ns["preview_camera"][0]
+        if camera is not None and not self._toplevels() and not self._finished():
+            self.failures.append({"metric": "preview_stop", "camera": camera,
+                                  "t": round(time.monotonic() - self.t0, 1)})
+            self._finish()
+
+    def _voice(self):
+        phrase = self.rng.choice(VOICE_PHRASES)
+        self.ns["append_transcript"](phrase)   # нэг урт сонсголын transcript шиг өснө
+        if not self.ns["process_voice_command"](phrase):
+            self.ns["speak"](phrase)
+
+    def _relay(self):
+        self.ns["toggle_sens1"]() if self.rng.random() < 0.5 else self.ns["toggle_gerel"]()
+
+    def _keyboard(self):
+        import customtkinter as ctk
+
+        win = ctk.CTkToplevel(self.app)
+        entry = ctk.CTkEntry(win, width=300)
+        entry.pack(padx=20, pady=20)
+        self.ns["show_custom_keyboard"](entry)
+        osk = self.ns["osk"]
+        for ch in "soak тест":
+            osk.type(ch)
+        osk.backspace()
+
+    # ---------- Хэмжилт ----------
+    def _sample(self):
+        if self._finished():
+            return
+        sample = {"t": round(time.monotonic() - self.t0, 1), "rss_mb": rss_mb(),
+                  "threads": threading.active_count(), "native_threads": len(os.listdir("/proc/self/task")),
+                  "fds": len(os.listdir("/proc/self/fd")), "children": child_processes(),
+                  "widgets": count_widgets(self.app), "tk_images": len(self.app.tk.call("image", "names")),
+                  "transcript_chars": len(self.ns.get("ai_transcript") or ""), "steps": self.steps}
+        self.samples.append(sample)
+        self._samples_file.write(json.dumps(sample) + "\n")
+        self._samples_file.flush()
+        if sample["t"] >= self.warmup:
+            if self.baseline is None:
+                self.baseline = sample
+            self._check()
+        if self.failures or sample["t"] >= self.duration:
+            self._finish()
+            return
+        self.app.after(int(self.interval * 1000), self._sample)
+
+    def _check(self):
+        post = [s for s in self.samples if s["t"] >= self.baseline["t"]]
+        for key, budget in self.budgets.items():
+            value = _median3([s[key] for s in post])
+            if value - self.baseline[key] > budget:
+                self.failures.append({"metric": key, "baseline": self.baseline[key], "value": value,
+                                      "budget": budget, "t": post[-1]["t"]})
+
+    def _finished(self):
+        return _result["code"] != 2
+
+    def _finish(self):
+        post = [s for s in self.samples if self.baseline and s["t"] >= self.baseline["t"]]
+        report = {
+            "ok": not self.failures,
+            "elapsed_s": round(time.monotonic() - self.t0, 1),
+            "steps": self.steps,
+            "samples": len(self.samples),
+            "warmup_s": self.warmup,
+            "budgets": self.budgets,
+            "baseline": self.baseline,
+            "last": self.samples[-1] if self.samples else None,
+            "growth": {k: round(_median3([s[k] for s in post]) - self.baseline[k], 2)
+                       for k in self.budgets} if post else None,
+            "slope_per_hour": {k: _slope_per_hour(post, k) for k in self.budgets},
+            "failures": self.failures,
+        }
+        with open(self.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        self._samples_file.close()
+        _result["code"] = 0 if report["ok"] else 1
+        print(f"Soak {'OK' if report['ok'] else 'FAIL'}: {self.out}")
+        self.app.after(0, self.app.quit)
+
+
+def drive(app, ns):
+    return SoakDriver(app, ns, CONFIG).start()
+
+
+def exit_code():
+    return _result["code"]
+
+
+# =============================================
+# CLI – main.py-г түр хавтаст soak горимд ажиллуулна
+# =============================================
+def prepare_workdir(workdir, repo):
+    os.makedirs(workdir, exist_ok=True)
+    for name in LINKED:
+        src, dst = os.path.join(repo, name), os.path.join(workdir, name)
+        if os.path.exists(src) and not os.path.lexists(dst):
+            os.symlink(src, dst)
+    for name in COPIED:
+        src = os.path.join(repo, name)
+        if os.path.exists(src):
+            shutil.copy2(src, os.path.join(workdir, name))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Киоскийн урт хугацааны soak test")
+    parser.add_argument("--hours", type=float, default=4.0)
+    parser.add_argument("--clip", help="камерын оронд давтах видео/зургийн хавтас (анхдагч: хиймэл frame)")
+    parser.add_argument("--out", default=os.path.join("soak", "report.json"))
+    parser.add_argument("--workdir", help="ажиллах түр хавтас (анхдагч: шинэ tmp)")
+    parser.add_argument("--interval", type=float, default=10.0, help="хэмжилтийн давтамж, сек")
+    parser.add_argument("--step", type=float, default=5.0, help="дуурайсан үйлдэл хоорондын сек")
+    parser.add_argument("--dwell", type=float, default=3.0, help="нээсэн цонхыг хаах хүртэл сек")
+    parser.add_argument("--warmup", type=float, help="суурь утга авах хүртэл сек (анхдагч: 10%%, ≤10 мин)")
+    parser.add_argument("--fps", type=float, default=15)
+    parser.add_argument("--budget", action="append", default=[], metavar="METRIC=N",
+                        help=f"өсөлтийн хязгаар ({', '.join(f'{k}={v}' for k, v in BUDGETS.items())})")
+    args = parser.parse_args(argv)
+
+    budgets = {}
+    for item in args.budget:
+        key, _, value = item.partition("=")
+        if key not in BUDGETS:
+            parser.error(f"'{key}' хэмжигдэхүүн алга ({', '.join(BUDGETS)})")
+        budgets[key] = float(value)
+    repo = os.path.dirname(os.path.abspath(__file__))
+    out = os.path.abspath(args.out)
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="kiosk-soak-"))
+    prepare_workdir(workdir, repo)
+    config = {"hours": args.hours, "clip": os.path.abspath(args.clip) if args.clip else None, "out": out,
+              "interval": args.interval, "step": args.step, "dwell": args.dwell, "fps": args.fps,
+              "budgets": budgets}
+    if args.warmup is not None:
+        config["warmup"] = args.warmup
+    env = dict(os.environ, **{SOAK_ENV: json.dumps(config),
+                              "KIOSK_CORE_SOCKET": os.path.join(workdir, "core.sock")})
+    print(f"Soak: {workdir}")
+    code = subprocess.call([sys.executable, os.path.join(repo, "main.py")], cwd=workdir, env=env)
+    if os.path.exists(out):
+        with open(out, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        print(json.dumps({k: report[k] for k in ("ok", "elapsed_s", "steps", "growth", "failures")},
+                         indent=2, ensure_ascii=False))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
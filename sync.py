@@ -0,0 +1,468 @@
+# =============================================
+# Олон киоскийн синхрончлол (hub ↔ киоск)
+# =============================================
+# Киоск бүр өөрийн өөрчлөлтийг (op) дугаарлан outbox-д бичнэ:
+#   {"kiosk": "door-a", "seq": 17, "type": "enroll", "name", "fields", "encoding"}
+#   {"kiosk": "door-a", "seq": 18, "type": "attendance", "name", "action", "ts", "camera"}
+#   {"kiosk": "door-a", "seq": 19, "type": "remove", "name", "into"}   – replace/dedup-ийн
+#     хуучин бүртгэл (into – dedup-ээр нэгтгэсэн бол үлдсэн нэр; түүний sample-ууд enroll op-оор)
+# Hub op бүрт нийтлэг hub_seq өгч append-only хадгална. Киоск:
+#   push – hub-ийн баталгаажуулсан (acked) дугаараас хойших op-уудыг илгээнэ
+#   pull – сүүлд авсан hub_seq-ээс хойших бусад киоскийн op-уудыг авч apply хийнэ
+# Сүлжээгүй үед op-ууд outbox-д хуримтлагдаж, холболт сэргэхэд нөхөж илгээнэ; acked болсон
+# op-ууд outbox-оос хасагдана. outbox/state-ийг нэгээс олон процесс (core, dedup/enroll CLI)
+# бичиж болох тул sync/outbox.lock (flock) дор state-ийг дахин уншаад seq өгнө.
+# Apply алдаатай op-оос цааш hub_seq ахихгүй – дараагийн pull-д дахин оролдоно; APPLY_ATTEMPTS
+# удаа бүтэлгүйтсэн op sync/failed.jsonl-д үлдэж алгасагдана (бусад киоскийн sync-ийг хаахгүй).
+# Encoding нь JPEG биш 128×float32 (base64) – op бүр ~0.8 KB, body-нууд gzip-тэй.
+#
+#   python sync.py hub --port 8770 --data hub_data        → hub (туршилтын stand-in)
+#   KIOSK_HUB_URL=http://hub:8770 KIOSK_ID=door-a python core.py
+#   python sync.py measure --kiosks 3 --events 500 --enrollments 20 --offline 5
+import base64
+import contextlib
+import fcntl
+import gzip
+import json
+import os
+import socket
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import numpy as np
+
+import metrics
+
+HUB_URL = os.environ.get("KIOSK_HUB_URL", "")
+KIOSK_ID = os.environ.get("KIOSK_ID", socket.gethostname())
+SYNC_DIR = "sync"
+SYNC_INTERVAL = 5.0
+BATCH = 500
+MAX_BACKOFF = 60.0
+APPLY_ATTEMPTS = 5
+
+
+def encode_vector(encoding):
+    return base64.b64encode(np.asarray(encoding, dtype="<f4").tobytes()).decode("ascii")
+
+
+def decode_vector(text):
+    return np.frombuffer(base64.b64decode(text), dtype="<f4").astype(np.float64)
+
+
+def _pack(obj):
+    return gzip.compress(json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+
+def _unpack(data):
+    return json.loads(gzip.decompress(data).decode("utf-8"))
+
+
+# =============================================
+# Киоск тал
+# =============================================
+class SyncAgent:
+    # apply(op) – бусад киоскийн op-ыг хүлээн авагч (KioskCore.apply_remote)
+    def __init__(self, hub_url=HUB_URL, kiosk_id=KIOSK_ID, state_dir=SYNC_DIR, apply=None,
+                 interval=SYNC_INTERVAL, batch=BATCH, max_backoff=MAX_BACKOFF):
+        self.hub_url = hub_url.rstrip("/")
+        self.kiosk_id = kiosk_id
+        self.state_dir = state_dir
+        self.apply = apply or (lambda op: None)
+        self.interval = interval
+        self.batch = batch
+        self.max_backoff = max_backoff
+        self.online = False
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = False
+        os.makedirs(state_dir, exist_ok=True)
+        self._outbox_path = os.path.join(state_dir, "outbox.jsonl")
+        self._state_path = os.path.join(state_dir, "state.json")
+        self._lock_path = os.path.join(state_dir, "outbox.lock")
+        self._failed_path = os.path.join(state_dir, "failed.jsonl")
+        self._failures = {}  # (kiosk, seq) → apply оролдлогын тоо
+        self.state = {"next_seq": 1, "acked": 0, "hub_seq": 0}
+        with self._file_lock():
+            self._merge_state()
+            self._pending = self._read_outbox()   # acked-аас хойших op-ууд (дарааллаар)
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def status(self):
+        return {"kiosk": self.kiosk_id, "online": self.online, "pending": self.pending,
+                "acked": self.state["acked"], "hub_seq": self.state["hub_seq"],
+                "bytes_sent": self.bytes_sent, "bytes_received": self.bytes_received}
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        # Thread + процесс хоорондын түгжээ: outbox, state.json-ийг зөвхөн үүн дотор өөрчилнө
+        with self._lock, open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _merge_state(self):
+        # Өөр процессын бичсэн state – тоолуур бүр зөвхөн өснө
+        if os.path.exists(self._state_path):
+            with open(self._state_path, "r", encoding="utf-8") as f:
+                disk = json.load(f)
+            for key, value in disk.items():
+                self.state[key] = max(self.state.get(key, 0), value)
+
+    def _read_outbox(self):
+        ops = []
+        if os.path.exists(self._outbox_path):
+            with open(self._outbox_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    op = json.loads(line)
+                    if op["seq"] > self.state["acked"]:
+                        ops.append(op)
+        return ops
+
+    def _save_state(self):
+        tmp = self._state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self._state_path)
+
+    # ---------- Локал өөрчлөлт ----------
+    def record(self, op_type, **data):
+        # Critical path-д зөвхөн outbox-д нэг мөр нэмнэ; илгээлт background thread дээр
+        with self._file_lock():
+            self._merge_state()   # CLI процесс энэ хооронд seq авсан байж болно
+            op = {"kiosk": self.kiosk_id, "seq": self.state["next_seq"], "type": op_type, **data}
+            self.state["next_seq"] += 1
+            with open(self._outbox_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(op, ensure_ascii=False) + "\n")
+            self._save_state()
+            self._pending.append(op)
+        self._wake.set()
+        return op
+
+    # ---------- Hub-тай харилцах ----------
+    def _request(self, path, body=None):
+        data = _pack(body) if body is not None else None
+        req = urllib.request.Request(self.hub_url + path, data=data, method="POST" if data else "GET",
+                                     headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            raw = resp.read()
+        sent, received = len(data or b""), len(raw)
+        self.bytes_sent += sent
+        self.bytes_received += received
+        metrics.inc("sync_bytes_total", sent, direction="sent")
+        metrics.inc("sync_bytes_total", received, direction="received")
+        return _unpack(raw)
+
+    def push(self):
+        pushed = 0
+        while True:
+            with self._file_lock():
+                self._merge_state()
+                self._pending = self._read_outbox()   # өөр процессын нэмсэн op-ууд ч
+                batch = self._pending[:self.batch]
+            if not batch:
+                return pushed
+            acked = self._request("/push", {"kiosk": self.kiosk_id, "ops": batch})["acked"]
+            with self._file_lock():
+                self._merge_state()
+                self.state["acked"] = max(self.state["acked"], acked)
+                self._save_state()
+                self._pending = self._read_outbox()
+                self._compact()
+            pushed += len(batch)
+
+    def _compact(self):
+        # acked хүртэлх op-уудыг outbox-оос хасна (_file_lock дотор, _pending шинэ байхад)
+        tmp = self._outbox_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(op, ensure_ascii=False) + "\n" for op in self._pending)
+        os.replace(tmp, self._outbox_path)
+
+    def pull(self):
+        pulled = 0
+        while True:
+            query = urlencode({"since": self.state["hub_seq"], "exclude": self.kiosk_id, "limit": self.batch})
+            reply = self._request(f"/pull?{query}")
+            hub_seq, blocked = reply["hub_seq"], False
+            for op in reply["ops"]:
+                if not self._apply(op):
+                    hub_seq, blocked = op["hub_seq"] - 1, True   # энэ op-оос дахин эхэлнэ
+                    break
+                pulled += 1
+            with self._file_lock():
+                self._merge_state()
+                self.state["hub_seq"] = max(self.state["hub_seq"], hub_seq)
+                self._save_state()
+            if blocked or not reply["more"]:
+                return pulled
+
+    def _apply(self, op):
+        # → hub_seq-ийг энэ op-оос цааш ахиулж болох эсэх
+        key = (op.get("kiosk"), op.get("seq"))
+        try:
+            self.apply(op)
+            self._failures.pop(key, None)
+            return True
+        except Exception as e:
+            error = repr(e)
+            attempts = self._failures[key] = self._failures.get(key, 0) + 1
+            print(f"Sync: op {key[0]}#{key[1]} ({op.get('type')}) apply алдаа ({attempts}/{APPLY_ATTEMPTS}):", error)
+            metrics.inc("sync_apply_errors_total", type=op.get("type", ""))
+            if attempts < APPLY_ATTEMPTS:
+                return False
+        # Дахин дахин бүтэлгүйтсэн – хадгалаад алгасна (дараагийн бүх op-ыг хаахгүй)
+        with open(self._failed_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(dict(op, error=error), ensure_ascii=False) + "\n")
+        self._failures.pop(key, None)
+        metrics.inc("sync_apply_skipped_total", type=op.get("type", ""))
+        return True
+
+    def sync_once(self):
+        pushed = self.push()
+        pulled = self.pull()
+        metrics.inc("sync_ops_total", pushed, direction="pushed")
+        metrics.inc("sync_ops_total", pulled, direction="pulled")
+        return pushed, pulled
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._run, daemon=True, name="sync").start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+
+    def _run(self):
+        delay = self.interval
+        while self._running:
+            try:
+                self.sync_once()
+                self.online = True
+                delay = self.interval
+            except (OSError, ValueError, KeyError) as e:   # URLError нь OSError
+                if self.online:
+                    print("Sync: hub холбогдсонгүй, outbox-д хуримтлуулна:", repr(e))
+                self.online = False
+                delay = min(self.max_backoff, max(self.interval, delay * 2))
+            except Exception as e:
+                # Хүлээгээгүй алдаа sync thread-ийг чимээгүй алахгүй
+                print("Sync алдаа:", repr(e))
+                metrics.inc("sync_errors_total")
+                delay = min(self.max_backoff, max(self.interval, delay * 2))
+            self._wake.wait(delay)
+            self._wake.clear()
+
+
+def record_from_cli(ops):
+    # CLI хэрэгслүүд (dedup.py, enroll.py) – [(op_type, data), ...]. Core daemon ажиллаж байвал
+    # түүний SyncAgent-аар, үгүй бол outbox-д шууд (outbox.lock дор – GUI-ийн дотоод core-ийн
+    # SyncAgent ажиллаж байсан ч seq давхцахгүй, тэр дараагийн push-даа outbox-оос уншина).
+    # Sync ашигладаггүй киоск (HUB_URL, sync/state.json алга) бол юу ч хийхгүй.
+    import ipc
+
+    client = ipc.connect()
+    if client is not None:
+        return sum(bool(client.sync_record(op_type, data)) for op_type, data in ops)
+    if not HUB_URL and not os.path.exists(os.path.join(SYNC_DIR, "state.json")):
+        return 0
+    agent = SyncAgent(HUB_URL)
+    for op_type, data in ops:
+        agent.record(op_type, **data)
+    return len(ops)
+
+
+# =============================================
+# Hub тал (туршилтын stand-in; бодит hub ч ижил протоколтой байна)
+# =============================================
+class Hub:
+    def __init__(self, data_dir="hub_data"):
+        os.makedirs(data_dir, exist_ok=True)
+        self._path = os.path.join(data_dir, "ops.jsonl")
+        self._lock = threading.Lock()
+        self.ops = []       # hub_seq = индекс + 1
+        self.acked = {}     # kiosk → хүлээн авсан хамгийн их seq
+        if os.path.exists(self._path):
+            with open(self._path, "r", encoding="utf-8") as f:
+                for line in f:
+                    op = json.loads(line)
+                    self.ops.append(op)
+                    self.acked[op["kiosk"]] = max(self.acked.get(op["kiosk"], 0), op["seq"])
+
+    def push(self, kiosk, ops):
+        with self._lock:
+            acked = self.acked.get(kiosk, 0)
+            with open(self._path, "a", encoding="utf-8") as f:
+                for op in ops:
+                    if op["seq"] <= acked:
+                        continue   # дахин илгээсэн (ack хүрээгүй байсан) – давхардуулахгүй
+                    op = dict(op, hub_seq=len(self.ops) + 1)
+                    self.ops.append(op)
+                    f.write(json.dumps(op, ensure_ascii=False) + "\n")
+                    acked = op["seq"]
+            self.acked[kiosk] = acked
+            return acked
+
+    def pull(self, since, exclude, limit):
+        with self._lock:
+            found, last = [], since
+            for op in self.ops[since:]:
+                if len(found) >= limit:
+                    break
+                last = op["hub_seq"]
+                if op["kiosk"] != exclude:
+                    found.append(op)
+            return {"ops": found, "hub_seq": last, "more": last < len(self.ops)}
+
+
+class _HubHandler(BaseHTTPRequestHandler):
+    def _reply(self, obj):
+        body = _pack(obj)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/push":
+            self.send_error(404)
+            return
+        body = _unpack(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        self._reply({"acked": self.server.hub.push(body["kiosk"], body["ops"])})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/pull":
+            self.send_error(404)
+            return
+        q = parse_qs(url.query)
+        self._reply(self.server.hub.pull(int(q.get("since", ["0"])[0]), q.get("exclude", [""])[0],
+                                         int(q.get("limit", [str(BATCH)])[0])))
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_hub(port=8770, data_dir="hub_data", host="0.0.0.0"):
+    server = ThreadingHTTPServer((host, port), _HubHandler)
+    server.daemon_threads = True
+    server.hub = Hub(data_dir)
+    return server
+
+
+# =============================================
+# Хэмжилт: bandwidth, convergence (hub тусдаа процесс, offline үе оруулж болно)
+# =============================================
+class _Replica:
+    # Хэмжилтэд apply хийгдсэн op-уудыг л тоолно (core-гүй)
+    def __init__(self):
+        self.seen = set()
+
+    def apply(self, op):
+        self.seen.add((op["kiosk"], op["seq"]))
+
+
+def measure(kiosks=3, enrollments=20, events=500, offline=0.0, interval=0.2):
+    import random
+    import tempfile
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    url = f"http://127.0.0.1:{port}"
+    root = tempfile.mkdtemp(prefix="kiosk-sync-")
+    replicas = [_Replica() for _ in range(kiosks)]
+    agents = [SyncAgent(url, f"kiosk-{i}", os.path.join(root, f"kiosk-{i}"), replicas[i].apply,
+                        interval=interval, max_backoff=1.0).start()
+              for i in range(kiosks)]
+    hub = None
+    try:
+        rng = random.Random(0)
+        if not offline:
+            hub = _start_hub(port, root)
+        for i in range(enrollments):
+            agent = agents[i % kiosks]
+            agent.record("enroll", name=f"worker {i}", fields={"Full Name": f"worker {i}"},
+                         encoding=encode_vector(np.random.default_rng(i).normal(0, 0.1, 128)))
+        for i in range(events):
+            agent = rng.choice(agents)
+            agent.record("attendance", name=f"worker {rng.randrange(max(1, enrollments))}",
+                         action=rng.choice(("IN", "OUT")), ts=time.strftime("%Y-%m-%d %H:%M:%S"),
+                         camera="kiosk")
+        queued = None
+        if offline:
+            time.sleep(offline)   # hub байхгүй – outbox-д хуримтлагдана
+            queued = sum(a.pending for a in agents)
+            hub = _start_hub(port, root)
+        t0 = time.perf_counter()
+        total = enrollments + events
+        while True:
+            own = [agent.state["next_seq"] - 1 for agent in agents]
+            if all(len(r.seen) >= total - own[i] for i, r in enumerate(replicas)):
+                break
+            if time.perf_counter() - t0 > 120:
+                raise SystemExit("120 секундэд нэгдсэнгүй")
+            time.sleep(0.01)
+        converged = time.perf_counter() - t0
+    finally:
+        for agent in agents:
+            agent.stop()
+        if hub is not None:
+            hub.terminate()
+            hub.wait()
+    sent = sum(a.bytes_sent for a in agents)
+    received = sum(a.bytes_received for a in agents)
+    return {
+        "kiosks": kiosks, "ops": enrollments + events, "enrollments": enrollments, "events": events,
+        "offline_s": offline, "queued_while_offline": queued,
+        "convergence_s": round(converged, 3),
+        "bytes_sent": sent, "bytes_received": received,
+        "bytes_per_op_sent": round(sent / max(1, enrollments + events), 1),
+    }
+
+
+def _start_hub(port, root):
+    import subprocess
+    import sys
+
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "hub", "--port", str(port),
+                             "--host", "127.0.0.1", "--data", os.path.join(root, "hub")])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Киоск ↔ hub синхрончлол")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_hub = sub.add_parser("hub", help="hub ажиллуулах")
+    p_hub.add_argument("--port", type=int, default=8770)
+    p_hub.add_argument("--host", default="0.0.0.0")
+    p_hub.add_argument("--data", default="hub_data")
+    p_measure = sub.add_parser("measure", help="bandwidth ба convergence хэмжих")
+    p_measure.add_argument("--kiosks", type=int, default=3)
+    p_measure.add_argument("--enrollments", type=int, default=20)
+    p_measure.add_argument("--events", type=int, default=500)
+    p_measure.add_argument("--offline", type=float, default=0.0, help="эхний N секунд hub унтарсан")
+    args = parser.parse_args()
+    if args.command == "hub":
+        server = serve_hub(args.port, args.data, args.host)
+        print(f"Sync hub: http://{args.host}:{args.port} ({args.data})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    else:
+        print(json.dumps(measure(args.kiosks, args.enrollments, args.events, args.offline),
+                         indent=2, ensure_ascii=False))
@@ -0,0 +1,47 @@
+# Ирцийн segment-ийн нийлбэр: sync-ээр хожуу ирсэн мөр (python -m unittest discover tests)
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attendance import AttendanceLog, finalize
+
+
+class LateRowTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.log = AttendanceLog(self.dir.name, legacy=None)
+        self.month = time.strftime("%Y-%m")
+        # OUT эхэлж бичигдэнэ, өглөөний IN нь өөр киоскоос хожуу ирнэ (core.apply_remote)
+        self.log.append("Bat", "OUT", f"{self.month}-02 18:00:00", "door-b")
+        self.log.append("Bat", "IN", f"{self.month}-02 09:00:00", "door-a")
+
+    def tearDown(self):
+        self.log.close()
+        self.dir.cleanup()
+
+    def hours(self, workers):
+        return finalize(workers, end=0)["Bat"]["hours"]
+
+    def test_index_matches_scan(self):
+        meta = self.log.segments[self.month]
+        self.assertEqual(self.hours(self.log.summary()), 9.0)   # бүтэн segment – index-ээс
+        self.assertEqual(self.hours(self.log._segment_summary(meta, None, None, None)), 9.0)
+
+    def test_reload_and_seal(self):
+        self.log.close()
+        log = AttendanceLog(self.dir.name, legacy=None)
+        self.assertEqual(self.hours(log.summary()), 9.0)
+        log._seal(self.month)
+        with open(os.path.join(self.dir.name, f"{self.month}.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.assertEqual(self.hours(manifest["workers"]), 9.0)
+        log.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+# =============================================
+# Хүн бүрийн танилтын босго – ажиглагдсан зайнаас тохируулах
+# =============================================
+# Нэг TOLERANCE (0.55) бүгдэд: зарим хүн (нүдний шил, гэрэлтүүлэг, хуучин зураг) 0.56–0.60
+# зайтай гарч дахин дахин оролддог, зарим хүний царай бусадтайгаа ойр тул 0.55 эрсдэлтэй.
+#
+# 1) DistanceLog – танилт бүрт (match_faces) хамгийн ойр хүн ба дараагийн өөр хүний зайг
+#    calibration/distances.csv-д бичнэ (камер+хүн тутамд секундэд нэгээс ихгүй, файл эргэлдэнэ).
+# 2) python thresholds.py → thresholds.json:
+#      genuine  – тухайн үеийн босгоор хүлээн авсан (accepted) бөгөөд хамгийн ойр хүн нь бусдаасаа
+#                 MARGIN-аар илт ойр бол тэр хүний жинхэнэ зай. Босгоос гадуурх зай баталгаагүй –
+#                 тэр хүн байж ч, бүртгэлгүй төстэй хүн байж ч болно, genuine-д орохгүй.
+#      impostor – тухайн хүн "дараагийнх" болж гарсан зай (өөр хүн түүнд хэр ойртдог)
+#    Нийтийн босго: impostor-уудын FAR_TARGET хувь хүртэл зөвшөөрөх хамгийн том утга.
+#    Хүн бүрийн босго: genuine-ийн TAR_TARGET quantile + бага зай, нийтийнхээс MAX_DELTA хүртэл
+#    доош (хэзээ ч дээш биш – баталгаатай шошгогүй), тэр хүний хамгийн ойр impostor-оос SAFETY-гаар
+#    доор. MIN_SAMPLES хүрэхгүй бол нийтийнх.
+# 3) core.reload_faces → FaceIndex.calibrate(load()) – match хийх үед хэрэглэгдэнэ.
+#   python thresholds.py [--far 0.001] [--tar 0.98] [--dry-run]
+import argparse
+import collections
+import csv
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from recognition import TOLERANCE
+
+DISTANCE_LOG = os.path.join("calibration", "distances.csv")
+THRESHOLDS_FILE = "thresholds.json"
+LOG_MAX_BYTES = 20 * 1024 * 1024
+RECORD_GAP = 1.0         # камер+хүн тутамд секунд
+MARGIN = 0.08            # genuine гэж үзэх: дараагийн хүн ≥ хамгийн ойр + MARGIN
+LOOSE = 0.70             # үүнээс хол бол танихгүй хүн байж магадгүй – genuine-д орохгүй
+FAR_TARGET = 0.001
+TAR_TARGET = 0.98
+MAX_DELTA = 0.08
+SAFETY = 0.03
+MIN_SAMPLES = 20
+FIELDS = ("ts", "camera", "name", "distance", "second", "second_distance", "accepted")
+
+
+class DistanceLog:
+    # match_faces-ийн камерын thread-ээс: санах ойд дараалуулж, тусдаа thread бичнэ
+    def __init__(self, path=DISTANCE_LOG, interval=5.0):
+        self.path = path
+        self.interval = interval
+        self._rows = collections.deque(maxlen=10000)
+        self._last = {}
+        self._stop = threading.Event()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def record(self, name, distance, second, second_distance, accepted, camera=""):
+        now = time.time()
+        if now - self._last.get((camera, name), 0.0) < RECORD_GAP:
+            return
+        self._last[(camera, name)] = now
+        self._rows.append((round(now, 1), camera, name, round(distance, 4), second or "",
+                           "" if second_distance is None else round(second_distance, 4), int(accepted)))
+
+    def flush(self):
+        rows = []
+        while self._rows:
+            rows.append(self._rows.popleft())
+        if not rows:
+            return
+        if os.path.exists(self.path) and os.path.getsize(self.path) > LOG_MAX_BYTES:
+            os.replace(self.path, self.path + ".1")   # нэг хуучин файл үлдээнэ
+        new = not os.path.exists(self.path)
+        with open(self.path, "a", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            if new:
+                writer.writerow(FIELDS)
+            writer.writerows(rows)
+
+    def start(self):
+        def loop():
+            while not self._stop.wait(self.interval):
+                self.flush()
+
+        threading.Thread(target=loop, daemon=True, name="distance-log").start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+
+def read_log(path=DISTANCE_LOG):
+    rows = []
+    for p in (path + ".1", path):
+        if os.path.exists(p):
+            with open(p, "r", encoding="utf-8", newline="") as f:
+                rows.extend(csv.DictReader(f))
+    return rows
+
+
+def load(path=THRESHOLDS_FILE):
+    # → {"global": x, "identities": {...}} эсвэл {} (тохируулаагүй)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _split(rows, default=TOLERANCE):
+    genuine, impostor = collections.defaultdict(list), collections.defaultdict(list)
+    for row in rows:
+        d = float(row["distance"])
+        d2 = float(row["second_distance"]) if row["second_distance"] else np.inf
+        if d <= LOOSE and d2 - d >= MARGIN:
+            # accepted баганагүй хуучин мөр – анхдагч босгоор
+            accepted = row["accepted"] == "1" if row.get("accepted") else d <= default
+            if accepted:
+                genuine[row["name"]].append(d)
+            if row["second"]:
+                impostor[row["second"]].append(d2)
+    return genuine, impostor
+
+
+def calibrate(rows, far=FAR_TARGET, tar=TAR_TARGET, min_samples=MIN_SAMPLES, default=TOLERANCE):
+    genuine, impostor = _split(rows, default)
+    all_impostor = np.sort(np.concatenate([np.asarray(v) for v in impostor.values()])) if impostor else np.empty(0)
+    all_genuine = np.concatenate([np.asarray(v) for v in genuine.values()]) if genuine else np.empty(0)
+
+    # Нийтийн босго: impostor-уудын far хувиас бага нь доор орох хамгийн том утга
+    if all_impostor.size >= 1 / far:
+        global_t = float(np.quantile(all_impostor, far)) - SAFETY / 2
+    elif all_impostor.size:
+        # Хангалттай өгөгдөлгүй – нийтийн босгыг өсгөхгүй, хамгийн ойр impostor-оос доош л буулгана
+        global_t = min(default, float(all_impostor[0]) - SAFETY)
+    else:
+        global_t = default
+    global_t = round(float(np.clip(global_t, default - MAX_DELTA, default + MAX_DELTA)), 3)
+
+    identities, per_identity = {}, {}
+    for name, values in sorted(genuine.items()):
+        values = np.asarray(values)
+        entry = {"genuine": int(values.size), "impostor": len(impostor.get(name, []))}
+        if values.size >= min_samples:
+            t = float(np.quantile(values, tar)) + SAFETY / 2
+            if impostor.get(name):
+                t = min(t, min(impostor[name]) - SAFETY)
+            t = round(float(np.clip(t, global_t - MAX_DELTA, global_t)), 3)
+            if abs(t - global_t) >= 0.005:
+                identities[name] = t
+            entry["threshold"] = t
+            entry["first_try_before"] = round(float((values <= default).mean()), 3)
+            entry["first_try_after"] = round(float((values <= t).mean()), 3)
+        per_identity[name] = entry
+
+    threshold_of = lambda name: identities.get(name, global_t)
+    accepted_before = float((all_genuine <= default).mean()) if all_genuine.size else None
+    accepted_after = (float(np.mean([d <= threshold_of(n) for n, v in genuine.items() for d in v]))
+                      if all_genuine.size else None)
+    false_before = int((all_impostor <= default).sum())
+    false_after = sum(int(sum(d <= threshold_of(n) for d in v)) for n, v in impostor.items())
+    return {
+        "global": global_t,
+        "identities": identities,
+        "generated": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "stats": {
+            "rows": len(rows), "genuine": int(all_genuine.size), "impostor": int(all_impostor.size),
+            # Дахин оролдлого ≈ 1 / (эхний оролдлогоор танигдах магадлал)
+            "first_try_rate_before": round(accepted_before, 3) if accepted_before is not None else None,
+            "first_try_rate_after": round(accepted_after, 3) if accepted_after is not None else None,
+            "impostor_accepts_before": false_before,
+            "impostor_accepts_after": false_after,
+            "per_identity": per_identity,
+        },
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Хүн бүрийн танилтын босго тохируулах")
+    parser.add_argument("--log", default=DISTANCE_LOG)
+    parser.add_argument("--out", default=THRESHOLDS_FILE)
+    parser.add_argument("--far", type=float, default=FAR_TARGET, help="зөвшөөрөх impostor хувь")
+    parser.add_argument("--tar", type=float, default=TAR_TARGET, help="хүн бүрийн genuine quantile")
+    parser.add_argument("--min-samples", type=int, default=MIN_SAMPLES)
+    parser.add_argument("--dry-run", action="store_true", help="thresholds.json бичихгүй")
+    args = parser.parse_args(argv)
+
+    rows = read_log(args.log)
+    if not rows:
+        print(f"{args.log}: бичлэг алга – core хэсэг хугацаанд ажилласны дараа ажиллуулна уу", file=sys.stderr)
+        return 1
+    result = calibrate(rows, args.far, args.tar, args.min_samples)
+    if not args.dry_run:
+        tmp = args.out + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, args.out)
+        import ipc
+
+        client = ipc.connect()
+        if client is not None:
+            client.reload_faces()   # шинэ босгыг core ачаална
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,243 @@
+# =============================================
+# Танигдаагүй царайн кэш + бүлэглэлт (дараа нь шууд бүртгэх)
+# =============================================
+# "Unknown" гарсан encoding-ийг хаяхгүй: сүүлийн UNKNOWN_CAPACITY царайг UNKNOWN_TTL
+# секунд хадгална (encoding + царайн хэсгийн JPEG). Ижил танихгүй хүн дахин ирэхэд:
+#   1) кэшийн (жижиг) матрицаас хамгийн ойрыг хайна;
+#   2) entry бүр бүртгэгдэх үеийнхээ "хамгийн ойр танил хүртэлх зай"-г (known) хадгална.
+#      Гурвалжны тэнцэтгэл бишээр d(шинэ, танил) ≥ known − d(шинэ, entry) тул
+#      known − d(шинэ, entry) > tolerance бол танил биш нь батлагдсан → бүх индексийг
+#      дахин хайхгүй. Батлагдахгүй бол ердийнхөөрөө индексээр тааруулаад тэр entry-д нэмнэ.
+# Шинэ ажилтан бүртгэгдэхэд (on_enrolled) known зайнууд шинэчлэгдэж, тэр хүнд
+# таарах entry-үүд устана – кэш хэзээ ч танил хүнийг "Unknown" гэж буруу хариулахгүй.
+#
+# Бүлэглэлт (cluster) тусдаа thread дээр UNKNOWN_CLUSTER_INTERVAL тутамд: entry-үүдийг
+# tolerance дотор union-find-аар нэгтгэнэ. Админ бүлгийн хамгийн том царайг
+# pending_photos руу бичүүлж (core.unknown_photo) ердийн бүртгэлийн формоор бүртгэнэ.
+import base64
+import itertools
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import metrics
+
+UNKNOWN_CAPACITY = 200          # санах ой: entry бүр ~128 float + ~10KB JPEG
+UNKNOWN_TTL = 4 * 3600.0        # секунд – сүүлд харагдснаас хойш
+SAME_UNKNOWN = 0.4              # нэг entry-д нэмэх зай (нэг хүний ойрын frame-үүд)
+VISIT_GAP = 30.0                # ийм удаан харагдаагүй бол дахин ирсэнд тооцно
+CHIP_SIDE = 200                 # бүртгэлд хангалттай (HOG ~80px-ээс том царай)
+CHIP_MARGIN = 0.35              # хайрцгийг талаас нь ингэж тэлж тайрна
+UNKNOWN_CLUSTER_INTERVAL = 30.0
+
+
+def crop_chip(rgb, box, side=CHIP_SIDE, margin=CHIP_MARGIN, quality=90):
+    # box = (top, right, bottom, left) → царай орчмын JPEG байт (BGR-ээр кодлоно)
+    top, right, bottom, left = box
+    h, w = rgb.shape[:2]
+    dy, dx = int((bottom - top) * margin), int((right - left) * margin)
+    crop = rgb[max(0, top - dy):min(h, bottom + dy), max(0, left - dx):min(w, right + dx)]
+    if not crop.size:
+        return None
+    scale = side / max(crop.shape[:2])
+    if scale < 1:
+        crop = cv2.resize(crop, (max(1, int(crop.shape[1] * scale)), max(1, int(crop.shape[0] * scale))),
+                          interpolation=cv2.INTER_AREA)
+    ok, jpeg = cv2.imencode(".jpg", cv2.cvtColor(crop, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return jpeg.tobytes() if ok else None
+
+
+class UnknownCache:
+    def __init__(self, capacity=UNKNOWN_CAPACITY, ttl=UNKNOWN_TTL, same=SAME_UNKNOWN):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.same = same
+        self.entries = {}            # id → dict (encoding, known, chip, face, first, last, frames, visits, cameras)
+        self.matrix = np.empty((0, 128))
+        self.ids = []                # matrix-ийн мөр бүрийн entry id
+        self.clusters = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _rebuild(self):
+        self.ids = list(self.entries)
+        self.matrix = np.asarray([self.entries[i]["encoding"] for i in self.ids], dtype=np.float64).reshape(-1, 128)
+
+    def _nearest(self, encoding):
+        # → (entry id, зай) эсвэл (None, None); _lock дотор дуудна
+        if not self.ids:
+            return None, None
+        d = np.linalg.norm(self.matrix - encoding, axis=1)
+        i = int(np.argmin(d))
+        return self.ids[i], float(d[i])
+
+    def lookup(self, encoding, tolerance):
+        # Танил биш нь батлагдвал (entry id, зай), үгүй бол None – тэгвэл индексээр тааруулна
+        with self._lock:
+            entry_id, d = self._nearest(encoding)
+            if entry_id is None or d > self.same:
+                return None
+            if self.entries[entry_id]["known"] - d > tolerance:
+                return entry_id, d
+        return None
+
+    def record(self, encoding, known, rgb=None, box=None, camera="", now=None):
+        # Unknown гарсан царай → entry id. known – индексийн хамгийн ойр зай (индекс хоосон бол inf)
+        now = time.time() if now is None else now
+        encoding = np.asarray(encoding, dtype=np.float64)
+        known = np.inf if known is None else known
+        face = (box[2] - box[0]) * (box[1] - box[3]) if box is not None else 0
+        with self._lock:
+            entry_id, d = self._nearest(encoding)
+            if entry_id is not None and d <= self.same:
+                entry = self.entries[entry_id]
+                if now - entry["last"] > VISIT_GAP:
+                    entry["visits"] += 1
+                entry["last"] = now
+                entry["frames"] += 1
+                entry["known"] = min(entry["known"], known)
+                if camera:
+                    entry["cameras"].add(camera)
+                if rgb is not None and face > entry["face"]:   # хамгийн том (тод) царайг үлдээнэ
+                    chip = crop_chip(rgb, box)
+                    if chip is not None:
+                        entry["chip"], entry["face"] = chip, face
+                return entry_id
+            self._expire(now)
+            if len(self.entries) >= self.capacity:
+                oldest = min(self.entries, key=lambda i: self.entries[i]["last"])
+                del self.entries[oldest]
+            entry_id = f"U{next(self._ids)}"
+            self.entries[entry_id] = {
+                "encoding": encoding, "known": known,
+                "chip": crop_chip(rgb, box) if rgb is not None else None, "face": face,
+                "first": now, "last": now, "frames": 1, "visits": 1,
+                "cameras": {camera} if camera else set(),
+            }
+            self._rebuild()
+        metrics.inc("unknown_cache_new_total")
+        return entry_id
+
+    def _expire(self, now):
+        expired = [i for i, e in self.entries.items() if now - e["last"] > self.ttl]
+        for entry_id in expired:
+            del self.entries[entry_id]
+        if expired:
+            self._rebuild()
+        return len(expired)
+
+    # ---------- Индекс өөрчлөгдөхөд ----------
+    def on_enrolled(self, encoding, tolerance):
+        # Шинэ танил царай: түүнд таарах entry-үүдийг хасаж, бусдын known зайг багасгана
+        encoding = np.asarray(encoding, dtype=np.float64)
+        with self._lock:
+            if not self.ids:
+                return 0
+            d = np.linalg.norm(self.matrix - encoding, axis=1)
+            removed = 0
+            for entry_id, dist in zip(self.ids, d):
+                if dist <= tolerance:
+                    del self.entries[entry_id]
+                    removed += 1
+                else:
+                    self.entries[entry_id]["known"] = min(self.entries[entry_id]["known"], float(dist))
+            self._rebuild()
+        self.clusters = [c for c in self.clusters if all(m in self.entries for m in c["members"])]
+        return removed
+
+    def refresh_known(self, index, tolerance):
+        # reload_faces-ийн дараа: known зайг шинэ индексээр дахин бодно
+        with self._lock:
+            for entry_id in list(self.entries):
+                _, d = index.match(self.entries[entry_id]["encoding"], tolerance)
+                if d is not None and d <= tolerance:
+                    del self.entries[entry_id]
+                else:
+                    self.entries[entry_id]["known"] = np.inf if d is None else d
+            self._rebuild()
+
+    def forget(self, entry_ids):
+        with self._lock:
+            for entry_id in entry_ids:
+                self.entries.pop(entry_id, None)
+            self._rebuild()
+
+    # ---------- Бүлэглэлт ----------
+    def cluster(self, tolerance, now=None):
+        now = time.time() if now is None else now
+        t0 = time.perf_counter()
+        with self._lock:
+            self._expire(now)
+            ids, matrix = list(self.ids), self.matrix.copy()
+            entries = {i: dict(self.entries[i], cameras=set(self.entries[i]["cameras"])) for i in ids}
+        parent = list(range(len(ids)))
+
+        def root(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        if ids:
+            sq = (matrix ** 2).sum(axis=1)
+            dist = np.sqrt(np.maximum(sq[:, None] + sq[None, :] - 2 * matrix @ matrix.T, 0.0))
+            for i, j in zip(*np.nonzero(np.triu(dist <= tolerance, k=1))):
+                parent[root(i)] = root(j)
+        groups = {}
+        for i, entry_id in enumerate(ids):
+            groups.setdefault(root(i), []).append(entry_id)
+
+        clusters = []
+        for members in groups.values():
+            members.sort(key=lambda m: int(m[1:]))
+            group = [entries[m] for m in members]
+            best = max(group, key=lambda e: (e["chip"] is not None, e["face"]))
+            clusters.append({
+                "id": members[0],   # хамгийн хуучин entry – бүлэг томорсон ч id хэвээр
+                "members": members,
+                "visits": sum(e["visits"] for e in group),
+                "frames": sum(e["frames"] for e in group),
+                "first": min(e["first"] for e in group),
+                "last": max(e["last"] for e in group),
+                "cameras": sorted(set().union(*(e["cameras"] for e in group))),
+                "chip": best["chip"],
+            })
+        clusters.sort(key=lambda c: c["last"], reverse=True)
+        self.clusters = clusters
+        metrics.observe("unknown_cluster_seconds", time.perf_counter() - t0)
+        return clusters
+
+    def summary(self):
+        # GUI/IPC-д: chip-ийг base64 болгож, цагийг мөр болгоно
+        fmt = lambda ts: time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+        return [{"id": c["id"], "entries": len(c["members"]), "visits": c["visits"], "frames": c["frames"],
+                 "first": fmt(c["first"]), "last": fmt(c["last"]), "cameras": c["cameras"],
+                 "thumb": base64.b64encode(c["chip"]).decode("ascii") if c["chip"] else None}
+                for c in self.clusters]
+
+    def chip(self, cluster_id):
+        for c in self.clusters:
+            if c["id"] == cluster_id:
+                return c["chip"], c["members"]
+        return None, []
+
+    def start(self, tolerance, interval=UNKNOWN_CLUSTER_INTERVAL):
+        self._running = True
+
+        def loop():
+            while self._running:
+                time.sleep(interval)
+                self.cluster(tolerance)
+
+        self._thread = threading.Thread(target=loop, daemon=True, name="unknown-clusters")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
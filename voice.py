@@ -0,0 +1,104 @@
+# =============================================
+# Дуу гаргах (TTS) – нэг thread, нэг espeak-ng процесс
+# =============================================
+# Өмнө нь speak() дуудалт бүр шинэ thread + os.system("espeak-ng ...") процесс үүсгэдэг
+# байсан: олон долоо хоног ажиллахад thread/процесс овоорч, текст дэх ' тэмдэг shell-ийг
+# эвддэг байв. Одоо:
+#   - espeak-ng-ийг --stdin-тэй нэг удаа эхлүүлнэ – stdin-ээс мөр бүрийг ирмэгц уншина
+#     (--stdin-гүй бол EOF хүртэл хүлээж бөөнөөр уншдаг; үхсэн бол дараагийн мөрөнд дахин эхэлнэ)
+#   - espeak дуусахыг мэдэгдэхгүй тул on_spoken-ийг бичсэнээс хойш estimate_seconds-ийн дараа
+#     дуудна (тэр хооронд дараагийн мөрийг бичихгүй)
+#   - нэг "speaker" thread дарааллаас авч stdin руу бичнэ; дараалал SPEAK_QUEUE хүртэл,
+#     дүүрвэл хамгийн хуучин мөр хаягдана (GUI хэзээ ч хүлээхгүй)
+import queue
+import subprocess
+import threading
+import time
+
+import metrics
+
+SPEAK_COMMAND = ("espeak-ng", "--stdin", "-v", "ru+f3", "-s", "100", "-p", "80", "-a", "50")
+SPEAK_QUEUE = 8
+CHARS_PER_SECOND = 10.0   # -s 100 (үг/мин) ≈ секундэд 10 тэмдэгт – индикатор унтраах хугацаанд
+
+
+def estimate_seconds(text):
+    return len(text) / CHARS_PER_SECOND
+
+
+class Speaker:
+    def __init__(self, command=SPEAK_COMMAND, on_spoken=None, on_error=None):
+        # on_spoken(text) / on_error(exc) – speaker thread-ээс дуудагдана (Tk бол app.after-ээр)
+        self.command = list(command)
+        self.on_spoken = on_spoken
+        self.on_error = on_error
+        self._queue = queue.Queue(maxsize=SPEAK_QUEUE)
+        self._proc = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="speaker")
+        self._thread.start()
+        return self
+
+    def say(self, text):
+        text = " ".join(str(text).split())   # мөр шилжилт espeak-д тусдаа өгүүлбэр болно
+        if not text:
+            return
+        while True:
+            try:
+                self._queue.put_nowait(text)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()   # хамгийн хуучныг хаяна
+                    metrics.inc("speak_dropped_total")
+                except queue.Empty:
+                    pass
+
+    def _process(self):
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                          stderr=subprocess.DEVNULL, text=True, encoding="utf-8", bufsize=1)
+        return self._proc
+
+    def _run(self):
+        while True:
+            text = self._queue.get()
+            if text is None:
+                break
+            try:
+                with metrics.timer("speak_seconds"):
+                    for attempt in range(2):
+                        try:
+                            proc = self._process()
+                            proc.stdin.write(text + "\n")
+                            proc.stdin.flush()
+                            break
+                        except (BrokenPipeError, ValueError):
+                            self._proc = None   # процесс унасан – нэг удаа дахин эхлүүлнэ
+                            if attempt:
+                                raise
+                    time.sleep(estimate_seconds(text))   # ойролцоогоор яриж дуусах хүртэл
+                if self.on_spoken:
+                    self.on_spoken(text)
+            except Exception as e:
+                print("Дуу гаргах алдаа:", repr(e))
+                if self.on_error:
+                    self.on_error(e)
+                time.sleep(1.0)   # espeak-ng алга бол дараалал хоосон эргэхгүй
+
+    def close(self):
+        if self._thread is not None:
+            try:
+                self._queue.put(None, timeout=1.0)
+            except queue.Full:
+                pass
+            self._thread.join(timeout=2)
+        if self._proc is not None and self._proc.poll() is None:
+            try:
+                self._proc.stdin.close()
+                self._proc.wait(timeout=5)   # үлдсэн мөрүүдийг дуусгана
+            except (OSError, subprocess.TimeoutExpired):
+                self._proc.kill()
+        self._proc = None
@@ -0,0 +1,104 @@
+# =============================================
+# Ажилтны бүртгэл: known_faces/<нэр>.jpg + worker_data/<нэр>.txt
+# =============================================
+# core.enroll, sync (бусад киоскоос), enroll.py (олноор импортлох), dedup.py бүгд энд дамжина.
+# Нэг хүн олон зурагтай (sample) байж болно: <нэр>.jpg, <нэр>~2.jpg, <нэр>~3.jpg ...
+import os
+import shutil
+
+KNOWN_FACES_DIR = "known_faces"
+WORKER_DATA_DIR = "worker_data"
+FIELDS = ("Full Name", "Employee ID", "Department", "Position")
+SAMPLE_SEP = "~"
+
+
+def safe_name(name):
+    return name.strip().replace(" ", "_")
+
+
+def name_from_photo(file):
+    # "Bat_Bold~2.jpg" → "Bat Bold"
+    return os.path.splitext(os.path.basename(file))[0].split(SAMPLE_SEP)[0].replace("_", " ")
+
+
+def identities():
+    # Бүртгэлтэй бүх нэр (зураг эсвэл мэдээллийн файлтай)
+    names = set()
+    if os.path.isdir(KNOWN_FACES_DIR):
+        names.update(name_from_photo(f) for f in os.listdir(KNOWN_FACES_DIR))
+    if os.path.isdir(WORKER_DATA_DIR):
+        names.update(os.path.splitext(f)[0].replace("_", " ")
+                     for f in os.listdir(WORKER_DATA_DIR) if f.endswith(".txt"))
+    return sorted(names)
+
+
+def same_name(name):
+    # Том жижиг үсэг, зайнаас үл хамааран ижил нэртэй бүртгэлүүд ("Khosoo" ба "khosoo")
+    key = safe_name(name).lower()
+    return [n for n in identities() if safe_name(n).lower() == key]
+
+
+def sample_paths(name):
+    if not os.path.isdir(KNOWN_FACES_DIR):
+        return []
+    safe = safe_name(name)
+    return sorted(os.path.join(KNOWN_FACES_DIR, f) for f in os.listdir(KNOWN_FACES_DIR)
+                  if safe_name(name_from_photo(f)) == safe)
+
+
+def next_sample_path(name):
+    existing = {os.path.basename(p) for p in sample_paths(name)}
+    if f"{safe_name(name)}.jpg" not in existing:
+        return photo_path(name)
+    n = 2
+    while f"{safe_name(name)}{SAMPLE_SEP}{n}.jpg" in existing:
+        n += 1
+    return os.path.join(KNOWN_FACES_DIR, f"{safe_name(name)}{SAMPLE_SEP}{n}.jpg")
+
+
+def photo_path(name):
+    return os.path.join(KNOWN_FACES_DIR, f"{safe_name(name)}.jpg")
+
+
+def data_path(name):
+    return os.path.join(WORKER_DATA_DIR, f"{safe_name(name)}.txt")
+
+
+def save_worker_data(name, fields):
+    with open(data_path(name), "w", encoding="utf-8") as f:
+        for k, v in fields.items():
+            f.write(f"{k}: {str(v).strip()}\n")
+    return safe_name(name)
+
+
+def load_worker_data(name):
+    fields = {}
+    path = data_path(name)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                key, sep, value = line.rstrip("\n").partition(": ")
+                if sep:
+                    fields[key] = value
+    return fields
+
+
+def exists(name):
+    return bool(same_name(name))
+
+
+def move_samples(source, target):
+    # source-ийн бүх зургийг target-ийн нэмэлт sample болгоно
+    moved = []
+    for path in sample_paths(source):
+        dest = next_sample_path(target)
+        shutil.move(path, dest)
+        moved.append(dest)
+    return moved
+
+
+def remove_worker(name, backup_dir):
+    # Устгахгүй – backup_dir руу зөөнө (dedup/replace буцаах боломжтой)
+    os.makedirs(backup_dir, exist_ok=True)
+    for path in sample_paths(name) + ([data_path(name)] if os.path.exists(data_path(name)) else []):
+        shutil.move(path, os.path.join(backup_dir, os.path.basename(path)))